@@ -0,0 +1,75 @@
+"""Compares reading common & site configs with and without the parsed config cache, on
+a throwaway wrench with many sites.
+
+Usage, from the repository root:
+
+	python -m benchmarks.config_cache [--sites 2000] [--passes 5] [--reads 10000]
+"""
+
+# imports - standard imports
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# imports - module imports
+from wrench.config.common_site_config import get_config, invalidate_config_cache
+from wrench.config.site_config import get_site_config
+
+
+def make_wrench(wrench_path: str, sites: int):
+	sites_path = os.path.join(wrench_path, "sites")
+	os.makedirs(sites_path)
+
+	with open(os.path.join(sites_path, "common_site_config.json"), "w") as f:
+		json.dump({f"key_{n}": n for n in range(50)}, f, indent=1)
+
+	for n in range(sites):
+		site_path = os.path.join(sites_path, f"site{n}.local")
+		os.makedirs(site_path)
+		with open(os.path.join(site_path, "site_config.json"), "w") as f:
+			json.dump({"db_name": f"_{n:016x}", "db_password": "x" * 16, "domains": []}, f)
+
+
+def timed(fn, cached: bool, runs: int) -> float:
+	start = time.perf_counter()
+	for _ in range(runs):
+		if not cached:
+			invalidate_config_cache()
+		fn()
+	return time.perf_counter() - start
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--sites", type=int, default=2000)
+	parser.add_argument("--passes", type=int, default=5)
+	parser.add_argument("--reads", type=int, default=10000)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as wrench_path:
+		make_wrench(wrench_path, args.sites)
+		sites = sorted(os.listdir(os.path.join(wrench_path, "sites")))
+		sites.remove("common_site_config.json")
+
+		def read_site_configs():
+			for site in sites:
+				get_site_config(site, wrench_path=wrench_path)
+
+		def read_common_config():
+			get_config(wrench_path)
+
+		print(f"{'READ':40}  {'UNCACHED':>9}  {'CACHED':>9}")
+		for name, fn, runs in (
+			(f"{args.sites} site configs x {args.passes}", read_site_configs, args.passes),
+			(f"common_site_config.json x {args.reads}", read_common_config, args.reads),
+		):
+			# warm the cache & the page cache, so only parsing is compared
+			fn()
+			uncached, cached = timed(fn, False, runs), timed(fn, True, runs)
+			print(f"{name:40}  {uncached * 1000:>7.0f}ms  {cached * 1000:>7.0f}ms")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,97 @@
+"""Compares python installers (see `python_installer` in common_site_config.json) by
+creating an env and installing requirements into it from a local wheelhouse, offline.
+
+Usage, from the repository root:
+
+	python -m benchmarks.installers -r requirements.txt [--runs 3] [--python python3]
+
+Requirements missing from the wheelhouse (~/.cache/wrench/wheels by default) are
+downloaded into it before the timed runs.
+"""
+
+# imports - standard imports
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from shlex import split
+from statistics import median
+
+# imports - module imports
+from wrench.utils import which
+from wrench.utils.installer import PYTHON_INSTALLERS, get_install_cmd, get_venv_cmd
+from wrench.utils.wheelhouse import get_wheelhouse_path
+
+
+def run(cmd: str) -> float:
+	start = time.perf_counter()
+	subprocess.run(
+		split(cmd), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+	)
+	return time.perf_counter() - start
+
+
+def benchmark(installer: str, python: str, requirements: str, wheelhouse: str, runs: int):
+	venv_times, install_times = [], []
+
+	for _ in range(runs):
+		with tempfile.TemporaryDirectory() as tmp:
+			env_path = os.path.join(tmp, "env")
+			venv_times.append(run(get_venv_cmd(python, env_path, installer)))
+			install_cmd = get_install_cmd(f"{env_path}/bin/python", installer)
+			install_times.append(
+				run(f"{install_cmd} --no-index --find-links {wheelhouse} -r {requirements}")
+			)
+
+	return median(venv_times), median(install_times)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("-r", "--requirements", required=True)
+	parser.add_argument("--python", default=sys.executable)
+	parser.add_argument("--runs", type=int, default=3)
+	parser.add_argument("--wheelhouse", default=str(get_wheelhouse_path()))
+	args = parser.parse_args()
+
+	requirements = os.path.abspath(args.requirements)
+	subprocess.run(
+		[
+			args.python,
+			"-m",
+			"pip",
+			"wheel",
+			"--quiet",
+			"--wheel-dir",
+			args.wheelhouse,
+			"--find-links",
+			args.wheelhouse,
+			"-r",
+			requirements,
+		],
+		check=True,
+	)
+
+	# keep the installers' own caches out of the comparison
+	os.environ["UV_NO_CACHE"] = "1"
+	os.environ["PIP_NO_CACHE_DIR"] = "1"
+
+	print(f"{'INSTALLER':10}  {'VENV':>8}  {'INSTALL':>8}  {'TOTAL':>8}")
+	for installer in PYTHON_INSTALLERS:
+		if installer != "pip" and not which(installer):
+			print(f"{installer:10}  not available on PATH")
+			continue
+
+		venv_time, install_time = benchmark(
+			installer, args.python, requirements, args.wheelhouse, args.runs
+		)
+		print(
+			f"{installer:10}  {venv_time:>7.2f}s  {install_time:>7.2f}s"
+			f"  {venv_time + install_time:>7.2f}s"
+		)
+
+
+if __name__ == "__main__":
+	main()
@@ -8,11 +8,14 @@ import subprocess
 import sys
 import uuid
 import tarfile
+import time
 import typing
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from functools import lru_cache
 from pathlib import Path
+from shlex import split
 from typing import Optional
 from urllib.parse import urlparse
 
@@ -23,10 +26,11 @@ import semantic_version as sv
 
 # imports - module imports
 import wrench
-from wrench.exceptions import NotInWrenchDirectoryError
+from wrench.exceptions import CommandFailedError, NotInWrenchDirectoryError
 from wrench.utils import (
 	UNSET_ARG,
 	fetch_details_from_tag,
+	get_cmd_output,
 	get_app_cache_extract_filter,
 	get_available_folder_name,
 	get_wrench_cache_path,
@@ -34,10 +38,17 @@ from wrench.utils import (
 	is_git_url,
 	is_valid_saashq_branch,
 	log,
+	profiler,
 	run_saashq_cmd,
 	get_file_md5,
 )
-from wrench.utils.wrench import build_assets, install_python_dev_dependencies
+from wrench.utils.bytecode import get_changed_files, refresh_bytecode
+from wrench.utils.wrench import (
+	build_assets,
+	get_env_distributions,
+	install_python_dev_dependencies,
+	normalize_package_name,
+)
 from wrench.utils.render import step
 
 if typing.TYPE_CHECKING:
@@ -46,6 +57,15 @@ if typing.TYPE_CHECKING:
 
 logger = logging.getLogger(wrench.PROJECT_NAME)
 
+DEFAULT_FETCH_JOBS = 8
+# git output of fetches that needed a password, passphrase or host key confirmation
+FETCH_PROMPT_ERRORS = (
+	"terminal prompts disabled",
+	"Host key verification failed",
+	"Permission denied",
+	"Authentication failed",
+)
+
 
 class AppMeta:
 	def __init__(self, name: str, branch: str = None, to_clone: bool = True):
@@ -237,6 +257,8 @@ class App(AppMeta):
 		restart_wrench=True,
 		ignore_resolution=False,
 		using_cached=False,
+		skip_python=False,
+		skip_node=False,
 	):
 		import wrench.cli
 		from wrench.utils.app import get_app_name
@@ -260,6 +282,8 @@ class App(AppMeta):
 			restart_wrench=restart_wrench,
 			resolution=self.local_resolution,
 			using_cached=using_cached,
+			skip_python=skip_python,
+			skip_node=skip_node,
 		)
 
 	@step(title="Cloning and installing {repo}", success="App {repo} Installed")
@@ -269,7 +293,13 @@ class App(AppMeta):
 
 	@step(title="Uninstalling App {repo}", success="App {repo} Uninstalled")
 	def uninstall(self):
-		self.wrench.run(f"{self.wrench.python} -m pip uninstall -y {self.name}")
+		if normalize_package_name(self.name) not in get_env_distributions(self.wrench.name):
+			log(f"{self.name} is not installed in the wrench's env, skipping pip uninstall")
+			return
+		from wrench.utils.installer import get_python_installer, get_uninstall_cmd
+
+		installer = get_python_installer(self.wrench.name)
+		self.wrench.run(f"{get_uninstall_cmd(self.wrench.python, installer)} {self.name}")
 
 	def _get_dependencies(self):
 		from wrench.utils.app import get_required_deps, required_apps_from_hooks
@@ -886,6 +916,8 @@ def install_app(
 	skip_assets=False,
 	resolution=UNSET_ARG,
 	using_cached=False,
+	skip_python=False,
+	skip_node=False,
 ):
 	import wrench.cli as wrench_cli
 	from wrench.wrench import Wrench
@@ -902,25 +934,44 @@ def install_app(
 
 	verbose = wrench_cli.verbose or verbose
 	quiet_flag = "" if verbose else "--quiet"
-	cache_flag = "--no-cache-dir" if no_cache else ""
 
 	app_path = os.path.realpath(os.path.join(wrench_path, "apps", app))
 
-	wrench.run(
-		f"{wrench.python} -m pip install {quiet_flag} --upgrade -e {app_path} {cache_flag}"
-	)
+	if not skip_python and no_cache:
+		from wrench.utils.installer import get_install_cmd, get_python_installer
 
-	if conf.get("developer_mode"):
-		install_python_dev_dependencies(apps=app, wrench_path=wrench_path, verbose=verbose)
+		install_cmd = get_install_cmd(
+			wrench.python,
+			get_python_installer(wrench_path),
+			quiet_flag=quiet_flag,
+			no_cache=True,
+		)
+		wrench.run(f"{install_cmd} -e {app_path}")
+	elif not skip_python:
+		from wrench.utils.wheelhouse import pip_install, populate_wheelhouse
+
+		pip_install(wrench.python, f"-e {app_path}", cwd=wrench.cwd, quiet_flag=quiet_flag)
+		populate_wheelhouse(wrench.python, wrench_path, app_paths=[app_path])
+
+	if (
+		not using_cached
+		and not skip_node
+		and os.path.exists(os.path.join(app_path, "package.json"))
+	):
+		from wrench.utils.node_store import link_apps_node_modules
 
-	if not using_cached and os.path.exists(os.path.join(app_path, "package.json")):
 		yarn_install = "yarn install --check-files"
 		if verbose:
 			yarn_install += " --verbose"
 		wrench.run(yarn_install, cwd=app_path)
+		link_apps_node_modules(wrench_path, apps=[app])
 
 	wrench.apps.sync(app_name=app, required=resolution, branch=tag, app_dir=app_path)
 
+	# after the sync, so the app's in states when its dev fingerprint is recorded
+	if conf.get("developer_mode") and not skip_python:
+		install_python_dev_dependencies(apps=app, wrench_path=wrench_path, verbose=verbose)
+
 	if not skip_assets:
 		build_assets(wrench_path=wrench_path, app=app, using_cached=using_cached)
 
@@ -930,8 +981,9 @@ def install_app(
 		wrench.reload(_raise=False)
 
 
-def pull_apps(apps=None, wrench_path=".", reset=False):
-	"""Check all apps if there no local changes, pull"""
+def pull_apps(apps=None, wrench_path=".", reset=False, jobs=DEFAULT_FETCH_JOBS):
+	"""Check all apps if there no local changes, pull. Remotes of up to `jobs` apps are
+	fetched at a time"""
 	from wrench.wrench import Wrench
 	from wrench.utils.app import get_current_branch, get_remote
 
@@ -966,13 +1018,14 @@ Here are your choices:
 					)
 					sys.exit(1)
 
+	pulls = []
 	for app in apps:
 		if app in excluded_apps:
 			print(f"Skipping pull for app {app}")
 			continue
 		app_dir = get_repo_dir(app, wrench_path=wrench_path)
 		if os.path.exists(os.path.join(app_dir, ".git")):
-			remote = get_remote(app)
+			remote = get_remote(app, wrench_path=wrench_path)
 			if not remote:
 				# remote is False, i.e. remote doesn't exist, add the app to excluded_apps.txt
 				add_to_excluded_apps_txt(app, wrench_path=wrench_path)
@@ -982,28 +1035,140 @@ Here are your choices:
 				)
 				continue
 
+			fetch_cmds = []
 			if not wrench.conf.get("shallow_clone") or not reset:
 				is_shallow = os.path.exists(os.path.join(app_dir, ".git", "shallow"))
 				if is_shallow:
 					s = " to safely pull remote changes." if not reset else ""
 					print(f"Unshallowing {app}{s}")
-					wrench.run(f"git fetch {remote} --unshallow", cwd=app_dir)
+					fetch_cmds.append(f"git fetch {remote} --unshallow")
 
 			branch = get_current_branch(app, wrench_path=wrench_path)
-			logger.log(f"pulling {app}")
 			if reset:
 				reset_cmd = f"git reset --hard {remote}/{branch}"
 				if wrench.conf.get("shallow_clone"):
-					wrench.run(f"git fetch --depth=1 --no-tags {remote} {branch}", cwd=app_dir)
-					wrench.run(reset_cmd, cwd=app_dir)
-					wrench.run("git reflog expire --all", cwd=app_dir)
-					wrench.run("git gc --prune=all", cwd=app_dir)
+					fetch_cmds.append(f"git fetch --depth=1 --no-tags {remote} {branch}")
+					local_cmds = [reset_cmd, "git reflog expire --all", "git gc --prune=all"]
 				else:
-					wrench.run("git fetch --all", cwd=app_dir)
-					wrench.run(reset_cmd, cwd=app_dir)
+					fetch_cmds.append("git fetch --all")
+					local_cmds = [reset_cmd]
 			else:
-				wrench.run(f"git pull {rebase} {remote} {branch}", cwd=app_dir)
-			wrench.run('find . -name "*.pyc" -delete', cwd=app_dir)
+				# same as `git pull`, split in its network & local parts
+				fetch_cmds.append(f"git fetch {remote} {branch}")
+				if rebase:
+					local_cmds = ["git rebase FETCH_HEAD"]
+				else:
+					local_cmds = ["git merge --no-edit FETCH_HEAD"]
+
+			pulls.append(AppPull(app, app_dir, fetch_cmds, local_cmds))
+
+	# fetching is mostly waiting on remotes, so it's done for all apps at once. Repos
+	# are only changed once every fetch has succeeded
+	with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+		list(executor.map(AppPull.fetch, pulls))
+
+	if any(pull.error for pull in pulls):
+		print_pull_summary(pulls)
+		failed = ", ".join(pull.app for pull in pulls if pull.error)
+		for pull in pulls:
+			if pull.needs_prompt:
+				log(
+					f"Fetching {pull.app} needs a password, passphrase or host key confirmation,"
+					" which can't be asked for while fetching in parallel. Run `git fetch` in"
+					f" {pull.app_dir} once, or set up a git credential helper or ssh-agent",
+					level=3,
+				)
+		raise CommandFailedError(f"Couldn't fetch {failed}, no app was updated")
+
+	changed_files = {}
+	for pull in pulls:
+		logger.info(f"pulling {pull.app}")
+		pull.apply(wrench)
+		if pull.changed_files is None:
+			wrench.run('find . -name "*.pyc" -delete', cwd=pull.app_dir)
+		else:
+			changed_files[pull.app_dir] = pull.changed_files
+
+	# only bytecode of changed files is dropped, the rest stays warm for workers
+	refresh_bytecode(wrench.python, changed_files)
+
+	print_pull_summary(pulls)
+
+
+class AppPull:
+	"""Pull of an app's repo, split in a fetch that can run alongside others and local
+	commands applied afterwards; the first one (merge, rebase or reset) moves HEAD"""
+
+	def __init__(self, app, app_dir, fetch_cmds, local_cmds):
+		self.app = app
+		self.app_dir = app_dir
+		self.fetch_cmds = fetch_cmds
+		self.local_cmds = local_cmds
+		self.old_commit = self.get_head()
+		self.new_commit = None
+		self.changed_files = None
+		self.duration = 0.0
+		self.error = None
+		self.needs_prompt = False
+
+	def get_head(self):
+		return get_cmd_output("git rev-parse --short HEAD", cwd=self.app_dir, _raise=False)
+
+	def fetch(self):
+		# fetches run alongside each other with their output captured, so git & ssh
+		# mustn't ask for credentials, passphrases or host keys on the shared terminal
+		env = {
+			**os.environ,
+			"GIT_TERMINAL_PROMPT": "0",
+			"GIT_SSH_COMMAND": f"{os.environ.get('GIT_SSH_COMMAND', 'ssh')} -o BatchMode=yes",
+		}
+		start = time.monotonic()
+		for cmd in self.fetch_cmds:
+			with profiler.span(cmd, "exec_cmd", cwd=self.app_dir):
+				p = subprocess.run(
+					split(cmd),
+					cwd=self.app_dir,
+					env=env,
+					stdout=subprocess.PIPE,
+					stderr=subprocess.STDOUT,
+					universal_newlines=True,
+				)
+			logger.debug(f"cd {self.app_dir} && {cmd}\n{p.stdout}")
+			if p.returncode:
+				errors = [
+					line for line in p.stdout.splitlines() if line.startswith(("fatal:", "error:"))
+				]
+				self.error = errors[0] if errors else f"{cmd} exited with {p.returncode}"
+				self.needs_prompt = any(error in p.stdout for error in FETCH_PROMPT_ERRORS)
+				break
+		self.duration = time.monotonic() - start
+
+	def apply(self, wrench: "Wrench"):
+		head_cmd, *cleanup_cmds = self.local_cmds
+		wrench.run(head_cmd, cwd=self.app_dir)
+		self.new_commit = self.get_head()
+		# before gc, which drops the old commit of shallow clones
+		self.changed_files = get_changed_files(self.app_dir, self.old_commit, self.new_commit)
+
+		for cmd in cleanup_cmds:
+			wrench.run(cmd, cwd=self.app_dir)
+
+
+def print_pull_summary(pulls: typing.List[AppPull]):
+	if not pulls:
+		return
+
+	click.echo(f"\n{'APP':24}  {'COMMIT':17}  {'FETCH':>7}  RESULT")
+	for pull in pulls:
+		if pull.error:
+			commit, result = pull.old_commit, f"failed: {pull.error}"
+		elif pull.new_commit is None:
+			commit, result = pull.old_commit, "fetched"
+		elif pull.new_commit == pull.old_commit:
+			commit, result = pull.old_commit, "up to date"
+		else:
+			commit, result = f"{pull.old_commit}→{pull.new_commit}", "updated"
+		click.echo(f"{pull.app:24}  {commit:17}  {pull.duration:>6.2f}s  {result}")
 
 
 def use_rq(wrench_path):
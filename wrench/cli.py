@@ -1,4 +1,8 @@
 # imports - standard imports
+import time
+
+CLI_IMPORT_START = time.perf_counter()
+
 import atexit
 from contextlib import contextmanager
 from logging import Logger
@@ -11,15 +15,15 @@ import click
 
 # imports - module imports
 import wrench
-from wrench.wrench import Wrench
 from wrench.commands import wrench_command
 from wrench.config.common_site_config import get_config
 from wrench.utils import (
+	UPDATE_CHECK_TTL,
 	check_latest_version,
 	drop_privileges,
 	find_parent_wrench,
 	get_env_saashq_commands,
-	get_cmd_output,
+	get_env_saashq_help,
 	is_wrench_directory,
 	is_dist_editable,
 	is_root,
@@ -27,9 +31,12 @@ from wrench.utils import (
 	setup_logging,
 	get_cmd_from_sysargv,
 )
+from wrench.utils import profiler
 from wrench.utils.wrench import get_env_cmd
 from importlib.util import find_spec
 
+CLI_IMPORT_END = time.perf_counter()
+
 
 # these variables are used to show dynamic outputs on the terminal
 dynamic_feed = False
@@ -45,8 +52,11 @@ SKIP_MODULE_TRACEBACK = ("click",)
 
 @contextmanager
 def execute_cmd(check_for_update=True, command: str = None, logger: Logger = None):
-	if check_for_update:
-		atexit.register(check_latest_version)
+	if check_for_update and not wrench_config.get("disable_update_check"):
+		atexit.register(
+			check_latest_version,
+			ttl=wrench_config.get("update_check_interval", UPDATE_CHECK_TTL),
+		)
 
 	try:
 		yield
@@ -71,22 +81,35 @@ def cli():
 	argv = set(sys.argv)
 	is_envvar_warn_set = not (os.environ.get("WRENCH_DEVELOPER") or os.environ.get("CI"))
 	is_cli_command = len(sys.argv) > 1 and not argv.intersection({"src", "--version"})
-	cmd_from_sys = get_cmd_from_sysargv()
+
+	if "--profile-cli" in argv:
+		profiler.enable()
+		profiler.add_span("import wrench.cli", CLI_IMPORT_START, CLI_IMPORT_END, "import")
+
+	with profiler.span("get_cmd_from_sysargv"):
+		cmd_from_sys = get_cmd_from_sysargv()
 
 	if "--verbose" in argv:
 		verbose = True
 
-	change_working_directory()
-	logger = setup_logging()
+	with profiler.span("change_working_directory"):
+		change_working_directory()
+
+	with profiler.span("setup_logging"):
+		logger = setup_logging()
 	logger.info(command)
 
-	wrench_config = get_config(".")
+	with profiler.span("get_config"):
+		wrench_config = get_config(".")
 
 	if is_cli_command:
 		check_uid()
 		change_uid()
 		change_dir()
 
+	if profiler.enabled:
+		atexit.register(write_profile, os.getcwd())
+
 	if (
 		is_envvar_warn_set
 		and is_cli_command
@@ -127,7 +150,7 @@ def cli():
 	if cmd_from_sys and cmd_from_sys.split("=", 1)[0].strip() in opts:
 		wrench_command()
 
-	if cmd_from_sys in wrench_command.commands:
+	if wrench_command.has_command(cmd_from_sys):
 		with execute_cmd(check_for_update=is_cli_command, command=command, logger=logger):
 			wrench_command()
 
@@ -190,15 +213,38 @@ def change_uid():
 
 
 def app_cmd(wrench_path="."):
-	f = get_env_cmd("python", wrench_path=wrench_path)
-	os.chdir(os.path.join(wrench_path, "sites"))
-	os.execv(f, [f] + ["-m", "saashq.utils.wrench_helper"] + sys.argv[1:])
+	exec_wrench_helper(sys.argv[1:], wrench_path=wrench_path)
 
 
 def saashq_cmd(wrench_path="."):
+	exec_wrench_helper(["saashq"] + sys.argv[1:], wrench_path=wrench_path)
+
+
+def exec_wrench_helper(args, wrench_path="."):
+	"""Runs saashq's wrench_helper in the wrench's daemon if it's running (see
+	`wrench daemon`), else replaces the current process with the env's python"""
+	from wrench.utils.daemon import run_via_daemon
+
 	f = get_env_cmd("python", wrench_path=wrench_path)
+	wrench_path = os.path.abspath(wrench_path)
 	os.chdir(os.path.join(wrench_path, "sites"))
-	os.execv(f, [f] + ["-m", "saashq.utils.wrench_helper", "saashq"] + sys.argv[1:])
+	# wrench's own option, not to be passed on to saashq
+	args = [arg for arg in args if arg != "--profile-cli"]
+
+	with profiler.span("wrench_helper (daemon)", "subprocess", args=args):
+		returncode = run_via_daemon(args, wrench_path=wrench_path)
+	if returncode is not None:
+		sys.exit(returncode)
+
+	# atexit handlers don't run once the process is replaced
+	write_profile(wrench_path)
+	os.execv(f, [f] + ["-m", "saashq.utils.wrench_helper"] + args)
+
+
+def write_profile(wrench_path="."):
+	trace_path = profiler.write(wrench_path)
+	if trace_path:
+		click.secho(f"CLI profile written to {trace_path}", fg="bright_black", err=True)
 
 
 def get_saashq_commands():
@@ -209,12 +255,8 @@ def get_saashq_commands():
 
 
 def get_saashq_help(wrench_path="."):
-	python = get_env_cmd("python", wrench_path=wrench_path)
-	sites_path = os.path.join(wrench_path, "sites")
 	try:
-		out = get_cmd_output(
-			f"{python} -m saashq.utils.wrench_helper get-saashq-help", cwd=sites_path
-		)
+		out = get_env_saashq_help(wrench_path=wrench_path)
 		return "\n\nFramework commands:\n" + out.split("Commands:")[1]
 	except Exception:
 		return ""
@@ -237,7 +279,9 @@ def setup_clear_cache():
 	f = copy(os.chdir)
 
 	def _chdir(*args, **kwargs):
-		Wrench.cache_clear()
+		# wrench.wrench is imported lazily; if it isn't loaded yet, nothing is cached
+		if "wrench.wrench" in sys.modules:
+			sys.modules["wrench.wrench"].Wrench.cache_clear()
 		get_env_cmd.cache_clear()
 		return f(*args, **kwargs)
 
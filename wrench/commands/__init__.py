@@ -9,8 +9,137 @@ from wrench.utils.cli import (
 	setup_verbosity,
 )
 
-
-@click.group(cls=MultiCommandGroup)
+# Static manifest of wrench commands: command name(s) -> ("module:attribute", short help).
+# Command modules are only imported when the command is invoked (or when its own help
+# is rendered) so that wrench startup & `wrench --help` don't pay for all of them.
+WRENCH_COMMANDS = {
+	# wrench.commands.make
+	"init": (
+		"wrench.commands.make:init",
+		"Initialize a new wrench instance in the specified path",
+	),
+	"drop": ("wrench.commands.make:drop", ""),
+	("get", "get-app"): (
+		"wrench.commands.make:get_app",
+		"Clone an app from the internet or filesystem and set it up in your wrench",
+	),
+	"new-app": (
+		"wrench.commands.make:new_app",
+		"Create a new Saashq application under apps folder",
+	),
+	("remove", "rm", "remove-app"): (
+		"wrench.commands.make:remove_app",
+		"Completely remove app from wrench and re-build assets if not installed on any site",
+	),
+	"exclude-app": ("wrench.commands.make:exclude_app_for_update", "Exclude app from updating"),
+	"include-app": ("wrench.commands.make:include_app_for_update", "Include app for updating"),
+	"pip": (
+		"wrench.commands.make:pip",
+		"For pip help use `wrench pip help [COMMAND]` or `wrench pip [COMMAND] -h`",
+	),
+	"validate-dependencies": (
+		"wrench.commands.make:validate_dependencies",
+		"Validates that all requirements specified in saashq-dependencies are met curently.",
+	),
+	# wrench.commands.update
+	"update": ("wrench.commands.update:update", "Performs an update operation on current wrench."),
+	"retry-upgrade": ("wrench.commands.update:retry_upgrade", "Retry a failed upgrade"),
+	"switch-to-branch": (
+		"wrench.commands.update:switch_to_branch",
+		"Switch all apps to specified branch, or specify apps separated by space",
+	),
+	"switch-to-develop": (
+		"wrench.commands.update:switch_to_develop",
+		"Switch saashq and erpnexus to develop branch",
+	),
+	# wrench.commands.utils
+	"start": ("wrench.commands.utils:start", "Start Saashq development processes"),
+	"restart": ("wrench.commands.utils:restart", "Restart supervisor processes or systemd units"),
+	"set-nginx-port": ("wrench.commands.utils:set_nginx_port", "Set NGINX port for site"),
+	"set-ssl-certificate": (
+		"wrench.commands.utils:set_ssl_certificate",
+		"Set SSL certificate path for site",
+	),
+	"set-ssl-key": (
+		"wrench.commands.utils:set_ssl_certificate_key",
+		"Set SSL certificate private key path for site",
+	),
+	"set-url-root": ("wrench.commands.utils:set_url_root", "Set URL root for site"),
+	"set-mariadb-host": ("wrench.commands.utils:set_mariadb_host", "Set MariaDB host for wrench"),
+	"set-redis-cache-host": (
+		"wrench.commands.utils:set_redis_cache_host",
+		"Set Redis cache host for wrench",
+	),
+	"set-redis-queue-host": (
+		"wrench.commands.utils:set_redis_queue_host",
+		"Set Redis queue host for wrench",
+	),
+	"set-redis-socketio-host": (
+		"wrench.commands.utils:set_redis_socketio_host",
+		"Set Redis socketio host for wrench",
+	),
+	"download-translations": (
+		"wrench.commands.utils:download_translations",
+		"Download latest translations",
+	),
+	"backup-all-sites": (
+		"wrench.commands.utils:backup_all_sites",
+		"Backup all sites in current wrench",
+	),
+	"renew-lets-encrypt": (
+		"wrench.commands.utils:renew_lets_encrypt",
+		"Sets Up latest cron and Renew Let's Encrypt certificate",
+	),
+	"disable-production": (
+		"wrench.commands.utils:disable_production",
+		"Disables production environment for the wrench.",
+	),
+	"src": (
+		"wrench.commands.utils:wrench_src",
+		"Prints wrench source folder path, which can be used as: cd `wrench src`",
+	),
+	"find": ("wrench.commands.utils:find_wrenches", "Finds wrenches recursively from location"),
+	"migrate-env": (
+		"wrench.commands.utils:migrate_env",
+		"Migrate Virtual Environment to desired Python Version",
+	),
+	"app-cache": (
+		"wrench.commands.utils:app_cache_helper",
+		"View or remove items belonging to wrench get-app cache",
+	),
+	"cache": ("wrench.commands.utils:cache", "Manage host-wide caches used by wrench"),
+	"du": (
+		"wrench.commands.utils:disk_usage",
+		"Show disk usage of node_modules and space saved by linking them",
+	),
+	# wrench.commands.setup
+	"setup": (
+		"wrench.commands.setup:setup",
+		"Setup command group for enabling setting up a Saashq environment",
+	),
+	# wrench.commands.config
+	"config": ("wrench.commands.config:config", "Change wrench configuration"),
+	# wrench.commands.git
+	"remote-set-url": ("wrench.commands.git:remote_set_url", "Set app remote url"),
+	"remote-reset-url": (
+		"wrench.commands.git:remote_reset_url",
+		"Reset app remote url to saashq official",
+	),
+	"remote-urls": ("wrench.commands.git:remote_urls", "Show apps remote url"),
+	# wrench.commands.install
+	"install": (
+		"wrench.commands.install:install",
+		"Install system dependencies for setting up Saashq environment",
+	),
+	# wrench.commands.daemon
+	"daemon": (
+		"wrench.commands.daemon:daemon",
+		"Manage a long running process that keeps Saashq loaded to run framework commands faster",
+	),
+}
+
+
+@click.group(cls=MultiCommandGroup, lazy_commands=WRENCH_COMMANDS)
 @click.option(
 	"--version",
 	is_flag=True,
@@ -31,103 +160,13 @@ from wrench.utils.cli import (
 	callback=setup_verbosity,
 	expose_value=False,
 )
+@click.option(
+	"--profile-cli",
+	is_flag=True,
+	expose_value=False,
+	help="Write wall time spent in wrench's startup, steps and subprocesses to logs/ as a Chrome trace",
+)
 def wrench_command(wrench_path="."):
 	import wrench
 
 	wrench.set_saashq_version(wrench_path=wrench_path)
-
-
-from wrench.commands.make import (
-	drop,
-	exclude_app_for_update,
-	get_app,
-	include_app_for_update,
-	init,
-	new_app,
-	pip,
-	remove_app,
-	validate_dependencies,
-)
-
-wrench_command.add_command(init)
-wrench_command.add_command(drop)
-wrench_command.add_command(get_app)
-wrench_command.add_command(new_app)
-wrench_command.add_command(remove_app)
-wrench_command.add_command(exclude_app_for_update)
-wrench_command.add_command(include_app_for_update)
-wrench_command.add_command(pip)
-wrench_command.add_command(validate_dependencies)
-
-
-from wrench.commands.update import (
-	retry_upgrade,
-	switch_to_branch,
-	switch_to_develop,
-	update,
-)
-
-wrench_command.add_command(update)
-wrench_command.add_command(retry_upgrade)
-wrench_command.add_command(switch_to_branch)
-wrench_command.add_command(switch_to_develop)
-
-
-from wrench.commands.utils import (
-	app_cache_helper,
-	backup_all_sites,
-	wrench_src,
-	disable_production,
-	download_translations,
-	find_wrenches,
-	migrate_env,
-	renew_lets_encrypt,
-	restart,
-	set_mariadb_host,
-	set_nginx_port,
-	set_redis_cache_host,
-	set_redis_queue_host,
-	set_redis_socketio_host,
-	set_ssl_certificate,
-	set_ssl_certificate_key,
-	set_url_root,
-	start,
-)
-
-wrench_command.add_command(start)
-wrench_command.add_command(restart)
-wrench_command.add_command(set_nginx_port)
-wrench_command.add_command(set_ssl_certificate)
-wrench_command.add_command(set_ssl_certificate_key)
-wrench_command.add_command(set_url_root)
-wrench_command.add_command(set_mariadb_host)
-wrench_command.add_command(set_redis_cache_host)
-wrench_command.add_command(set_redis_queue_host)
-wrench_command.add_command(set_redis_socketio_host)
-wrench_command.add_command(download_translations)
-wrench_command.add_command(backup_all_sites)
-wrench_command.add_command(renew_lets_encrypt)
-wrench_command.add_command(disable_production)
-wrench_command.add_command(wrench_src)
-wrench_command.add_command(find_wrenches)
-wrench_command.add_command(migrate_env)
-wrench_command.add_command(app_cache_helper)
-
-from wrench.commands.setup import setup
-
-wrench_command.add_command(setup)
-
-
-from wrench.commands.config import config
-
-wrench_command.add_command(config)
-
-from wrench.commands.git import remote_reset_url, remote_set_url, remote_urls
-
-wrench_command.add_command(remote_set_url)
-wrench_command.add_command(remote_reset_url)
-wrench_command.add_command(remote_urls)
-
-from wrench.commands.install import install
-
-wrench_command.add_command(install)
@@ -0,0 +1,38 @@
+# imports - third party imports
+import click
+
+
+@click.group(
+	help="Manage a long running process that keeps Saashq loaded to run framework commands faster"
+)
+def daemon():
+	pass
+
+
+@click.command(
+	"start",
+	help="Start the daemon. Framework commands (wrench --site ...) are forwarded to it while it's running",
+)
+def start_daemon():
+	from wrench.utils.daemon import start_daemon
+
+	start_daemon(wrench_path=".")
+
+
+@click.command("stop", help="Stop the daemon")
+def stop_daemon():
+	from wrench.utils.daemon import stop_daemon
+
+	stop_daemon(wrench_path=".")
+
+
+@click.command("status", help="Show whether the daemon is running")
+def daemon_status():
+	from wrench.utils.daemon import daemon_status
+
+	daemon_status(wrench_path=".")
+
+
+daemon.add_command(start_daemon)
+daemon.add_command(stop_daemon)
+daemon.add_command(daemon_status)
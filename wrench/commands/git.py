@@ -3,10 +3,7 @@ import os
 import subprocess
 
 # imports - module imports
-from wrench.wrench import Wrench
-from wrench.app import get_repo_dir
 from wrench.utils import set_git_remote_url
-from wrench.utils.app import get_remote
 
 # imports - third party imports
 import click
@@ -27,6 +24,10 @@ def remote_reset_url(app):
 
 @click.command('remote-urls', help="Show apps remote url")
 def remote_urls():
+	from wrench.wrench import Wrench
+	from wrench.app import get_repo_dir
+	from wrench.utils.app import get_remote
+
 	for app in Wrench(".").apps:
 		repo_dir = get_repo_dir(app)
 
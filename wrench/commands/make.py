@@ -25,6 +25,19 @@ import click
 @click.option(
 	"--clone-without-update", is_flag=True, help="copy repos from path without update"
 )
+@click.option(
+	"--clone-mode",
+	type=click.Choice(["copy", "link"]),
+	default="copy",
+	help="With link, --clone-from clones git repos locally and hardlinks node_modules instead of copying apps",
+)
+@click.option(
+	"--jobs",
+	"-j",
+	type=click.IntRange(min=1),
+	default=1,
+	help="Number of apps to clone, update and install Node packages for in parallel with --clone-from",
+)
 @click.option("--no-procfile", is_flag=True, help="Do not create a Procfile")
 @click.option(
 	"--no-backups",
@@ -61,6 +74,8 @@ def init(
 	python="python3",
 	install_app=None,
 	dev=False,
+	clone_mode="copy",
+	jobs=1,
 ):
 	import os
 
@@ -87,6 +102,8 @@ def init(
 			python=python,
 			verbose=verbose,
 			dev=dev,
+			clone_mode=clone_mode,
+			jobs=jobs,
 		)
 		log(f"Wrench {path} initialized", level=1)
 	except SystemExit:
@@ -215,8 +215,21 @@ def setup_socketio():
 	default=False,
 	is_flag=True,
 )
+@click.option(
+	"--jobs",
+	"-j",
+	type=click.IntRange(min=1),
+	default=1,
+	help="Number of apps to install Node packages for in parallel",
+)
+@click.option(
+	"--force",
+	help="Reinstall dependencies of apps even if their manifests haven't changed",
+	default=False,
+	is_flag=True,
+)
 @click.argument("apps", nargs=-1)
-def setup_requirements(node=False, python=False, dev=False, apps=None):
+def setup_requirements(node=False, python=False, dev=False, jobs=1, force=False, apps=None):
 	"""
 	Setup Python and Node dependencies.
 
@@ -227,18 +240,18 @@ def setup_requirements(node=False, python=False, dev=False, apps=None):
 	wrench = Wrench(".")
 
 	if not (node or python or dev):
-		wrench.setup.requirements(apps=apps)
+		wrench.setup.requirements(apps=apps, jobs=jobs, force=force)
 
 	elif not node and not dev:
-		wrench.setup.python(apps=apps)
+		wrench.setup.python(apps=apps, force=force)
 
 	elif not python and not dev:
-		wrench.setup.node(apps=apps)
+		wrench.setup.node(apps=apps, jobs=jobs, force=force)
 
 	else:
 		from wrench.utils.wrench import install_python_dev_dependencies
 
-		install_python_dev_dependencies(apps=apps)
+		install_python_dev_dependencies(apps=apps, force=force)
 
 		if node:
 			click.secho(
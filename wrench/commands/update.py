@@ -2,8 +2,7 @@
 import click
 
 # imports - module imports
-from wrench.app import pull_apps
-from wrench.utils.wrench import post_upgrade, patch_sites, build_assets
+from wrench.app import DEFAULT_FETCH_JOBS
 
 
 @click.command(
@@ -33,14 +32,37 @@ from wrench.utils.wrench import post_upgrade, patch_sites, build_assets
 @click.option(
 	"--no-compile",
 	is_flag=True,
-	help="[DEPRECATED] This flag doesn't do anything now.",
+	help="Don't precompile bytecode of apps and the env before restarting",
 )
 @click.option("--force", is_flag=True, help="Forces major version upgrades")
+@click.option(
+	"--reinstall",
+	is_flag=True,
+	help="Reinstall dependencies and rebuild assets of all apps, even those that haven't changed",
+)
 @click.option(
 	"--reset",
 	is_flag=True,
 	help="Hard resets git branch's to their new states overriding any changes and overriding rebase on pull",
 )
+@click.option(
+	"--jobs",
+	"-j",
+	type=click.IntRange(min=1),
+	default=1,
+	help="Number of apps to install Node packages for in parallel",
+)
+@click.option(
+	"--force-migrate",
+	is_flag=True,
+	help="Migrate all sites, even those whose apps saw no changes to patches, hooks or DocTypes",
+)
+@click.option(
+	"--fetch-jobs",
+	type=click.IntRange(min=1),
+	default=DEFAULT_FETCH_JOBS,
+	help="Number of apps to fetch from their remotes in parallel",
+)
 def update(
 	pull,
 	apps,
@@ -52,7 +74,11 @@ def update(
 	no_backup,
 	no_compile,
 	force,
+	reinstall,
 	reset,
+	jobs,
+	fetch_jobs,
+	force_migrate,
 ):
 	from wrench.utils.wrench import update
 
@@ -67,15 +93,22 @@ def update(
 		backup=not no_backup,
 		compile=not no_compile,
 		force=force,
+		reinstall=reinstall,
 		reset=reset,
+		jobs=jobs,
+		fetch_jobs=fetch_jobs,
+		force_migrate=force_migrate,
 	)
 
 
 @click.command("retry-upgrade", help="Retry a failed upgrade")
 @click.option("--version", default=5)
 def retry_upgrade(version):
+	from wrench.app import pull_apps
+	from wrench.utils.wrench import post_upgrade, patch_sites, build_assets
+
 	pull_apps()
-	patch_sites()
+	patch_sites(force=True)
 	build_assets()
 	post_upgrade(version - 1, version)
 
@@ -194,3 +194,79 @@ def app_cache_helper(clear=False, remove_app="", remove_key=""):
 	from wrench.utils.wrench import cache_helper
 
 	cache_helper(clear, remove_app, remove_key)
+
+
+@click.group("cache", help="Manage host-wide caches used by wrench")
+def cache():
+	pass
+
+
+@click.command("wheels", help="View or prune the wheelhouse at ~/.cache/wrench/wheels")
+@click.option("--list", "list_", is_flag=True, default=False, help="List cached wheels")
+@click.option(
+	"--prune",
+	is_flag=True,
+	default=False,
+	help="Remove least recently used wheels until the wheelhouse fits in --size-budget",
+)
+@click.option(
+	"--size-budget",
+	type=click.IntRange(min=0),
+	default=None,
+	help="Size budget of the wheelhouse in MB, defaults to 2048",
+)
+def cache_wheels(list_=False, prune=False, size_budget=None):
+	from wrench.utils.wheelhouse import (
+		DEFAULT_WHEELHOUSE_SIZE_BUDGET,
+		list_wheelhouse,
+		prune_wheelhouse,
+	)
+
+	if prune:
+		prune_wheelhouse(
+			DEFAULT_WHEELHOUSE_SIZE_BUDGET if size_budget is None else size_budget
+		)
+	if list_ or not prune:
+		list_wheelhouse()
+
+
+@click.command("envs", help="View or remove env templates at ~/.cache/wrench/envs")
+@click.option("--list", "list_", is_flag=True, default=False, help="List env templates")
+@click.option("--clear", is_flag=True, default=False, help="Remove all env templates")
+def cache_envs(list_=False, clear=False):
+	from wrench.utils.env_template import clear_env_templates, list_env_templates
+
+	if clear:
+		clear_env_templates()
+	if list_ or not clear:
+		list_env_templates()
+
+
+@click.command(
+	"node-modules", help="View or prune the node_modules store at ~/.cache/wrench/node_modules"
+)
+@click.option(
+	"--prune",
+	is_flag=True,
+	default=False,
+	help="Remove files no node_modules links to anymore",
+)
+def cache_node_modules(prune=False):
+	from wrench.utils.node_store import print_disk_usage, prune_node_store
+
+	if prune:
+		removed = prune_node_store()
+		click.echo(f"Removed {removed / 1_000_000:.1f} MB from the node_modules store\n")
+	print_disk_usage()
+
+
+cache.add_command(cache_wheels)
+cache.add_command(cache_envs)
+cache.add_command(cache_node_modules)
+
+
+@click.command("du", help="Show disk usage of node_modules and space saved by linking them")
+def disk_usage():
+	from wrench.utils.node_store import print_disk_usage
+
+	print_disk_usage()
@@ -1,7 +1,10 @@
 # imports - standard imports
+import fcntl
 import getpass
 import json
 import os
+import tempfile
+from contextlib import contextmanager
 
 default_config = {
 	"restart_supervisor_on_update": False,
@@ -17,17 +20,18 @@ default_config = {
 
 DEFAULT_MAX_REQUESTS = 5000
 
+# parsed config files, as path: (mtime_ns, size, config)
+_config_cache = {}
+
 
 def setup_config(wrench_path, additional_config=None):
 	make_pid_folder(wrench_path)
-	wrench_config = get_config(wrench_path)
-	wrench_config.update(default_config)
-	wrench_config.update(get_gunicorn_workers())
-	update_config_for_saashq(wrench_config, wrench_path)
-	if additional_config:
-		wrench_config.update(additional_config)
-
-	put_config(wrench_config, wrench_path)
+	with config_transaction(wrench_path) as wrench_config:
+		wrench_config.update(default_config)
+		wrench_config.update(get_gunicorn_workers())
+		update_config_for_saashq(wrench_config, wrench_path)
+		if additional_config:
+			wrench_config.update(additional_config)
 
 
 def get_config(wrench_path):
@@ -35,23 +39,158 @@ def get_config(wrench_path):
 
 
 def get_common_site_config(wrench_path):
-	config_path = get_config_path(wrench_path)
-	if not os.path.exists(config_path):
+	return read_config_file(get_config_path(wrench_path))
+
+
+def read_config_file(config_path):
+	"""Returns the parsed JSON config at config_path, {} if it doesn't exist. Parsed
+	configs are kept in memory and served from there until the file's mtime or size
+	changes. Callers get their own copy, so it's safe to modify the result."""
+	try:
+		stat = os.stat(config_path)
+	except OSError:
+		_config_cache.pop(config_path, None)
 		return {}
+
+	cached = _config_cache.get(config_path)
+	if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+		return _copy_config(cached[2])
+
 	with open(config_path) as f:
-		return json.load(f)
+		config = json.load(f)
+
+	_config_cache[config_path] = (stat.st_mtime_ns, stat.st_size, config)
+	return _copy_config(config)
+
+
+def invalidate_config_cache(config_path=None):
+	"""Drops cached config of config_path, or all cached configs. Writers call this so
+	that a write within the filesystem's mtime granularity isn't missed"""
+	if config_path:
+		_config_cache.pop(config_path, None)
+	else:
+		_config_cache.clear()
+
+
+def _copy_config(value):
+	# cheaper than copy.deepcopy for plain JSON values
+	if isinstance(value, dict):
+		return {k: _copy_config(v) for k, v in value.items()}
+	if isinstance(value, list):
+		return [_copy_config(v) for v in value]
+	return value
+
+
+@contextmanager
+def config_file_transaction(config_path, sort_keys=False):
+	"""Yields the config at config_path as a dict while holding an exclusive lock on it;
+	changes made to the dict are written back once, when the block exits without an
+	exception. The new config is written to a temporary file, fsync'd and renamed over
+	the old one so readers never see a partially written file.
+
+	Other writers wait on the lock (a hidden sibling .lock file, as the config itself
+	is replaced on every write), so concurrent read-modify-writes don't lose changes.
+	"""
+	config_dir, config_name = os.path.split(os.path.abspath(config_path))
+
+	lock_fd = _open_lock_file(os.path.join(config_dir, f".{config_name}.lock"), config_path)
+	with os.fdopen(lock_fd) as lock_file:
+		fcntl.flock(lock_file, fcntl.LOCK_EX)
+		try:
+			invalidate_config_cache(config_path)
+			config = read_config_file(config_path)
+			original_config = _copy_config(config)
+
+			yield config
+
+			if config != original_config or not os.path.exists(config_path):
+				write_config_file(config_path, config, sort_keys=sort_keys)
+		finally:
+			fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def write_config_file(config_path, config, sort_keys=False):
+	"""Atomically replaces the file at config_path; use via config_file_transaction"""
+	config_dir = os.path.dirname(os.path.abspath(config_path))
+	fd, tmp_path = tempfile.mkstemp(
+		dir=config_dir, prefix=f".{os.path.basename(config_path)}.", suffix=".tmp"
+	)
+
+	try:
+		with os.fdopen(fd, "w") as f:
+			json.dump(config, f, indent=1, sort_keys=sort_keys)
+			f.flush()
+			os.fsync(f.fileno())
+
+		_copy_ownership(config_path, tmp_path)
+		os.replace(tmp_path, config_path)
+	except BaseException:
+		if os.path.exists(tmp_path):
+			os.remove(tmp_path)
+		raise
+	finally:
+		invalidate_config_cache(config_path)
+
+	dir_fd = os.open(config_dir, os.O_RDONLY)
+	try:
+		os.fsync(dir_fd)
+	finally:
+		os.close(dir_fd)
+
+
+def _open_lock_file(lock_path, config_path):
+	"""Opens (creating it if needed) the lock file of config_path read-only, as flock
+	doesn't need write access; so a lock file left by root, eg. by `setup production`,
+	doesn't lock out the wrench's user. It's owned by the config's owner (or the
+	folder's, for a new config) like the config itself"""
+	fd = os.open(lock_path, os.O_RDONLY | os.O_CREAT, 0o666)
+	owner_path = config_path if os.path.exists(config_path) else os.path.dirname(lock_path)
+	try:
+		owner, lock = os.stat(owner_path), os.fstat(fd)
+		if (lock.st_uid, lock.st_gid) != (owner.st_uid, owner.st_gid):
+			os.fchown(fd, owner.st_uid, owner.st_gid)
+	except PermissionError:
+		pass
+	return fd
+
+
+def _copy_ownership(src, dst):
+	"""Keeps mode & owner of the replaced config; new files get the default mode as
+	open() would've created them with, instead of mkstemp's 0600"""
+	try:
+		stat = os.stat(src)
+	except FileNotFoundError:
+		umask = os.umask(0)
+		os.umask(umask)
+		os.chmod(dst, 0o666 & ~umask)
+		return
+
+	os.chmod(dst, stat.st_mode & 0o7777)
+	try:
+		os.chown(dst, stat.st_uid, stat.st_gid)
+	except PermissionError:
+		pass
+
+
+def config_transaction(wrench_path="."):
+	"""Locks and yields the wrench's common_site_config.json for batched changes, eg:
+
+	with config_transaction(wrench_path) as config:
+		config["maintenance_mode"] = 1
+		config.pop("pause_scheduler", None)
+	"""
+	return config_file_transaction(get_config_path(wrench_path), sort_keys=True)
 
 
 def put_config(config, wrench_path="."):
-	config_path = get_config_path(wrench_path)
-	with open(config_path, "w") as f:
-		return json.dump(config, f, indent=1, sort_keys=True)
+	with config_transaction(wrench_path) as current_config:
+		current_config.clear()
+		current_config.update(config)
 
 
 def update_config(new_config, wrench_path="."):
-	config = get_config(wrench_path=wrench_path)
-	config.update(new_config)
-	put_config(config, wrench_path=wrench_path)
+	with config_transaction(wrench_path) as config:
+		config.update(new_config)
 
 
 def get_config_path(wrench_path):
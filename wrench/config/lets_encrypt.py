@@ -8,7 +8,7 @@ import click
 import wrench
 from wrench.config.nginx import make_nginx_conf
 from wrench.config.production_setup import service
-from wrench.config.site_config import get_domains, remove_domain, update_site_config
+from wrench.config.site_config import get_domains, site_config_transaction
 from wrench.wrench import Wrench
 from wrench.utils import exec_cmd, which
 from wrench.utils.wrench import update_common_site_config
@@ -81,14 +81,19 @@ def run_certbot_and_setup_ssl(site, custom_domain, wrench_path, interactive=True
 		"ssl_certificate_key": os.path.join(ssl_path, "privkey.pem"),
 	}
 
-	if custom_domain:
-		remove_domain(site, custom_domain, wrench_path)
-		domains = get_domains(site, wrench_path)
-		ssl_config["domain"] = custom_domain
-		domains.append(ssl_config)
-		update_site_config(site, {"domains": domains}, wrench_path=wrench_path)
-	else:
-		update_site_config(site, ssl_config, wrench_path=wrench_path)
+	with site_config_transaction(site, wrench_path=wrench_path) as config:
+		if custom_domain:
+			domains = [
+				d
+				for d in config.get("domains") or []
+				if d != custom_domain
+				and not (isinstance(d, dict) and d["domain"] == custom_domain)
+			]
+			ssl_config["domain"] = custom_domain
+			domains.append(ssl_config)
+			config["domains"] = domains
+		else:
+			config.update(ssl_config)
 
 	make_nginx_conf(wrench_path)
 	service("nginx", "start")
@@ -195,7 +195,6 @@ def prepare_sites(config, wrench_path):
 
 def get_sites_with_config(wrench_path):
 	from wrench.wrench import Wrench
-	from wrench.config.site_config import get_site_config
 
 	wrench = Wrench(wrench_path)
 	sites = wrench.sites
@@ -205,7 +204,7 @@ def get_sites_with_config(wrench_path):
 	ret = []
 	for site in sites:
 		try:
-			site_config = get_site_config(site, wrench_path=wrench_path)
+			site_config = wrench.site_index.get_config(site)
 		except Exception as e:
 			strict_nginx = conf.get("strict_nginx")
 			if strict_nginx:
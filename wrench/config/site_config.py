@@ -1,27 +1,32 @@
 # imports - standard imports
-import json
 import os
 from collections import defaultdict
 
+# imports - module imports
+from wrench.config.common_site_config import config_file_transaction, read_config_file
+
 
 def get_site_config(site, wrench_path="."):
-	config_path = os.path.join(wrench_path, "sites", site, "site_config.json")
-	if not os.path.exists(config_path):
-		return {}
-	with open(config_path) as f:
-		return json.load(f)
+	return read_config_file(os.path.join(wrench_path, "sites", site, "site_config.json"))
+
+
+def site_config_transaction(site, wrench_path="."):
+	"""Locks and yields the site's site_config.json for batched changes, see
+	`config_file_transaction`"""
+	return config_file_transaction(
+		os.path.join(wrench_path, "sites", site, "site_config.json")
+	)
 
 
 def put_site_config(site, config, wrench_path="."):
-	config_path = os.path.join(wrench_path, "sites", site, "site_config.json")
-	with open(config_path, "w") as f:
-		return json.dump(config, f, indent=1)
+	with site_config_transaction(site, wrench_path=wrench_path) as current_config:
+		current_config.clear()
+		current_config.update(config)
 
 
 def update_site_config(site, new_config, wrench_path="."):
-	config = get_site_config(site, wrench_path=wrench_path)
-	config.update(new_config)
-	put_site_config(site, config, wrench_path=wrench_path)
+	with site_config_transaction(site, wrench_path=wrench_path) as config:
+		config.update(new_config)
 
 
 def set_nginx_port(site, port, wrench_path=".", gen_config=True):
@@ -64,31 +69,33 @@ def set_url_root(site, url_root, wrench_path="."):
 
 
 def add_domain(site, domain, ssl_certificate, ssl_certificate_key, wrench_path="."):
-	domains = get_domains(site, wrench_path)
-	for d in domains:
-		if (isinstance(d, dict) and d["domain"] == domain) or d == domain:
-			print(f"Domain {domain} already exists")
-			return
+	with site_config_transaction(site, wrench_path=wrench_path) as config:
+		domains = config.get("domains") or []
+		for d in domains:
+			if (isinstance(d, dict) and d["domain"] == domain) or d == domain:
+				print(f"Domain {domain} already exists")
+				return
 
-	if ssl_certificate_key and ssl_certificate:
-		domain = {
-			"domain": domain,
-			"ssl_certificate": ssl_certificate,
-			"ssl_certificate_key": ssl_certificate_key,
-		}
+		if ssl_certificate_key and ssl_certificate:
+			domain = {
+				"domain": domain,
+				"ssl_certificate": ssl_certificate,
+				"ssl_certificate_key": ssl_certificate_key,
+			}
 
-	domains.append(domain)
-	update_site_config(site, {"domains": domains}, wrench_path=wrench_path)
+		domains.append(domain)
+		config["domains"] = domains
 
 
 def remove_domain(site, domain, wrench_path="."):
-	domains = get_domains(site, wrench_path)
-	for i, d in enumerate(domains):
-		if (isinstance(d, dict) and d["domain"] == domain) or d == domain:
-			domains.remove(d)
-			break
+	with site_config_transaction(site, wrench_path=wrench_path) as config:
+		domains = config.get("domains") or []
+		for i, d in enumerate(domains):
+			if (isinstance(d, dict) and d["domain"] == domain) or d == domain:
+				domains.remove(d)
+				break
 
-	update_site_config(site, {"domains": domains}, wrench_path=wrench_path)
+		config["domains"] = domains
 
 
 def sync_domains(site, domains, wrench_path="."):
@@ -108,7 +115,7 @@ def sync_domains(site, domains, wrench_path="."):
 
 	if changed:
 		# replace existing domains with this one
-		update_site_config(site, {"domains": domains}, wrench_path=".")
+		update_site_config(site, {"domains": domains}, wrench_path=wrench_path)
 
 	return changed
 
@@ -12,10 +12,9 @@ from wrench.app import use_rq
 from wrench.wrench import Wrench
 from wrench.config.common_site_config import (
 	compute_max_requests_jitter,
-	get_config,
+	config_transaction,
 	get_default_max_requests,
 	get_gunicorn_workers,
-	update_config,
 )
 from wrench.utils import get_wrench_name, which
 
@@ -73,9 +72,11 @@ def generate_supervisor_config(wrench_path, user=None, yes=False, skip_redis=Fal
 	with open(conf_path, "w") as f:
 		f.write(config)
 
-	update_config({"restart_supervisor_on_update": True}, wrench_path=wrench_path)
-	update_config({"restart_systemd_on_update": False}, wrench_path=wrench_path)
-	sync_socketio_port(wrench_path)
+	with config_transaction(wrench_path) as wrench_config:
+		wrench_config.update(
+			{"restart_supervisor_on_update": True, "restart_systemd_on_update": False}
+		)
+		sync_socketio_port(wrench_config)
 
 
 def get_supervisord_conf():
@@ -93,14 +94,12 @@ def get_supervisord_conf():
 			return possibility
 
 
-def sync_socketio_port(wrench_path):
+def sync_socketio_port(common_config):
 	# Backward compatbility: always keep redis_cache and redis_socketio port same
-	common_config = get_config(wrench_path=wrench_path)
-
 	socketio_port = common_config.get("redis_socketio")
 	cache_port = common_config.get("redis_cache")
 	if socketio_port and socketio_port != cache_port:
-		update_config({"redis_socketio": cache_port})
+		common_config["redis_socketio"] = cache_port
 
 
 def can_enable_multi_queue_consumption(wrench_path: str) -> bool:
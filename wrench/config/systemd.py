@@ -104,8 +104,10 @@ def generate_systemd_config(
 	setup_web_config(wrench_info, wrench_path)
 	setup_redis_config(wrench_info, wrench_path)
 
-	update_config({"restart_systemd_on_update": False}, wrench_path=wrench_path)
-	update_config({"restart_supervisor_on_update": False}, wrench_path=wrench_path)
+	update_config(
+		{"restart_systemd_on_update": False, "restart_supervisor_on_update": False},
+		wrench_path=wrench_path,
+	)
 
 
 def setup_systemd_directory(wrench_path):
@@ -0,0 +1,86 @@
+# imports - standard imports
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# imports - third party imports
+import click
+
+# imports - module imports
+from wrench.commands import wrench_command
+
+# wrench modules that may be imported to run `wrench --version`. Anything more than
+# this is a startup regression: command modules must be loaded lazily via the manifest
+ALLOWED_STARTUP_MODULES = {
+	"wrench",
+	"wrench.cli",
+	"wrench.commands",
+	"wrench.config",
+	"wrench.config.common_site_config",
+	"wrench.exceptions",
+	"wrench.utils",
+	"wrench.utils.cli",
+	"wrench.utils.profiler",
+	"wrench.utils.wrench",
+}
+HEAVY_MODULES = {"git", "requests", "jinja2", "semantic_version", "crontab"}
+
+STARTUP_SCRIPT = """
+import json, sys
+sys.argv = ["wrench", "--version"]
+from wrench.cli import cli
+try:
+	cli()
+except SystemExit:
+	pass
+print(json.dumps(sorted(sys.modules)))
+"""
+
+HELP_SCRIPT = """
+import json, sys
+import click
+from wrench.commands import wrench_command
+click.Context(wrench_command).get_help()
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+class TestCLIStartup(unittest.TestCase):
+	def get_startup_modules(self, script=STARTUP_SCRIPT):
+		with tempfile.TemporaryDirectory() as cwd:
+			out = subprocess.check_output(
+				[sys.executable, "-c", script],
+				cwd=cwd,
+				env=dict(os.environ, WRENCH_DEVELOPER="1"),
+				encoding="utf-8",
+			)
+		return set(json.loads(out.splitlines()[-1]))
+
+	def test_version_import_footprint(self):
+		modules = self.get_startup_modules()
+		wrench_modules = {m for m in modules if m == "wrench" or m.startswith("wrench.")}
+
+		self.assertSetEqual(wrench_modules - ALLOWED_STARTUP_MODULES, set())
+		self.assertSetEqual(modules & HEAVY_MODULES, set())
+
+	def test_help_import_footprint(self):
+		modules = self.get_startup_modules(HELP_SCRIPT)
+
+		self.assertSetEqual({m for m in modules if m.startswith("wrench.commands.")}, set())
+		self.assertSetEqual(modules & HEAVY_MODULES, set())
+
+	def test_lazy_commands_resolve(self):
+		ctx = click.Context(wrench_command)
+
+		for name in wrench_command.list_commands(ctx):
+			cmd = wrench_command.get_command(ctx, name)
+			self.assertIsInstance(cmd, click.Command, name)
+
+			cmd_names = cmd.name if isinstance(cmd.name, list) else [cmd.name]
+			self.assertIn(name, cmd_names)
+
+			# listed in `wrench --help` before the command is imported
+			self.assertEqual(wrench_command.lazy_help[name], cmd.get_short_help_str(1000), name)
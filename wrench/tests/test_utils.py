@@ -1,12 +1,58 @@
+import multiprocessing
 import os
 import shutil
 import subprocess
+import sys
+import tempfile
+import time
 import unittest
+from unittest.mock import patch
 
-from wrench.app import App
+from wrench.app import App, install_app, pull_apps
 from wrench.wrench import Wrench
-from wrench.exceptions import InvalidRemoteException
-from wrench.utils import is_valid_saashq_branch
+from wrench.exceptions import CommandFailedError, InvalidRemoteException
+from wrench.config.common_site_config import get_config, get_config_path, update_config
+from wrench.config.site_config import get_site_config, put_site_config
+from wrench.utils.daemon import run_via_daemon, start_daemon, stop_daemon
+from wrench.utils.bytecode import (
+	compile_bytecode,
+	get_changed_files,
+	precompile,
+	refresh_bytecode,
+)
+from wrench.utils.env_template import (
+	TEMPLATE_MANIFEST,
+	clone_env_template,
+	get_env_template_path,
+)
+from wrench.utils.installer import get_install_cmd, get_python_installer
+from wrench.utils.node_store import (
+	get_store_usage,
+	link_apps_node_modules,
+	prune_node_store,
+)
+from wrench.utils.wheelhouse import (
+	get_wheels,
+	parse_wheel_name,
+	pip_install,
+	prune_wheelhouse,
+)
+from wrench.utils.wrench import (
+	check_app_imports,
+	clone_apps_from,
+	exchange_paths,
+	get_env_distributions,
+	install_python_dev_dependencies,
+	link_apps_from,
+	patch_sites,
+)
+from wrench.utils import (
+	cache_wrench_helper_output,
+	exec_cmds_concurrently,
+	get_git_head,
+	get_saashq_apps,
+	is_valid_saashq_branch,
+)
 
 
 class TestUtils(unittest.TestCase):
@@ -104,3 +150,789 @@ class TestUtils(unittest.TestCase):
 		self.assertEqual(
 			(app.use_ssh, app.org, app.repo, app.app_name), (True, "saashq", "saashq", "saashq")
 		)
+
+	def test_wrench_helper_cache(self):
+		calls = []
+
+		@cache_wrench_helper_output("commands")
+		def get_commands(wrench_path="."):
+			calls.append(wrench_path)
+			return ["migrate"]
+
+		with tempfile.TemporaryDirectory() as wrench_path:
+			git_dir = os.path.join(wrench_path, "apps", "saashq", ".git")
+			os.makedirs(os.path.join(git_dir, "refs", "heads"))
+			with open(os.path.join(git_dir, "HEAD"), "w") as f:
+				f.write("ref: refs/heads/develop\n")
+			with open(os.path.join(git_dir, "refs", "heads", "develop"), "w") as f:
+				f.write("a" * 40)
+
+			self.assertEqual(get_commands(wrench_path=wrench_path), ["migrate"])
+			self.assertEqual(get_commands(wrench_path=wrench_path), ["migrate"])
+			self.assertEqual(len(calls), 1)
+
+			# app moved to another commit
+			with open(os.path.join(git_dir, "refs", "heads", "develop"), "w") as f:
+				f.write("b" * 40)
+
+			self.assertEqual(get_commands(wrench_path=wrench_path), ["migrate"])
+			self.assertEqual(len(calls), 2)
+
+			# command modules edited in place, in developer mode
+			commands_path = os.path.join(wrench_path, "apps", "saashq", "saashq", "commands")
+			os.makedirs(commands_path)
+			open(os.path.join(commands_path, "site.py"), "w").close()
+			get_commands(wrench_path=wrench_path)
+			os.utime(os.path.join(commands_path, "site.py"), (0, 0))
+			get_commands(wrench_path=wrench_path)
+			self.assertEqual(len(calls), 4)
+
+	def test_get_git_head(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			repo, worktree = os.path.join(tmp, "repo"), os.path.join(tmp, "worktree")
+			os.makedirs(repo)
+			git("init", "-q", cwd=repo)
+			git("commit", "-q", "--allow-empty", "-m", "init", cwd=repo)
+			git("worktree", "add", "-q", "--detach", worktree, cwd=repo)
+
+			head = git("rev-parse", "HEAD", cwd=repo).strip()
+			self.assertEqual(get_git_head(repo), head)
+			# .git is a file in worktrees
+			self.assertEqual(get_git_head(worktree), head)
+			self.assertIsNone(get_git_head(tmp))
+
+	def test_get_saashq_apps(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			apps_path = os.path.join(wrench_path, "apps")
+			make_app(os.path.join(apps_path, "saashq"))
+			make_app(os.path.join(apps_path, "erp-next"), "erp")
+			# app-like files are looked for in the app's top level folders only
+			make_app(os.path.join(apps_path, "assets", "node_modules"), "pkg")
+
+			# not a wrench, no manifest is written
+			self.assertEqual(sorted(get_saashq_apps(wrench_path)), ["erp-next", "saashq"])
+			self.assertFalse(os.path.exists(os.path.join(wrench_path, "sites")))
+
+			os.makedirs(os.path.join(wrench_path, "sites"))
+			self.assertEqual(sorted(get_saashq_apps(wrench_path)), ["erp-next", "saashq"])
+			manifest_path = os.path.join(wrench_path, "sites", ".wrench_cache", "apps.json")
+			self.assertTrue(os.path.exists(manifest_path))
+
+			os.remove(os.path.join(apps_path, "saashq", "saashq", "hooks.py"))
+			self.assertEqual(get_saashq_apps(wrench_path), ["erp-next"])
+
+			# the module folder of erp-next isn't named after it
+			os.remove(os.path.join(apps_path, "erp-next", "erp", "hooks.py"))
+			self.assertEqual(get_saashq_apps(wrench_path), [])
+
+	def test_get_env_distributions(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			site_packages = os.path.join(
+				wrench_path, "env", "lib", "python3.11", "site-packages"
+			)
+			app_path = os.path.join(wrench_path, "apps", "saashq")
+
+			dist_info = os.path.join(site_packages, "Saashq_App-1.0.0.dist-info")
+			os.makedirs(dist_info)
+			with open(os.path.join(dist_info, "METADATA"), "w") as f:
+				f.write("Metadata-Version: 2.1\nName: Saashq.App\nVersion: 1.0.0\n\nName: body\n")
+
+			editable_info = os.path.join(site_packages, "saashq-15.0.0.dist-info")
+			os.makedirs(editable_info)
+			with open(os.path.join(editable_info, "METADATA"), "w") as f:
+				f.write("Name: saashq\nVersion: 15.0.0\n")
+			with open(os.path.join(editable_info, "direct_url.json"), "w") as f:
+				f.write(f'{{"url": "file://{app_path}", "dir_info": {{"editable": true}}}}')
+
+			with open(os.path.join(site_packages, "legacy-app.egg-link"), "w") as f:
+				f.write(f"{wrench_path}/apps/legacy_app\n.")
+
+			distributions = get_env_distributions(wrench_path)
+
+			self.assertEqual(set(distributions), {"saashq-app", "saashq", "legacy-app"})
+			self.assertEqual(distributions["saashq-app"]["version"], "1.0.0")
+			self.assertIsNone(distributions["saashq-app"]["editable"])
+			self.assertEqual(distributions["saashq"]["editable"], app_path)
+			self.assertEqual(
+				distributions["legacy-app"]["editable"],
+				os.path.join(wrench_path, "apps", "legacy_app"),
+			)
+
+	def test_site_config_cache(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			os.makedirs(os.path.join(wrench_path, "sites", "test.local"))
+			self.assertEqual(get_site_config("test.local", wrench_path=wrench_path), {})
+
+			put_site_config("test.local", {"db_name": "a", "domains": []}, wrench_path=wrench_path)
+			config = get_site_config("test.local", wrench_path=wrench_path)
+			self.assertEqual(config, {"db_name": "a", "domains": []})
+
+			# callers get a copy, not the cached config
+			config["domains"].append("a.com")
+			self.assertEqual(get_site_config("test.local", wrench_path=wrench_path)["domains"], [])
+
+			put_site_config("test.local", {"db_name": "b"}, wrench_path=wrench_path)
+			self.assertEqual(get_site_config("test.local", wrench_path=wrench_path), {"db_name": "b"})
+
+	def test_concurrent_config_updates(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			os.makedirs(os.path.join(wrench_path, "sites"))
+			update_config({"initial": True}, wrench_path=wrench_path)
+
+			processes = [
+				multiprocessing.Process(target=_update_config_keys, args=(wrench_path, n))
+				for n in range(4)
+			]
+			for p in processes:
+				p.start()
+			for p in processes:
+				p.join()
+
+			config = get_config(wrench_path)
+			self.assertEqual(len(config), 4 * 25 + 1)
+			self.assertEqual(
+				[f for f in os.listdir(os.path.join(wrench_path, "sites")) if f.endswith(".tmp")],
+				[],
+			)
+
+	@unittest.skipUnless(os.geteuid() == 0, "needs root to create root owned lock files")
+	def test_config_lock_ownership(self):
+		nobody = 65534
+		with tempfile.TemporaryDirectory() as wrench_path:
+			sites_path = os.path.join(wrench_path, "sites")
+			os.makedirs(sites_path)
+			lock_path = os.path.join(sites_path, ".common_site_config.json.lock")
+
+			# a lock file left by root, eg. by `setup production`
+			update_config({"root": True}, wrench_path=wrench_path)
+			for path in (wrench_path, sites_path, get_config_path(wrench_path)):
+				os.chown(path, nobody, nobody)
+			os.chown(lock_path, 0, 0)
+
+			p = multiprocessing.Process(target=_update_config_as, args=(wrench_path, nobody))
+			p.start()
+			p.join()
+			self.assertEqual(p.exitcode, 0)
+			self.assertTrue(get_config(wrench_path)["user"])
+
+			update_config({"root": False}, wrench_path=wrench_path)
+			self.assertEqual(os.stat(lock_path).st_uid, nobody)
+
+	def test_wrench_sites(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			sites_path = os.path.join(wrench_path, "sites")
+			os.makedirs(os.path.join(sites_path, "assets"))
+			os.makedirs(os.path.join(sites_path, "a.local"))
+			put_site_config("a.local", {"db_name": "a"}, wrench_path=wrench_path)
+
+			# sites are looked up in the wrench, regardless of the current directory
+			wrench = Wrench(wrench_path)
+			self.assertEqual(wrench.sites, ["a.local"])
+			self.assertEqual(wrench.site_index.get_config("a.local"), {"db_name": "a"})
+
+			os.makedirs(os.path.join(sites_path, "b.local"))
+			self.assertEqual(wrench.sites, ["a.local"])
+			put_site_config("b.local", {"db_name": "b"}, wrench_path=wrench_path)
+			self.assertEqual(sorted(wrench.sites), ["a.local", "b.local"])
+
+			shutil.rmtree(os.path.join(sites_path, "a.local"))
+			self.assertEqual(wrench.sites, ["b.local"])
+
+	def test_exec_cmds_concurrently(self):
+		with tempfile.TemporaryDirectory() as cwd:
+			exec_cmds_concurrently(
+				[(f"touch {n}", f"touch {n}", cwd) for n in range(4)], jobs=2
+			)
+			self.assertEqual(sorted(os.listdir(cwd)), ["0", "1", "2", "3"])
+
+			with self.assertRaises(CommandFailedError) as e:
+				exec_cmds_concurrently(
+					[("ok", "true", cwd), ("broken", "sh -c 'exit 3'", cwd)], jobs=2
+				)
+			self.assertIn("broken", str(e.exception))
+			self.assertIn("code 3", str(e.exception))
+
+	def test_dependency_fingerprints(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			make_app(os.path.join(wrench_path, "apps", "saashq"))
+			os.makedirs(os.path.join(wrench_path, "sites"))
+			pyproject_path = os.path.join(wrench_path, "apps", "saashq", "pyproject.toml")
+			with open(pyproject_path, "w") as f:
+				f.write('dependencies = ["click"]\n')
+
+			dist_info = os.path.join(
+				wrench_path, "env", "lib", "python3.11", "site-packages", "saashq-1.0.dist-info"
+			)
+			os.makedirs(dist_info)
+			with open(os.path.join(dist_info, "METADATA"), "w") as f:
+				f.write("Name: saashq\nVersion: 1.0\n")
+
+			apps = Wrench(wrench_path).apps
+			apps.states = {"saashq": {}}
+			self.assertEqual(apps.get_changed_dependencies(["saashq"], "python"), ["saashq"])
+
+			apps.update_dependency_fingerprints(["saashq"], "python")
+			self.assertEqual(apps.get_changed_dependencies(["saashq"], "python"), [])
+
+			with open(pyproject_path, "a") as f:
+				f.write('requires-python = ">=3.10"\n')
+			self.assertEqual(apps.get_changed_dependencies(["saashq"], "python"), ["saashq"])
+
+	def test_install_python_dev_dependencies(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			os.makedirs(os.path.join(wrench_path, "sites"))
+			dev_dependencies = {
+				"saashq": 'pytest = "~=7.0"\n',
+				"demo": 'pytest = "~=7.0"\nsix = "1.0"\n',
+			}
+			for app, deps in dev_dependencies.items():
+				make_app(os.path.join(wrench_path, "apps", app))
+				with open(os.path.join(wrench_path, "apps", app, "pyproject.toml"), "w") as f:
+					f.write(f"[tool.wrench.dev-dependencies]\n{deps}")
+
+			dist_info = os.path.join(
+				wrench_path, "env", "lib", "python3.11", "site-packages", "six-1.0.dist-info"
+			)
+			os.makedirs(dist_info)
+			with open(os.path.join(dist_info, "METADATA"), "w") as f:
+				f.write("Name: six\nVersion: 1.0\n")
+
+			wrench = Wrench(wrench_path)
+			wrench.apps.states = {"saashq": {}, "demo": {}}
+			with patch("wrench.wrench.exec_cmd") as run:
+				install_python_dev_dependencies(wrench_path, apps=["saashq", "demo"])
+				install_python_dev_dependencies(wrench_path, apps=["saashq", "demo"])
+
+			run.assert_called_once()
+			self.assertTrue(run.call_args[0][0].endswith(" pytest~=7.0"))
+
+	def test_install_app_dev_fingerprint(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			os.makedirs(os.path.join(wrench_path, "sites"))
+			update_config({"developer_mode": 1}, wrench_path=wrench_path)
+			for app in ("saashq", "demo"):
+				module_path = make_app(os.path.join(wrench_path, "apps", app))
+				with open(os.path.join(module_path, "__init__.py"), "w") as f:
+					f.write('__version__ = "15.0.0"\n')
+				with open(os.path.join(wrench_path, "apps", app, "pyproject.toml"), "w") as f:
+					f.write('[tool.wrench.dev-dependencies]\npytest = "~=7.0"\n')
+
+			with patch("wrench.app.logger"), patch("wrench.utils.wheelhouse.pip_install"), patch(
+				"wrench.utils.wheelhouse.populate_wheelhouse"
+			), patch("wrench.wrench.exec_cmd") as run:
+				install_app("demo", wrench_path=wrench_path, restart_wrench=False, skip_assets=True)
+				install_python_dev_dependencies(wrench_path, apps=["demo"])
+
+			# the new app's dev fingerprint is recorded, so it's not installed twice
+			run.assert_called_once()
+
+	def test_prune_wheelhouse(self):
+		with tempfile.TemporaryDirectory() as home, patch.dict(os.environ, {"HOME": home}):
+			wheelhouse = os.path.join(home, ".cache", "wrench", "wheels")
+			os.makedirs(wheelhouse)
+			for n, name in enumerate(("old-1.0-py3-none-any.whl", "New_Pkg-2.0-py3-none-any.whl")):
+				path = os.path.join(wheelhouse, name)
+				with open(path, "wb") as f:
+					f.write(b"0" * 600_000)
+				os.utime(path, (n, n))
+
+			prune_wheelhouse(size_budget=1, quiet=True)
+
+			wheels = get_wheels()
+			self.assertEqual([parse_wheel_name(w) for w in wheels], [("new-pkg", "2.0")])
+
+	def test_pip_install(self):
+		with tempfile.TemporaryDirectory() as home, patch.dict(os.environ, {"HOME": home}):
+			wrench_path = os.path.join(home, "wrench")
+			os.makedirs(os.path.join(wrench_path, "sites"))
+
+			def install_cmd(reachable=True):
+				with patch("wrench.utils.wheelhouse.exec_cmd") as exec_cmd, patch(
+					"wrench.utils.wheelhouse.is_package_index_reachable", return_value=reachable
+				):
+					pip_install("env/bin/python", "-e apps/saashq", cwd=wrench_path, installer="pip")
+				exec_cmd.assert_called_once()
+				return exec_cmd.call_args[0][0]
+
+			# the index is used even if the wheelhouse has wheels, so upgrades get releases
+			self.assertNotIn("--no-index", install_cmd())
+			self.assertIn(f"--find-links {home}/.cache/wrench/wheels", install_cmd())
+			self.assertIn("--no-index", install_cmd(reachable=False))
+
+			update_config({"offline_installs": 1}, wrench_path=wrench_path)
+			self.assertIn("--no-index", install_cmd())
+
+	def test_clone_env_template(self):
+		with tempfile.TemporaryDirectory() as home, patch.dict(os.environ, {"HOME": home}):
+			template = get_env_template_path(sys.executable)
+			os.makedirs(template / "bin")
+			os.makedirs(template / "lib")
+			(template / "bin" / "saashq").write_text("#!/old/env/bin/python\nimport saashq\n")
+			(template / "bin" / "python").symlink_to(sys.executable)
+			(template / "pyvenv.cfg").write_text("command = python -m venv /old/env\n")
+			(template / "lib" / "six.py").write_text("")
+			(template / TEMPLATE_MANIFEST).write_text(
+				'{"path": "/old/env", "distributions": {"six": "1.16.0"}}'
+			)
+
+			env_path = os.path.join(home, "wrench", "env")
+			self.assertTrue(clone_env_template(sys.executable, env_path))
+
+			with open(os.path.join(env_path, "bin", "saashq")) as f:
+				self.assertEqual(f.readline(), f"#!{env_path}/bin/python\n")
+			with open(os.path.join(env_path, "pyvenv.cfg")) as f:
+				self.assertIn(f"-m venv {env_path}", f.read())
+			self.assertTrue(os.path.islink(os.path.join(env_path, "bin", "python")))
+			self.assertTrue(os.path.exists(os.path.join(env_path, "lib", "six.py")))
+			self.assertFalse(os.path.exists(os.path.join(env_path, TEMPLATE_MANIFEST)))
+			self.assertIn("/old/env", (template / "bin" / "saashq").read_text())
+
+			(template / TEMPLATE_MANIFEST).unlink()
+			self.assertFalse(clone_env_template(sys.executable, os.path.join(home, "env")))
+
+	def test_python_installer(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			os.makedirs(os.path.join(wrench_path, "sites"))
+			self.assertEqual(get_python_installer(wrench_path), "pip")
+			self.assertEqual(
+				get_install_cmd("env/bin/python", "pip"),
+				"env/bin/python -m pip install --quiet --upgrade",
+			)
+
+			update_config({"python_installer": "uv"}, wrench_path=wrench_path)
+			with patch("wrench.utils.installer.which", return_value="/usr/bin/uv"):
+				self.assertEqual(get_python_installer(wrench_path), "uv")
+				self.assertEqual(
+					get_install_cmd("env/bin/python", "uv"),
+					"/usr/bin/uv pip install --python env/bin/python --quiet",
+				)
+			with patch("wrench.utils.installer.which", return_value=None):
+				self.assertEqual(get_python_installer(wrench_path), "pip")
+
+	def test_node_modules_store(self):
+		with tempfile.TemporaryDirectory() as home, patch.dict(os.environ, {"HOME": home}):
+			wrench_path = os.path.join(home, "wrench")
+			os.makedirs(os.path.join(wrench_path, "sites"))
+			paths = [
+				os.path.join(wrench_path, "apps", "a", "node_modules", "vue", "index.js"),
+				os.path.join(wrench_path, "apps", "b", "frontend", "node_modules", "vue", "index.js"),
+			]
+			for path in paths:
+				os.makedirs(os.path.dirname(path))
+				with open(path, "w") as f:
+					f.write("export default {}\n" * 100)
+
+			link_apps_node_modules(wrench_path)
+			self.assertNotEqual(os.stat(paths[0]).st_ino, os.stat(paths[1]).st_ino)
+
+			update_config({"node_modules_store": 1}, wrench_path=wrench_path)
+			link_apps_node_modules(wrench_path)
+			self.assertEqual(os.stat(paths[0]).st_ino, os.stat(paths[1]).st_ino)
+			self.assertEqual(get_store_usage(), (1, 1800, 1800, 0))
+
+			shutil.rmtree(os.path.join(wrench_path, "apps"))
+			self.assertEqual(prune_node_store(), 1800)
+			self.assertEqual(get_store_usage(), (0, 0, 0, 0))
+
+	def test_check_app_imports(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			app_paths = []
+			for app, module in (("saashq", "saashq"), ("erp-next", "erp")):
+				app_paths.append(os.path.join(wrench_path, "apps", app))
+				make_app(app_paths[-1], module, files=["__init__.py"])
+
+			with patch.dict(os.environ, {"PYTHONPATH": os.pathsep.join(app_paths)}):
+				check_app_imports(sys.executable, ["saashq", "erp-next"], wrench_path)
+
+				with open(os.path.join(app_paths[-1], "erp", "__init__.py"), "w") as f:
+					f.write("raise ImportError\n")
+				with self.assertRaises(CommandFailedError):
+					check_app_imports(sys.executable, ["saashq", "erp-next"], wrench_path)
+
+	def test_exchange_paths(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			a, b = os.path.join(tmp, "a"), os.path.join(tmp, "b")
+			os.makedirs(os.path.join(a, "new"))
+			os.makedirs(os.path.join(b, "old"))
+
+			exchange_paths(a, b)
+			self.assertEqual(os.listdir(a), ["old"])
+			self.assertEqual(os.listdir(b), ["new"])
+
+	def test_clone_apps_from(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			source, target = os.path.join(tmp, "source"), os.path.join(tmp, "target")
+			os.makedirs(os.path.join(source, "sites"))
+			with open(os.path.join(source, "sites", "apps.txt"), "w") as f:
+				f.write("saashq\ndemo")
+			for app in ("saashq", "demo"):
+				module_path = make_app(os.path.join(source, "apps", app))
+				with open(os.path.join(module_path, "__init__.py"), "w") as f:
+					f.write('__version__ = "15.0.0"\n')
+				with open(os.path.join(source, "apps", app, "pyproject.toml"), "w") as f:
+					f.write(f'[project]\nname = "{app}"\n')
+				git("init", "-q", cwd=os.path.join(source, "apps", app))
+				git("add", ".", cwd=os.path.join(source, "apps", app))
+				git("commit", "-qm", "init", cwd=os.path.join(source, "apps", app))
+
+			# as in init, the wrench is cached before apps are copied into it
+			os.makedirs(os.path.join(target, "sites"))
+			Wrench(target)
+			with patch("wrench.app.logger"), patch("wrench.wrench.exec_cmd"), patch(
+				"wrench.utils.wheelhouse.pip_install"
+			), patch("wrench.utils.wheelhouse.populate_wheelhouse"), patch(
+				"wrench.wrench.WrenchSetup.node"
+			):
+				clone_apps_from(target, source, update_app=False)
+
+			states = Wrench(target).apps.states
+			for app in ("saashq", "demo"):
+				self.assertIn("python", states[app]["dependency_fingerprints"])
+
+	def test_link_apps_from(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			source, target = os.path.join(tmp, "source"), os.path.join(tmp, "target")
+			app_path = os.path.join(source, "apps", "demo")
+			os.makedirs(os.path.join(app_path, "demo", "public", "dist"))
+			os.makedirs(os.path.join(source, "apps", "plain"))
+			with open(os.path.join(app_path, "demo", "__init__.py"), "w") as f:
+				f.write("")
+			with open(os.path.join(app_path, "demo", "public", "dist", "demo.js"), "w") as f:
+				f.write("")
+
+			git("init", "-q", cwd=app_path)
+			git("add", "demo/__init__.py", cwd=app_path)
+			git("commit", "-qm", "init", cwd=app_path)
+			git("remote", "add", "upstream", "https://example.com/demo.git", cwd=app_path)
+			worktree_path = os.path.join(source, "apps", "worktree")
+			git("worktree", "add", "-q", "-b", "feature", worktree_path, cwd=app_path)
+
+			# cp without --reflink, as on macOS
+			with patch("wrench.utils.env_template.subprocess.call", return_value=1):
+				link_apps_from(target, source)
+
+			target_app = os.path.join(target, "apps", "demo")
+			remotes = subprocess.check_output(["git", "remote", "-v"], cwd=target_app, text=True)
+			self.assertEqual(set(remotes.split()[::3]), {"upstream"})
+			self.assertIn("https://example.com/demo.git", remotes)
+			self.assertTrue(os.path.exists(os.path.join(target_app, "demo", "__init__.py")))
+			self.assertTrue(
+				os.path.exists(os.path.join(target_app, "demo", "public", "dist", "demo.js"))
+			)
+			self.assertTrue(os.path.isdir(os.path.join(target, "apps", "plain")))
+			# cloned, not copied along with the .git file pointing to the source
+			self.assertTrue(os.path.isdir(os.path.join(target, "apps", "worktree", ".git")))
+			self.assertEqual(
+				git("branch", "--show-current", cwd=os.path.join(target, "apps", "worktree")),
+				"feature\n",
+			)
+
+	def test_pull_apps(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			wrench_path = os.path.join(tmp, "wrench")
+			os.makedirs(os.path.join(wrench_path, "sites"))
+			for app in ("saashq", "demo"):
+				work, remote = os.path.join(tmp, app), os.path.join(tmp, f"{app}.git")
+				make_app(work)
+				git("init", "-q", "-b", "develop", cwd=work)
+				git("add", ".", cwd=work)
+				git("commit", "-q", "-m", "init", cwd=work)
+				git("clone", "-q", "--bare", work, remote, cwd=tmp)
+				git("clone", "-q", remote, os.path.join(wrench_path, "apps", app), cwd=tmp)
+
+			demo = os.path.join(tmp, "demo")
+			git("commit", "-q", "--allow-empty", "-m", "fix", cwd=demo)
+			git("push", "-q", f"{demo}.git", "develop", cwd=demo)
+
+			with patch("wrench.app.click.echo") as echo:
+				pull_apps(apps=["saashq", "demo"], wrench_path=wrench_path, jobs=2)
+
+			def head(path, rev="HEAD"):
+				return git("rev-parse", "--short", rev, cwd=path).strip()
+
+			demo_path = os.path.join(wrench_path, "apps", "demo")
+			self.assertEqual(head(demo_path), head(demo))
+			summary = [call[0][0].split() for call in echo.call_args_list[1:]]
+			self.assertEqual(
+				[(row[0], row[1], " ".join(row[3:])) for row in summary],
+				[
+					("saashq", head(os.path.join(tmp, "saashq")), "up to date"),
+					("demo", f"{head(demo, 'HEAD~1')}→{head(demo)}", "updated"),
+				],
+			)
+
+			# ssh fails like it does when it'd need to prompt, if prompts are turned off
+			ssh = 'test "$2" = BatchMode=yes && echo "Permission denied (publickey)." >&2; exit 255'
+			git("remote", "set-url", "origin", "git@localhost:demo.git", cwd=demo_path)
+			with patch.dict(os.environ, {"GIT_SSH_COMMAND": f"sh -c '{ssh}' ssh"}), patch(
+				"wrench.app.log"
+			) as log, patch("wrench.app.click.echo"):
+				with self.assertRaises(CommandFailedError):
+					pull_apps(apps=["saashq", "demo"], wrench_path=wrench_path, jobs=2)
+
+			self.assertEqual(log.call_count, 1)
+			self.assertIn("Run `git fetch` in", log.call_args[0][0])
+			self.assertEqual(head(demo_path), head(demo))
+
+	def test_refresh_bytecode(self):
+		import importlib.util
+		import py_compile
+
+		with tempfile.TemporaryDirectory() as repo:
+			for module in ("changed", "unchanged", "removed"):
+				with open(os.path.join(repo, f"{module}.py"), "w") as f:
+					f.write("x = 1\n")
+			git("init", "-q", cwd=repo)
+			git("add", ".", cwd=repo)
+			git("commit", "-qm", "init", cwd=repo)
+			old_commit = git("rev-parse", "HEAD", cwd=repo).strip()
+
+			pycs = {}
+			for module in ("changed", "unchanged", "removed"):
+				source = os.path.join(repo, f"{module}.py")
+				pycs[module] = importlib.util.cache_from_source(source)
+				py_compile.compile(source)
+			unchanged_mtime = os.stat(pycs["unchanged"]).st_mtime_ns
+
+			with open(os.path.join(repo, "changed.py"), "w") as f:
+				f.write("x = 2\n")
+			git("rm", "-q", "removed.py", cwd=repo)
+			git("commit", "-qam", "change", cwd=repo)
+			os.utime(pycs["changed"], (0, 0))
+
+			changed_files = get_changed_files(repo, old_commit, "HEAD")
+			self.assertEqual(sorted(changed_files), ["changed.py", "removed.py"])
+
+			refresh_bytecode(sys.executable, {repo: changed_files})
+
+			self.assertFalse(os.path.exists(pycs["removed"]))
+			self.assertNotEqual(os.stat(pycs["changed"]).st_mtime_ns, 0)
+			self.assertEqual(os.stat(pycs["unchanged"]).st_mtime_ns, unchanged_mtime)
+
+	def test_compile_bytecode(self):
+		import importlib.util
+
+		with tempfile.TemporaryDirectory() as tmp:
+			# records the process compiling each file, slowly enough for all workers to get some
+			with open(os.path.join(tmp, "sitecustomize.py"), "w") as f:
+				f.write(
+					"import compileall, os, time\n"
+					"compile_file = compileall.compile_file\n"
+					"def record(*args, **kwargs):\n"
+					"	with open(os.environ['COMPILE_PIDS'], 'a') as f:\n"
+					"		f.write(f'{os.getpid()}\\n')\n"
+					"	time.sleep(0.1)\n"
+					"	return compile_file(*args, **kwargs)\n"
+					"compileall.compile_file = record\n"
+				)
+			sources = [os.path.join(tmp, f"module_{n}.py") for n in range(8)]
+			for source in sources:
+				with open(source, "w") as f:
+					f.write("x = 1\n")
+
+			pids = os.path.join(tmp, "pids")
+			with patch.dict(os.environ, {"PYTHONPATH": tmp, "COMPILE_PIDS": pids}):
+				compile_bytecode(sys.executable, sources, jobs=4)
+
+			with open(pids) as f:
+				self.assertGreater(len(set(f.read().split())), 1)
+			for source in sources:
+				self.assertTrue(os.path.exists(importlib.util.cache_from_source(source)))
+
+	def test_precompile(self):
+		import importlib.util
+
+		with tempfile.TemporaryDirectory() as tmp:
+			# hidden folders are only skipped within apps
+			wrench_path = os.path.join(tmp, ".benches", "wrench")
+			os.makedirs(os.path.join(wrench_path, "env", "bin"))
+			os.symlink(sys.executable, os.path.join(wrench_path, "env", "bin", "python"))
+			sources = {}
+			for folder in ("demo", "node_modules", ".github"):
+				os.makedirs(os.path.join(wrench_path, "apps", "demo", folder))
+				sources[folder] = os.path.join(wrench_path, "apps", "demo", folder, "x.py")
+				with open(sources[folder], "w") as f:
+					f.write("x = 1\n")
+
+			precompile(wrench_path)
+
+			self.assertTrue(os.path.exists(importlib.util.cache_from_source(sources["demo"])))
+			for folder in ("node_modules", ".github"):
+				self.assertFalse(os.path.exists(importlib.util.cache_from_source(sources[folder])))
+
+	def test_build_changed(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			apps = ("saashq", "demo", "crm")
+			assets_path = os.path.join(wrench_path, "sites", "assets")
+			for app in apps:
+				app_path = os.path.join(wrench_path, "apps", app)
+				module_path = make_app(app_path, files=["public/js/app.js"])
+				os.makedirs(os.path.join(module_path, "public", "dist"))
+				os.makedirs(os.path.join(assets_path, app))
+			with open(os.path.join(assets_path, "assets.json"), "w") as f:
+				f.write("{}")
+
+			wrench = Wrench(wrench_path)
+			wrench.apps.states = {app: {} for app in apps}
+
+			def change(app, path):
+				with open(os.path.join(wrench_path, "apps", app, app, path), "w") as f:
+					f.write("// changed")
+
+			with patch("wrench.wrench.run_saashq_cmd") as build, patch(
+				"wrench.utils.wrench.exec_cmd"
+			) as build_apps:
+				wrench.build_changed()
+				build.assert_called_once()
+
+				# build output & backend changes don't need a build
+				for path in ("public/dist/app.bundle.js", "hooks.py"):
+					change("demo", path)
+				wrench.build_changed()
+				build_apps.assert_not_called()
+
+				change("demo", "public/js/app.js")
+				change("crm", "public/js/app.js")
+				wrench.build_changed()
+				wrench.build_changed()
+				build.assert_called_once()
+				build_apps.assert_called_once()
+				self.assertEqual(build_apps.call_args[0][0], "wrench build --apps crm,demo")
+
+				# nor does a missing build output go unnoticed
+				shutil.rmtree(os.path.join(assets_path, "crm"))
+				wrench.build_changed()
+				self.assertEqual(build_apps.call_args[0][0], "wrench build --apps crm")
+				os.remove(os.path.join(assets_path, "assets.json"))
+				wrench.build_changed()
+				self.assertEqual(build.call_count, 2)
+
+	def test_patch_sites(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			os.makedirs(os.path.join(wrench_path, "sites", "site1"))
+			with open(os.path.join(wrench_path, "sites", "site1", "site_config.json"), "w") as f:
+				f.write("{}")
+			for app in ("saashq", "demo"):
+				app_path = os.path.join(wrench_path, "apps", app)
+				make_app(app_path, files=["core/doctype/todo/todo.json"])
+			demo_path = os.path.join(wrench_path, "apps", "demo")
+			git("init", "-q", cwd=demo_path)
+			git("add", ".", cwd=demo_path)
+			git("commit", "-qm", "init", cwd=demo_path)
+
+			def change(path):
+				with open(os.path.join(demo_path, "demo", path), "w") as f:
+					f.write("{}")
+
+			with patch("wrench.utils.system.migrate_site") as migrate_site, patch(
+				"wrench.utils.system.clear_site_cache"
+			) as clear_site_cache:
+				decisions = [patch_sites(wrench_path)["site1"].split(",")[0]]
+				decisions.append(patch_sites(wrench_path)["site1"])
+				change("core/doctype/todo/todo.py")
+				decisions.append(patch_sites(wrench_path)["site1"].split(",")[0])
+				git("add", ".", cwd=demo_path)
+				git("commit", "-qm", "fix", cwd=demo_path)
+				decisions.append(patch_sites(wrench_path)["site1"])
+				decisions.append(patch_sites(wrench_path)["site1"].split(",")[0])
+				change("core/doctype/todo/todo.json")
+				decisions.append(patch_sites(wrench_path)["site1"])
+				decisions.append(patch_sites(wrench_path, force=True)["site1"])
+
+			self.assertEqual(migrate_site.call_count, 3)
+			clear_site_cache.assert_called_once()
+			self.assertEqual(
+				decisions,
+				[
+					"migrated",
+					"skipped, no changes to patches, hooks or DocTypes",
+					"skipped",
+					"skipped, cleared caches for new commits in demo",
+					"skipped",
+					"migrated, changes in demo",
+					"migrated, forced",
+				],
+			)
+
+	def test_daemon(self):
+		with tempfile.TemporaryDirectory() as wrench_path:
+			for folder in ("config/pids", "logs", "sites", "env/bin", "lib/saashq/utils"):
+				os.makedirs(os.path.join(wrench_path, folder))
+			os.symlink(sys.executable, os.path.join(wrench_path, "env", "bin", "python"))
+
+			lib_path = os.path.join(wrench_path, "lib")
+			for package in ("saashq", "saashq/utils"):
+				open(os.path.join(lib_path, package, "__init__.py"), "w").close()
+			# a top level module named like one of wrench/utils
+			with open(os.path.join(lib_path, "render.py"), "w") as f:
+				f.write("SOURCE = 'framework'\n")
+			with open(os.path.join(lib_path, "saashq", "utils", "wrench_helper.py"), "w") as f:
+				f.write(
+					"import os, sys, render\n"
+					"if __name__ == '__main__':\n"
+					"	with open(os.environ['OUTPUT'], 'w') as f:\n"
+					"		f.write(' '.join([os.getcwd(), render.SOURCE, *sys.argv[1:]]))\n"
+					"	sys.exit(3)\n"
+				)
+
+			output = os.path.join(wrench_path, "output")
+			env = {"PYTHONPATH": lib_path, "OUTPUT": output}
+			with patch.dict(os.environ, env), patch("wrench.utils.daemon.log"), open(
+				os.devnull
+			) as stdin, patch("sys.stdin", stdin):
+				self.assertIsNone(run_via_daemon(["version"], wrench_path))
+
+				start_daemon(wrench_path)
+				try:
+					self.assertEqual(run_via_daemon(["list-apps"], wrench_path), 3)
+					with open(output) as f:
+						self.assertEqual(f.read(), f"{os.getcwd()} framework list-apps")
+
+					# the wrench changed: the client falls back, the daemon reloads itself
+					with patch("wrench.utils.daemon.get_apps_fingerprint", return_value="new"):
+						self.assertIsNone(run_via_daemon(["version"], wrench_path))
+
+						# and serves again once reloaded
+						for _ in range(100):
+							returncode = run_via_daemon(["version"], wrench_path)
+							if returncode is not None:
+								break
+							time.sleep(0.1)
+						self.assertEqual(returncode, 3)
+				finally:
+					stop_daemon(wrench_path)
+
+
+# commits made by tests shouldn't depend on the git config of the host
+GIT_ENV = {
+	f"GIT_{role}_{key}": value
+	for role in ("AUTHOR", "COMMITTER")
+	for key, value in (("NAME", "wrench"), ("EMAIL", "wrench@localhost"))
+}
+
+
+def git(*args, cwd):
+	env = {**os.environ, **GIT_ENV}
+	return subprocess.check_output(["git", *args], cwd=cwd, env=env, text=True)
+
+
+def make_app(app_path, module_name=None, files=()):
+	"""Creates the files that make a folder a Saashq app, and files relative to its
+	module folder. Returns the module folder's path"""
+	module_path = os.path.join(app_path, module_name or os.path.basename(app_path))
+	for f in ("hooks.py", "modules.txt", "patches.txt", *files):
+		path = os.path.join(module_path, f)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		open(path, "w").close()
+	return module_path
+
+
+def _update_config_as(wrench_path, uid):
+	os.setgid(uid)
+	os.setuid(uid)
+	update_config({"user": True}, wrench_path=wrench_path)
+
+
+def _update_config_keys(wrench_path, n):
+	for i in range(25):
+		update_config({f"key_{n}_{i}": i}, wrench_path=wrench_path)
@@ -5,9 +5,11 @@ import os
 import re
 import subprocess
 import sys
+import threading
+import time
 import hashlib
-from functools import lru_cache
-from glob import glob
+from functools import lru_cache, wraps
+from glob import escape as glob_escape, glob
 from pathlib import Path
 from shlex import split
 from tarfile import TarInfo
@@ -23,6 +25,7 @@ from wrench.exceptions import (
 	CommandFailedError,
 	InvalidRemoteException,
 )
+from wrench.utils import profiler
 
 from typing import TYPE_CHECKING
 
@@ -35,6 +38,7 @@ paths_in_app = ("hooks.py", "modules.txt", "patches.txt")
 paths_in_wrench = ("apps", "sites", "config", "logs", "config/pids")
 sudoers_file = "/etc/sudoers.d/saashq"
 UNSET_ARG = object()
+UPDATE_CHECK_TTL = 24 * 60 * 60
 
 
 def is_wrench_directory(directory=os.path.curdir):
@@ -51,16 +55,36 @@ def is_wrench_directory(directory=os.path.curdir):
 
 
 def is_saashq_app(directory: str) -> bool:
-	is_saashq_app = True
+	return get_app_module_path(directory) is not None
 
-	for folder in paths_in_app:
-		if not is_saashq_app:
-			break
 
-		path = glob(os.path.join(directory, "**", folder))
-		is_saashq_app = is_saashq_app and path
+def get_app_module_path(directory: str) -> Optional[str]:
+	"""Returns the app's python module folder, the one with hooks.py, modules.txt &
+	patches.txt. Apps are laid out as <app>/<app>/hooks.py; if the module is named
+	differently, only the app's top level folders are looked into, never the whole
+	tree (node_modules etc). None if directory isn't an app"""
+	app_name = os.path.basename(os.path.normpath(directory))
+	module_path = os.path.join(directory, app_name)
+
+	if all(os.path.isfile(os.path.join(module_path, f)) for f in paths_in_app):
+		return module_path
+
+	try:
+		entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+	except OSError:
+		return None
+
+	for entry in entries:
+		if (
+			entry.is_dir()
+			and entry.name != app_name
+			and not entry.name.startswith(".")
+			and entry.name != "node_modules"
+			and all(os.path.isfile(os.path.join(entry.path, f)) for f in paths_in_app)
+		):
+			return entry.path
 
-	return bool(is_saashq_app)
+	return None
 
 
 def get_wrench_cache_path(sub_dir: Optional[str]) -> Path:
@@ -128,30 +152,81 @@ def log(message, level=0, no_log=False, stderr=False):
 		click.secho(f"{prefix}: {message}", fg=color, err=stderr)
 
 
-def check_latest_version():
+def get_version_cache_path() -> Path:
+	return get_wrench_cache_path(None) / "version.json"
+
+
+def get_version_cache() -> dict:
+	try:
+		with open(get_version_cache_path()) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+
+def set_version_cache(cache: dict):
+	cache_path = get_version_cache_path()
+	tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+
+	with open(tmp_path, "w") as f:
+		json.dump(cache, f)
+	os.replace(tmp_path, cache_path)
+
+
+def check_latest_version(ttl: int = UPDATE_CHECK_TTL):
+	"""Warns if a newer version of wrench was found on PyPI. The last known version is
+	read from ~/.cache/wrench/version.json; once it's older than `ttl` seconds, it's
+	refreshed by a detached process so that the current command doesn't wait on it.
+	"""
 	if VERSION.endswith("dev"):
 		return
 
-	import requests
 	from semantic_version import Version
 
 	try:
-		pypi_request = requests.get("https://pypi.org/pypi/saashq-wrench/json")
+		cache = get_version_cache()
+
+		if time.time() - cache.get("checked_at", 0) > ttl:
+			# set before refreshing so that failing checks are retried only after ttl
+			cache["checked_at"] = time.time()
+			set_version_cache(cache)
+			subprocess.Popen(
+				[
+					sys.executable,
+					"-c",
+					"from wrench.utils import refresh_latest_version; refresh_latest_version()",
+				],
+				stdin=subprocess.DEVNULL,
+				stdout=subprocess.DEVNULL,
+				stderr=subprocess.DEVNULL,
+				start_new_session=True,
+			)
+
+		latest_version = cache.get("latest_version")
+		if latest_version and Version(latest_version) > Version(VERSION):
+			log(
+				f"A newer version of wrench is available: {VERSION} → {latest_version}",
+				stderr=True,
+			)
+	except Exception:
+		# checking for updates should never fail a command
+		return
+
+
+def refresh_latest_version():
+	"""Fetches latest version of wrench from PyPI into the version cache"""
+	import requests
+
+	try:
+		pypi_request = requests.get("https://pypi.org/pypi/saashq-wrench/json", timeout=10)
 	except Exception:
 		# Exceptions thrown are defined in requests.exceptions
 		# ignore checking on all Exceptions
 		return
 
 	if pypi_request.status_code == 200:
-		pypi_version_str = pypi_request.json().get("info").get("version")
-		pypi_version = Version(pypi_version_str)
-		local_version = Version(VERSION)
-
-		if pypi_version > local_version:
-			log(
-				f"A newer version of wrench is available: {local_version} → {pypi_version}",
-				stderr=True,
-			)
+		pypi_version = pypi_request.json().get("info").get("version")
+		set_version_cache({"checked_at": time.time(), "latest_version": pypi_version})
 
 
 def pause_exec(seconds=10):
@@ -174,7 +249,8 @@ def exec_cmd(cmd, cwd=".", env=None, _raise=True):
 	cmd_log = f"{cwd_info}{cmd}"
 	logger.debug(cmd_log)
 	spl_cmd = split(cmd)
-	return_code = subprocess.call(spl_cmd, cwd=cwd, universal_newlines=True, env=env)
+	with profiler.span(cmd, "exec_cmd", cwd=cwd):
+		return_code = subprocess.call(spl_cmd, cwd=cwd, universal_newlines=True, env=env)
 	if return_code:
 		logger.warning(f"{cmd_log} executed with exit code {return_code}")
 		if _raise:
@@ -182,6 +258,73 @@ def exec_cmd(cmd, cwd=".", env=None, _raise=True):
 	return return_code
 
 
+def exec_cmds_concurrently(cmds: List[Tuple[str, str, str]], jobs: int = 1):
+	"""Runs cmds, a list of (label, cmd, cwd), on a pool of `jobs` workers.
+
+	Output of each command is captured and printed as one block under its label, in
+	the order of cmds, so outputs of commands running together aren't interleaved.
+	Once a command fails, commands that haven't started yet are skipped; the ones
+	running are waited on. Raises CommandFailedError listing every failed command.
+	"""
+	from concurrent.futures import ThreadPoolExecutor
+
+	if jobs <= 1:
+		for label, cmd, cwd in cmds:
+			click.secho(f"\n{label}", fg="yellow")
+			exec_cmd(cmd, cwd=cwd)
+		return
+
+	failed = threading.Event()
+	results = {}
+
+	def run(label, cmd, cwd):
+		if failed.is_set():
+			return None
+
+		logger.debug(f"cd {cwd} && {cmd}")
+		with profiler.span(cmd, "exec_cmd", cwd=cwd):
+			p = subprocess.run(
+				split(cmd),
+				cwd=cwd,
+				stdout=subprocess.PIPE,
+				stderr=subprocess.STDOUT,
+				universal_newlines=True,
+			)
+
+		if p.returncode:
+			failed.set()
+			logger.warning(f"cd {cwd} && {cmd} executed with exit code {p.returncode}")
+		return p
+
+	with ThreadPoolExecutor(max_workers=jobs) as executor:
+		futures = [executor.submit(run, *cmd) for cmd in cmds]
+
+		for (label, cmd, cwd), future in zip(cmds, futures):
+			p = future.result()
+			results[label] = (cmd, p)
+			if not p:
+				continue
+
+			click.secho(f"\n{label}", fg="yellow")
+			click.secho(f"$ {cmd}", fg="bright_black")
+			if p.stdout:
+				click.echo(p.stdout.rstrip("\n"))
+
+	errors = [
+		f"{label}: `{cmd}` exited with code {p.returncode}"
+		for label, (cmd, p) in results.items()
+		if p and p.returncode
+	]
+	skipped = [label for label, (cmd, p) in results.items() if not p]
+
+	if errors:
+		summary = "\n".join(errors)
+		if skipped:
+			summary += f"\nSkipped: {', '.join(skipped)}"
+		log(f"{len(errors)} of {len(cmds)} commands failed:\n{summary}", level=2)
+		raise CommandFailedError(summary)
+
+
 def which(executable: str, raise_err: bool = False) -> str:
 	from shutil import which
 
@@ -237,9 +380,10 @@ def get_git_version() -> float:
 def get_cmd_output(cmd, cwd=".", _raise=True):
 	output = ""
 	try:
-		output = subprocess.check_output(
-			cmd, cwd=cwd, shell=True, stderr=subprocess.PIPE, encoding="utf-8"
-		).strip()
+		with profiler.span(cmd, "get_cmd_output", cwd=cwd):
+			output = subprocess.check_output(
+				cmd, cwd=cwd, shell=True, stderr=subprocess.PIPE, encoding="utf-8"
+			).strip()
 	except subprocess.CalledProcessError as e:
 		if e.output:
 			output = e.output
@@ -266,14 +410,15 @@ def run_saashq_cmd(*args, **kwargs):
 	else:
 		stderr = stdout = None
 
-	p = subprocess.Popen(
-		(f, "-m", "saashq.utils.wrench_helper", "saashq") + args,
-		cwd=sites_dir,
-		stdout=stdout,
-		stderr=stderr,
-	)
+	with profiler.span(" ".join(("saashq",) + args), "run_saashq_cmd", cwd=sites_dir):
+		p = subprocess.Popen(
+			(f, "-m", "saashq.utils.wrench_helper", "saashq") + args,
+			cwd=sites_dir,
+			stdout=stdout,
+			stderr=stderr,
+		)
 
-	return_code = print_output(p) if is_async else p.wait()
+		return_code = print_output(p) if is_async else p.wait()
 	if return_code > 0:
 		sys.exit(return_code)
 
@@ -406,9 +551,307 @@ def find_parent_wrench(path: str) -> str:
 		return find_parent_wrench(parent_dir)
 
 
+def get_mtime_ns(path: str) -> Optional[int]:
+	try:
+		return os.stat(path).st_mtime_ns
+	except OSError:
+		return None
+
+
+def get_git_head(repo_path: str) -> Optional[str]:
+	"""Returns commit hash of HEAD by reading the git metadata directly, without
+	spawning git. git is only run for worktrees & submodules, whose .git is a file, or
+	if the metadata can't be read. Returns None if repo_path is not a git repository"""
+	git_dir = os.path.join(repo_path, ".git")
+
+	if not os.path.exists(git_dir):
+		return None
+
+	head = read_git_head(git_dir)
+	if not head:
+		head = get_cmd_output("git rev-parse HEAD", cwd=repo_path, _raise=False)
+	return head or None
+
+
+def read_git_head(git_dir: str) -> Optional[str]:
+	try:
+		with open(os.path.join(git_dir, "HEAD")) as f:
+			head = f.read().strip()
+	except OSError:
+		return None
+
+	if not head.startswith("ref:"):
+		# detached HEAD
+		return head
+
+	ref = head.split(":", 1)[1].strip()
+
+	try:
+		with open(os.path.join(git_dir, ref)) as f:
+			return f.read().strip()
+	except OSError:
+		pass
+
+	try:
+		with open(os.path.join(git_dir, "packed-refs")) as f:
+			for line in f:
+				if line.rstrip().endswith(f" {ref}"):
+					return line.split()[0]
+	except OSError:
+		pass
+
+	return None
+
+
+def get_commands_mtimes(commands_path: str) -> List[Tuple[str, Optional[int]]]:
+	"""mtimes of the modules of an app's commands package, so that edits to any of
+	them (not only __init__.py) are noticed"""
+	try:
+		with os.scandir(commands_path) as entries:
+			return sorted(
+				(entry.name, entry.stat().st_mtime_ns)
+				for entry in entries
+				if entry.name.endswith(".py") and entry.is_file()
+			)
+	except OSError:
+		return []
+
+
+def get_apps_fingerprint(wrench_path=".") -> str:
+	"""Returns a hash of the state of the apps & env of the wrench. It changes when an
+	app is added or removed, moves to another commit or when its hooks or commands
+	are modified. Only stats and small reads are used so this is cheap to compute.
+	"""
+	apps_path = os.path.join(wrench_path, "apps")
+	state = [get_mtime_ns(os.path.join(wrench_path, "env", "pyvenv.cfg"))]
+
+	try:
+		entries = sorted(os.scandir(apps_path), key=lambda entry: entry.name)
+	except OSError:
+		entries = []
+
+	for entry in entries:
+		if not entry.is_dir():
+			continue
+
+		module_path = os.path.join(entry.path, entry.name)
+		state.append(
+			[
+				entry.name,
+				get_git_head(entry.path),
+				get_mtime_ns(os.path.join(module_path, "hooks.py")),
+				get_mtime_ns(os.path.join(module_path, "commands.py")),
+				get_mtime_ns(os.path.join(module_path, "commands")),
+				get_commands_mtimes(os.path.join(module_path, "commands")),
+			]
+		)
+
+	return hashlib.sha1(json.dumps(state).encode()).hexdigest()
+
+
+# files which decide what gets installed for an app, by kind of dependencies
+DEPENDENCY_MANIFESTS = {
+	"python": ("pyproject.toml", "setup.py", "setup.cfg", "requirements.txt"),
+	"node": ("package.json", "yarn.lock"),
+	"dev": ("pyproject.toml", "dev-requirements.txt"),
+}
+
+
+# frontend sources of an app, globbed relative to the app's folder. saashq's build
+# tooling lives in its esbuild folder
+ASSETS_SOURCES = (
+	"package.json",
+	"yarn.lock",
+	"*/public",
+	"frontend",
+	"esbuild",
+	"*.config.js",
+	"*.config.mjs",
+	"*.config.ts",
+	"tsconfig.json",
+)
+
+# what `saashq migrate` syncs or runs: patches, hooks (fixtures, after_migrate...) &
+# JSON of DocTypes and other module records, found under the app module's folders
+MIGRATION_SOURCES = ("*/patches.txt", "*/hooks.py", "*/modules.txt", "*/*/")
+
+
+def get_sources_fingerprint(app: str, sources, wrench_path=".", extensions=None) -> str:
+	"""Returns a hash of the contents of an app's files matching the glob patterns of
+	sources. Files of matching folders are limited to extensions if given; build output
+	(dist), node_modules & hidden folders are skipped."""
+	app_path = os.path.join(wrench_path, "apps", app)
+	state = []
+
+	def is_skipped(name):
+		return name in ("dist", "node_modules") or name.startswith(".")
+
+	for pattern in sources:
+		for source in sorted(glob(os.path.join(glob_escape(app_path), pattern))):
+			if any(is_skipped(name) for name in Path(os.path.relpath(source, app_path)).parts):
+				continue
+			if os.path.isfile(source) and not os.path.islink(source):
+				state.append([os.path.relpath(source, app_path), get_file_md5(Path(source))])
+				continue
+
+			for root, dirs, files in os.walk(source):
+				dirs[:] = sorted(d for d in dirs if not is_skipped(d))
+				for f in sorted(files):
+					path = os.path.join(root, f)
+					if os.path.islink(path) or (extensions and not f.endswith(extensions)):
+						continue
+					state.append([os.path.relpath(path, app_path), get_file_md5(Path(path))])
+
+	return hashlib.sha1(json.dumps(state).encode()).hexdigest()
+
+
+def get_migration_fingerprint(app: str, wrench_path=".") -> str:
+	return get_sources_fingerprint(app, MIGRATION_SOURCES, wrench_path, extensions=(".json",))
+
+
+def get_dependency_fingerprint(app: str, kind: str, wrench_path=".") -> str:
+	"""Returns a hash of the contents of an app's dependency manifests of the given
+	kind ("python", "node" or "dev"), or of its frontend sources for "assets". Python
+	& dev fingerprints also cover the env's interpreter so that a recreated or
+	migrated env doesn't match."""
+	if kind == "assets":
+		return get_sources_fingerprint(app, ASSETS_SOURCES, wrench_path)
+
+	app_path = os.path.join(wrench_path, "apps", app)
+	state = []
+
+	if kind in ("python", "dev"):
+		pyvenv_cfg = os.path.join(wrench_path, "env", "pyvenv.cfg")
+		state.append(get_mtime_ns(pyvenv_cfg))
+		state.append(get_file_md5(Path(pyvenv_cfg)) if os.path.exists(pyvenv_cfg) else None)
+
+	for manifest in DEPENDENCY_MANIFESTS[kind]:
+		manifest_path = os.path.join(app_path, manifest)
+		if os.path.exists(manifest_path):
+			state.append([manifest, get_file_md5(Path(manifest_path))])
+
+	return hashlib.sha1(json.dumps(state).encode()).hexdigest()
+
+
+def get_wrench_helper_cache_path(wrench_path=".") -> str:
+	return os.path.join(wrench_path, "sites", ".wrench_cache", "wrench_helper.json")
+
+
+def cache_wrench_helper_output(key: str):
+	"""Persists the output of the decorated function under sites/.wrench_cache. The
+	cached value is used until the apps fingerprint of the wrench changes. Empty
+	values (failures) are never cached.
+	"""
+
+	def innfn(fn):
+		@wraps(fn)
+		def wrapper_fn(wrench_path="."):
+			cache_path = get_wrench_helper_cache_path(wrench_path)
+			fingerprint = get_apps_fingerprint(wrench_path)
+
+			try:
+				with open(cache_path) as f:
+					cache = json.load(f)
+			except (OSError, ValueError):
+				cache = {}
+
+			if cache.get("fingerprint") == fingerprint and key in cache:
+				return cache[key]
+
+			value = fn(wrench_path=wrench_path)
+			if not value:
+				return value
+
+			if cache.get("fingerprint") != fingerprint:
+				cache = {"fingerprint": fingerprint}
+			cache[key] = value
+
+			try:
+				os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+				tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+				with open(tmp_path, "w") as f:
+					json.dump(cache, f)
+				os.replace(tmp_path, cache_path)
+			except OSError:
+				logger.debug(f"Couldn't write wrench helper cache at {cache_path}")
+
+			return value
+
+		return wrapper_fn
+
+	return innfn
+
+
+def get_apps_manifest_path(wrench_path=".") -> str:
+	return os.path.join(wrench_path, "sites", ".wrench_cache", "apps.json")
+
+
+def get_app_mtimes(app_path: str, module: str) -> List[Optional[int]]:
+	return [get_mtime_ns(app_path), get_mtime_ns(os.path.join(app_path, module))]
+
+
+def get_saashq_apps(wrench_path=".") -> List[str]:
+	"""Returns the folders under the wrench's apps folder that are Saashq apps.
+
+	Results of `get_app_module_path` are kept in an apps manifest under
+	sites/.wrench_cache, each entry is reused as long as the mtimes of the app's folder
+	and of the module folder that was resolved are unchanged (files being added,
+	removed or renamed bump these). The manifest is only written if the sites folder
+	exists.
+	"""
+	apps_path = os.path.join(wrench_path, "apps")
+	manifest_path = get_apps_manifest_path(wrench_path)
+
+	try:
+		with open(manifest_path) as f:
+			manifest = json.load(f)
+	except (OSError, ValueError):
+		manifest = {}
+
+	updated_manifest = {}
+	apps = []
+
+	for entry in os.scandir(apps_path):
+		if not entry.is_dir():
+			continue
+
+		cached = manifest.get(entry.name)
+		# the module folder that was resolved, which may not be named after the app
+		module = (cached or {}).get("module") or entry.name
+
+		if cached and cached.get("mtimes") == get_app_mtimes(entry.path, module):
+			updated_manifest[entry.name] = cached
+		else:
+			module_path = get_app_module_path(entry.path)
+			module = os.path.basename(module_path) if module_path else entry.name
+			updated_manifest[entry.name] = {
+				"mtimes": get_app_mtimes(entry.path, module),
+				"is_app": bool(module_path),
+				"module": module,
+			}
+
+		if updated_manifest[entry.name]["is_app"]:
+			apps.append(entry.name)
+
+	# only for wrenches: folders that merely have an apps folder don't get a sites one
+	if updated_manifest != manifest and os.path.isdir(os.path.join(wrench_path, "sites")):
+		try:
+			os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+			tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+			with open(tmp_path, "w") as f:
+				json.dump(updated_manifest, f)
+			os.replace(tmp_path, manifest_path)
+		except OSError:
+			logger.debug(f"Couldn't write apps manifest at {manifest_path}")
+
+	return apps
+
+
+@cache_wrench_helper_output("commands")
 def get_env_saashq_commands(wrench_path=".") -> List:
 	"""Caches all available commands (even custom apps) via Saashq
-	Default caching behaviour: generated the first time any command (for a specific wrench directory)
+	Default caching behaviour: generated the first time any command is run (for a specific
+	wrench directory) and regenerated whenever any app in the wrench changes
 	"""
 	from wrench.utils.wrench import get_env_cmd
 
@@ -429,6 +872,22 @@ def get_env_saashq_commands(wrench_path=".") -> List:
 	return []
 
 
+@cache_wrench_helper_output("help")
+def get_env_saashq_help(wrench_path=".") -> str:
+	"""Caches help text of Saashq's commands, same as get_env_saashq_commands"""
+	from wrench.utils.wrench import get_env_cmd
+
+	python = get_env_cmd("python", wrench_path=wrench_path)
+	sites_path = os.path.join(wrench_path, "sites")
+
+	try:
+		return get_cmd_output(
+			f"{python} -m saashq.utils.wrench_helper get-saashq-help", cwd=sites_path
+		)
+	except Exception:
+		return ""
+
+
 def find_org(org_repo, using_cached: bool = False):
 	import requests
 
@@ -562,9 +1021,9 @@ def get_cmd_from_sysargv():
 
 	"""
 	# context is passed as options to saashq's wrench_helper
-	from wrench.wrench import Wrench
-
-	saashq_context = _dict(params={"--site"}, flags={"--verbose", "--profile", "--force"})
+	saashq_context = _dict(
+		params={"--site"}, flags={"--verbose", "--profile", "--profile-cli", "--force"}
+	)
 	cmd_from_ctx = None
 	sys_argv = sys.argv[1:]
 	skip_next = False
@@ -581,8 +1040,12 @@ def get_cmd_from_sysargv():
 			skip_next = True
 			continue
 
-		if sys_argv.index(arg) == 0 and arg in Wrench(".").apps:
-			continue
+		# options can't be app names; avoid building Wrench for `wrench --version` & co.
+		if not arg.startswith("-") and sys_argv.index(arg) == 0:
+			from wrench.wrench import Wrench
+
+			if arg in Wrench(".").apps:
+				continue
 
 		cmd_from_ctx = arg
 
@@ -99,7 +99,7 @@ def switch_branch(branch, apps=None, wrench_path=".", upgrade=False, check_upgra
 	if version_upgrade[0] and upgrade:
 		Wrench(wrench_path).setup.requirements()
 		backup_all_sites()
-		patch_sites()
+		patch_sites(force=True)
 		build_assets()
 		post_upgrade(version_upgrade[1], version_upgrade[2])
 
@@ -0,0 +1,160 @@
+# imports - standard imports
+import glob
+import logging
+import os
+import subprocess
+import time
+from typing import Dict, Iterable, List, Optional
+
+# imports - third party imports
+import click
+
+# imports - module imports
+import wrench
+from wrench.utils import get_cmd_output, log, profiler
+
+logger = logging.getLogger(wrench.PROJECT_NAME)
+
+
+def get_changed_files(repo_dir: str, old_commit: str, new_commit: str) -> Optional[List[str]]:
+	"""Returns paths of files added, modified or removed between two commits, relative
+	to repo_dir. None if the diff can't be computed (eg. the old commit isn't around)"""
+	if not (old_commit and new_commit):
+		return None
+	if old_commit == new_commit:
+		return []
+
+	try:
+		out = get_cmd_output(
+			f"git diff --name-only --no-renames {old_commit} {new_commit}", cwd=repo_dir
+		)
+	except subprocess.CalledProcessError:
+		return None
+
+	return [path for path in out.splitlines() if path]
+
+
+def invalidate_bytecode(repo_dir: str, files: Iterable[str]) -> int:
+	"""Removes the bytecode cached for the python files among files, in __pycache__ for
+	every interpreter, and legacy .pyc files next to them. Returns the number of files
+	removed"""
+	removed = 0
+	for path in files:
+		if not path.endswith(".py"):
+			continue
+
+		source = os.path.join(repo_dir, path)
+		directory, name = os.path.split(source)
+		pattern = os.path.join(glob.escape(directory), "__pycache__", f"{glob.escape(name[:-3])}.*.pyc")
+
+		for pyc in glob.glob(pattern) + [f"{source}c"]:
+			try:
+				os.remove(pyc)
+				removed += 1
+			except FileNotFoundError:
+				pass
+
+	return removed
+
+
+# run by the env's python: compiles the files & directories read from stdin, by a pool of
+# argv[1] processes shared by all files. Directories are walked here rather than by
+# compileall, whose -x pattern is matched against the full path (so would exclude every
+# file of a wrench in a hidden folder) and doesn't stop it from walking node_modules
+COMPILE_SCRIPT = """
+import compileall, functools, os, sys
+from concurrent.futures import ProcessPoolExecutor
+
+def get_sources(path):
+	if not os.path.isdir(path):
+		yield path
+		return
+	for root, dirs, files in os.walk(path):
+		dirs[:] = [d for d in dirs if d not in ("node_modules", "__pycache__") and d[0] != "."]
+		yield from (os.path.join(root, f) for f in files if f.endswith(".py"))
+
+if __name__ == "__main__":
+	jobs = int(sys.argv[1])
+	sources = [source for path in sys.stdin.read().splitlines() for source in get_sources(path)]
+	compile_file = functools.partial(compileall.compile_file, quiet=1)
+	if jobs == 1:
+		sys.exit(not all(list(map(compile_file, sources))))
+	with ProcessPoolExecutor(jobs) as executor:
+		chunksize = max(1, len(sources) // (jobs * 4))
+		sys.exit(not all(list(executor.map(compile_file, sources, chunksize=chunksize))))
+"""
+
+
+def compile_bytecode(python: str, paths: List[str], jobs: int = 0) -> float:
+	"""Compiles python files & directories in paths with python, by a pool of `jobs`
+	processes (one per core by default). node_modules & hidden folders are skipped.
+	Files that don't compile are logged & skipped since they'd fail on import anyway.
+	Returns the time taken in seconds."""
+	if not paths or not os.path.exists(python):
+		return 0.0
+
+	jobs = jobs or os.cpu_count() or 1
+	cmd = [python, "-c", COMPILE_SCRIPT, str(jobs)]
+	start = time.monotonic()
+	with profiler.span(f"{python} -c COMPILE_SCRIPT {jobs}", "exec_cmd", paths=len(paths)):
+		p = subprocess.run(
+			cmd,
+			input="\n".join(paths),
+			stdout=subprocess.PIPE,
+			stderr=subprocess.STDOUT,
+			universal_newlines=True,
+		)
+	duration = time.monotonic() - start
+
+	if p.returncode:
+		logger.debug(p.stdout)
+		log("Some python files couldn't be compiled, see wrench.log", level=3)
+
+	return duration
+
+
+def refresh_bytecode(python: str, changed_files: Dict[str, List[str]], jobs: int = 0):
+	"""Invalidates bytecode of the files changed in each repo of changed_files, and
+	compiles those still around in parallel, so that workers don't compile them on
+	first import"""
+	removed, sources = 0, []
+	for repo_dir, files in changed_files.items():
+		removed += invalidate_bytecode(repo_dir, files)
+		sources.extend(
+			os.path.join(repo_dir, path)
+			for path in files
+			if path.endswith(".py") and os.path.exists(os.path.join(repo_dir, path))
+		)
+
+	duration = compile_bytecode(python, sources, jobs=jobs)
+	if removed or sources:
+		click.secho(
+			f"Invalidated {removed} and compiled {len(sources)} bytecode files in {duration:.2f}s",
+			fg="bright_black",
+		)
+
+
+def get_precompile_paths(wrench_path=".") -> List[str]:
+	"""Folders of apps and site-packages folders of the wrench's env, compiled by the
+	same process pool"""
+	apps_path = os.path.join(wrench_path, "apps")
+	paths = [
+		os.path.join(apps_path, app)
+		for app in (sorted(os.listdir(apps_path)) if os.path.isdir(apps_path) else [])
+		if os.path.isdir(os.path.join(apps_path, app))
+	]
+	paths.extend(sorted(glob.glob(os.path.join(wrench_path, "env", "lib", "*", "site-packages"))))
+	return paths
+
+
+def precompile(wrench_path=".", jobs: int = 0):
+	"""Compiles bytecode of apps & the env in parallel, so that freshly started workers
+	don't each compile (and race to write) it on first import. Files whose bytecode is
+	up to date are skipped by compileall."""
+	from wrench.utils.wrench import get_env_cmd
+
+	python = get_env_cmd("python", wrench_path=wrench_path)
+	paths = get_precompile_paths(wrench_path)
+	duration = compile_bytecode(python, paths, jobs=jobs)
+	if duration:
+		log(f"Precompiled bytecode of apps & env in {duration:.2f}s")
@@ -1,4 +1,5 @@
-from typing import List
+from importlib import import_module
+from typing import Dict, List, Optional, Tuple, Union
 import click
 from click.core import _check_multicommand
 
@@ -15,6 +16,78 @@ def print_wrench_version(ctx, param, value):
 
 
 class MultiCommandGroup(click.Group):
+	def __init__(
+		self,
+		*args,
+		lazy_commands: Optional[Dict[Union[str, Tuple[str, ...]], Tuple[str, str]]] = None,
+		**kwargs,
+	):
+		"""Group that also accepts a static manifest of commands that are
+		imported only when they are looked up.
+
+		lazy_commands maps a command name (or a tuple of names) to the import
+		path of the command object, as "package.module:attribute", and its short
+		help, which is listed in the group's help without importing the command.
+		"""
+		super().__init__(*args, **kwargs)
+		self.lazy_commands = {}
+		self.lazy_help = {}
+
+		for names, (import_path, short_help) in (lazy_commands or {}).items():
+			for name in (names,) if isinstance(names, str) else names:
+				self.lazy_commands[name] = import_path
+				self.lazy_help[name] = short_help
+
+	def list_commands(self, ctx):
+		return sorted(set(self.commands) | set(self.lazy_commands))
+
+	def format_commands(self, ctx, formatter):
+		"""Same as click's, except that commands that aren't loaded yet are listed
+		with their short help from the manifest"""
+		from click.utils import make_default_short_help
+
+		commands = []
+		for name in self.list_commands(ctx):
+			cmd = self.commands.get(name)
+			if cmd is None and name not in self.lazy_commands:
+				continue
+			if cmd is not None and cmd.hidden:
+				continue
+			commands.append((name, cmd))
+
+		if not commands:
+			return
+
+		limit = formatter.width - 6 - max(len(name) for name, _ in commands)
+		rows = [
+			(
+				name,
+				cmd.get_short_help_str(limit)
+				if cmd is not None
+				else make_default_short_help(self.lazy_help[name], limit),
+			)
+			for name, cmd in commands
+		]
+		with formatter.section("Commands"):
+			formatter.write_dl(rows)
+
+	def get_command(self, ctx, cmd_name):
+		if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+			self.add_command(self.load_command(cmd_name), name=cmd_name)
+
+		return super().get_command(ctx, cmd_name)
+
+	def has_command(self, cmd_name) -> bool:
+		"""Checks if command is registered without importing it"""
+		return cmd_name in self.commands or cmd_name in self.lazy_commands
+
+	def load_command(self, cmd_name):
+		from wrench.utils import profiler
+
+		module_name, attr = self.lazy_commands[cmd_name].split(":", 1)
+		with profiler.span(f"import {module_name}", "import"):
+			return getattr(import_module(module_name), attr)
+
 	def add_command(self, cmd, name=None):
 		"""Registers another :class:`Command` with this group.  If the name
 		is not provided, the name of the command is used.
@@ -0,0 +1,167 @@
+# imports - standard imports
+import array
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+# imports - module imports
+from wrench.utils import get_apps_fingerprint, log
+
+DAEMON_STARTUP_TIMEOUT = 120
+FORWARDED_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGQUIT)
+
+
+def get_daemon_socket_path(wrench_path=".") -> str:
+	return os.path.abspath(os.path.join(wrench_path, "config", "pids", "saashq_daemon.sock"))
+
+
+def get_daemon_pid_path(wrench_path=".") -> str:
+	return os.path.abspath(os.path.join(wrench_path, "config", "pids", "saashq_daemon.pid"))
+
+
+def get_daemon_pid(wrench_path=".") -> Optional[int]:
+	"""Returns pid of the wrench's daemon if it's running"""
+	try:
+		with open(get_daemon_pid_path(wrench_path)) as f:
+			pid = int(f.read().strip())
+		os.kill(pid, 0)
+	except (OSError, ValueError):
+		return None
+
+	return pid
+
+
+def start_daemon(wrench_path="."):
+	from wrench.utils.wrench import get_env_cmd
+
+	if pid := get_daemon_pid(wrench_path):
+		log(f"Saashq daemon is already running (pid {pid})", level=3)
+		return
+
+	python = get_env_cmd("python", wrench_path=wrench_path)
+	server = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daemon_server.py")
+	socket_path = get_daemon_socket_path(wrench_path)
+	log_path = os.path.join(wrench_path, "logs", "saashq_daemon.log")
+
+	with open(log_path, "a") as log_file:
+		process = subprocess.Popen(
+			[
+				python,
+				server,
+				"--socket",
+				socket_path,
+				"--pid-file",
+				get_daemon_pid_path(wrench_path),
+				"--sites-path",
+				os.path.abspath(os.path.join(wrench_path, "sites")),
+				"--fingerprint",
+				get_apps_fingerprint(wrench_path),
+			],
+			stdin=subprocess.DEVNULL,
+			stdout=log_file,
+			stderr=subprocess.STDOUT,
+			start_new_session=True,
+		)
+
+	deadline = time.monotonic() + DAEMON_STARTUP_TIMEOUT
+	while not os.path.exists(socket_path):
+		if process.poll() is not None or time.monotonic() > deadline:
+			log(f"Saashq daemon failed to start, check {log_path} for details", level=2)
+			return
+		time.sleep(0.1)
+
+	log(f"Saashq daemon started (pid {process.pid}), listening on {socket_path}", level=1)
+
+
+def stop_daemon(wrench_path="."):
+	pid = get_daemon_pid(wrench_path)
+
+	if pid:
+		os.kill(pid, signal.SIGTERM)
+		log(f"Saashq daemon stopped (pid {pid})", level=1)
+	else:
+		log("Saashq daemon is not running", level=3)
+
+	for path in (get_daemon_socket_path(wrench_path), get_daemon_pid_path(wrench_path)):
+		if os.path.exists(path):
+			os.remove(path)
+
+
+def daemon_status(wrench_path="."):
+	pid = get_daemon_pid(wrench_path)
+
+	if pid and os.path.exists(get_daemon_socket_path(wrench_path)):
+		log(f"Saashq daemon is running (pid {pid})")
+	else:
+		log("Saashq daemon is not running")
+
+
+def run_via_daemon(args: List[str], wrench_path=".") -> Optional[int]:
+	"""Runs saashq's wrench_helper with args in a child forked off the wrench's daemon.
+
+	Returns the exit code of the command, or None if the daemon couldn't run it
+	(not running, restarting since the wrench changed, etc). In that case the
+	command hasn't been started and should be run in a fresh interpreter instead.
+	"""
+	socket_path = get_daemon_socket_path(wrench_path)
+
+	if not os.path.exists(socket_path):
+		return None
+
+	request = {
+		"argv": args,
+		"env": dict(os.environ),
+		"cwd": os.getcwd(),
+		"fingerprint": get_apps_fingerprint(wrench_path),
+	}
+	payload = json.dumps(request).encode() + b"\n"
+
+	sys.stdout.flush()
+	sys.stderr.flush()
+
+	conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		fds = array.array("i", (sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()))
+		conn.connect(socket_path)
+		# file descriptors are attached to the first byte, rest follows as plain data
+		conn.sendmsg([payload[:1]], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)])
+		conn.sendall(payload[1:])
+	except (OSError, ValueError):
+		conn.close()
+		return None
+
+	pid = None
+
+	def forward_signal(signum, frame):
+		if pid:
+			os.kill(pid, signum)
+
+	try:
+		with conn, conn.makefile("rb") as messages:
+			for line in messages:
+				message = json.loads(line)
+
+				if message.get("restart"):
+					return None
+
+				if "pid" in message:
+					pid = message["pid"]
+					for signum in FORWARDED_SIGNALS:
+						signal.signal(signum, forward_signal)
+
+				if "returncode" in message:
+					return message["returncode"]
+	except OSError:
+		# eg. reset by a daemon that was closing its socket to restart
+		pass
+
+	if not pid:
+		return None
+
+	log("Lost connection to Saashq daemon before command finished", level=2)
+	return 1
@@ -0,0 +1,214 @@
+"""Pre-forking server for Saashq framework commands.
+
+This script is executed by the wrench's env python (not by wrench's own interpreter),
+so it may only depend on the standard library. It imports the framework once and
+forks a child for every request received on its unix socket. The client passes its
+stdin, stdout & stderr along with the request, so the child's output goes straight
+to the client's terminal.
+
+Protocol (newline delimited JSON over a SOCK_STREAM unix socket):
+        client -> server: {"argv": [...], "env": {...}, "cwd": "...", "fingerprint": "..."}
+                          sent along with 3 file descriptors (SCM_RIGHTS)
+        server -> client: {"pid": <child pid>}, then {"returncode": <exit code>}
+                          or {"restart": true} if the wrench changed since startup
+"""
+
+# imports - standard imports
+import argparse
+import array
+import json
+import os
+import runpy
+import signal
+import socket
+import sys
+import traceback
+
+# run as a script, this file's folder (wrench/utils) would come first on sys.path and
+# wrench's own app, cli, render... modules would shadow top level modules of the same
+# names in the framework
+if sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+	sys.path.pop(0)
+
+MAX_FDS = 3
+RECV_SIZE = 65536
+
+
+def recv_request(conn):
+	fds = array.array("i")
+	msg, ancdata, _flags, _addr = conn.recvmsg(
+		RECV_SIZE, socket.CMSG_LEN(MAX_FDS * fds.itemsize)
+	)
+
+	for level, type_, data in ancdata:
+		if level == socket.SOL_SOCKET and type_ == socket.SCM_RIGHTS:
+			fds.frombytes(data[: len(data) - (len(data) % fds.itemsize)])
+
+	while msg and not msg.endswith(b"\n"):
+		chunk = conn.recv(RECV_SIZE)
+		if not chunk:
+			break
+		msg += chunk
+
+	return json.loads(msg), list(fds)
+
+
+def send_message(conn, message):
+	conn.sendall(json.dumps(message).encode() + b"\n")
+
+
+def run_command(request, fds):
+	"""Runs in the forked child: takes over the client's stdio, environment and
+	working directory, then runs saashq's wrench_helper as __main__"""
+	for target, fd in enumerate(fds):
+		os.dup2(fd, target)
+		os.close(fd)
+
+	sys.stdin = open(0, closefd=False)
+	sys.stdout = open(1, "w", buffering=1, closefd=False)
+	sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+	os.environ.clear()
+	os.environ.update(request["env"])
+	os.chdir(request["cwd"])
+	sys.argv = ["wrench_helper", *request["argv"]]
+
+	# only its imports need to stay warm, the module itself is re-run as __main__
+	sys.modules.pop("saashq.utils.wrench_helper", None)
+
+	try:
+		runpy.run_module("saashq.utils.wrench_helper", run_name="__main__", alter_sys=True)
+		returncode = 0
+	except SystemExit as e:
+		if e.code is None or isinstance(e.code, int):
+			returncode = e.code or 0
+		else:
+			print(e.code, file=sys.stderr)
+			returncode = 1
+	except BaseException:
+		traceback.print_exc()
+		returncode = 1
+
+	for stream in (sys.stdout, sys.stderr):
+		try:
+			stream.flush()
+		except Exception:
+			pass
+
+	return returncode
+
+
+def handle_connection(server, conn, args):
+	try:
+		request, fds = recv_request(conn)
+	except Exception:
+		traceback.print_exc()
+		conn.close()
+		return
+
+	if request.get("fingerprint") != args.fingerprint:
+		# apps or env changed since the framework was loaded; client falls back to
+		# a fresh interpreter while this server reloads itself
+		for fd in fds:
+			os.close(fd)
+		send_message(conn, {"restart": True})
+		conn.close()
+		restart(server, args, request["fingerprint"])
+
+	if len(fds) != MAX_FDS:
+		for fd in fds:
+			os.close(fd)
+		conn.close()
+		return
+
+	pid = os.fork()
+
+	if pid:
+		for fd in fds:
+			os.close(fd)
+		conn.close()
+		return
+
+	server.close()
+	signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+	signal.signal(signal.SIGTERM, signal.SIG_DFL)
+	signal.signal(signal.SIGINT, signal.default_int_handler)
+
+	returncode = 1
+	try:
+		send_message(conn, {"pid": os.getpid()})
+		returncode = run_command(request, fds)
+		send_message(conn, {"returncode": returncode})
+	finally:
+		os._exit(returncode)
+
+
+def restart(server, args, fingerprint):
+	print(f"Wrench changed, restarting ({args.fingerprint} -> {fingerprint})", flush=True)
+	server.close()
+	os.unlink(args.socket)
+
+	argv = [sys.executable, os.path.abspath(__file__)]
+	argv += ["--socket", args.socket, "--pid-file", args.pid_file]
+	argv += ["--sites-path", args.sites_path, "--fingerprint", fingerprint]
+	os.execv(sys.executable, argv)
+
+
+def cleanup(args):
+	for path in (args.socket, args.pid_file):
+		try:
+			os.unlink(path)
+		except OSError:
+			pass
+
+
+def serve(args):
+	os.chdir(args.sites_path)
+
+	# this is the expensive part, done once for all requests served
+	import saashq.utils.wrench_helper  # noqa: F401
+
+	if os.path.exists(args.socket):
+		os.unlink(args.socket)
+
+	server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	old_umask = os.umask(0o177)
+	try:
+		server.bind(args.socket)
+	finally:
+		os.umask(old_umask)
+	server.listen(128)
+
+	with open(args.pid_file, "w") as f:
+		f.write(str(os.getpid()))
+
+	def shutdown(signum, frame):
+		cleanup(args)
+		sys.exit(0)
+
+	# children report their own exit codes to clients, let the kernel reap them
+	signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+	signal.signal(signal.SIGTERM, shutdown)
+	signal.signal(signal.SIGINT, shutdown)
+
+	print(f"Serving Saashq commands on {args.socket} ({args.fingerprint})", flush=True)
+
+	while True:
+		try:
+			conn, _ = server.accept()
+		except InterruptedError:
+			continue
+		handle_connection(server, conn, args)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--socket", required=True)
+	parser.add_argument("--pid-file", required=True)
+	parser.add_argument("--sites-path", required=True)
+	parser.add_argument("--fingerprint", required=True)
+	serve(parser.parse_args())
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,244 @@
+# imports - standard imports
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# imports - third party imports
+import click
+
+# imports - module imports
+import wrench
+from wrench.utils import exec_cmd, get_wrench_cache_path, log, which
+from wrench.utils.wrench import get_env_distributions
+
+logger = logging.getLogger(wrench.PROJECT_NAME)
+
+TEMPLATE_MANIFEST = ".wrench_template.json"
+PYTHON_INFO_SCRIPT = (
+	"import os, sys; print(sys.implementation.name, '.'.join(map(str, sys.version_info[:3])),"
+	" os.path.realpath(getattr(sys, '_base_executable', sys.executable)))"
+)
+
+
+def get_env_templates_path() -> Path:
+	return get_wrench_cache_path("envs")
+
+
+def get_python_info(python: str) -> Tuple[str, str, str]:
+	"""Returns implementation, version & base interpreter of python, which may be the
+	python of an env"""
+	out = subprocess.check_output(
+		[which(python) or python, "-c", PYTHON_INFO_SCRIPT], universal_newlines=True
+	)
+	implementation, version, executable = out.split(maxsplit=2)
+	return implementation, version, executable.strip()
+
+
+def get_env_template_path(python: str) -> Path:
+	"""Templates are keyed by interpreter & version, and by the path of the base
+	interpreter since envs symlink to it"""
+	implementation, version, executable = get_python_info(python)
+	digest = hashlib.md5(executable.encode()).hexdigest()[:8]
+	return get_env_templates_path() / f"{implementation}-{version}-{digest}"
+
+
+def get_template_manifest(template: Path) -> Optional[Dict]:
+	try:
+		with open(template / TEMPLATE_MANIFEST) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return None
+
+
+def get_pinned_distributions(wrench_path=".") -> Dict[str, str]:
+	"""Distributions of the wrench's env that can be put in a template; editable & url
+	installs belong to the wrench"""
+	return {
+		dist["name"]: dist["version"]
+		for name, dist in get_env_distributions(wrench_path).items()
+		if not dist["direct_url"] and dist["version"] and name != "pkg-resources"
+	}
+
+
+def clone_env_template(python: str, env_path: str) -> bool:
+	"""Creates env_path as a copy of the env template of python, if there is one.
+	Files are reflinked where the filesystem supports it, else hardlinked. Hardlinks
+	are safe since pip & python replace files instead of writing to them in place.
+	Files that carry the template's path (scripts, activate, pyvenv.cfg) are rewritten.
+	Returns False if the env has to be created from scratch, or already exists.
+	"""
+	if os.path.exists(env_path):
+		return False
+
+	try:
+		template = get_env_template_path(python)
+	except (OSError, subprocess.CalledProcessError, ValueError):
+		return False
+
+	manifest = get_template_manifest(template)
+	if not manifest:
+		return False
+
+	env_path = os.path.abspath(env_path)
+
+	try:
+		copy_tree(template, env_path)
+		relocate_env(env_path, manifest["path"])
+		os.remove(os.path.join(env_path, TEMPLATE_MANIFEST))
+	except Exception:
+		logger.warning("Couldn't clone env template", exc_info=True)
+		shutil.rmtree(env_path, ignore_errors=True)
+		return False
+
+	os.utime(template / TEMPLATE_MANIFEST)
+	log(f"Cloned env template {template.name} with {len(manifest['distributions'])} packages")
+	return True
+
+
+def copy_tree(source: Path, target: str, hardlink=True):
+	"""Copies source to target as reflinks where the filesystem (and GNU cp) supports
+	them, else as hardlinks if hardlink is set, else as a plain copy. Hardlinks are
+	only safe for files that are replaced rather than written to in place"""
+	if not subprocess.call(
+		["cp", "-a", "--reflink=always", str(source), target], stderr=subprocess.DEVNULL
+	):
+		return
+
+	shutil.rmtree(target, ignore_errors=True)
+	if hardlink:
+		try:
+			shutil.copytree(source, target, symlinks=True, copy_function=os.link)
+			return
+		except (OSError, shutil.Error):
+			# another filesystem
+			shutil.rmtree(target, ignore_errors=True)
+
+	shutil.copytree(source, target, symlinks=True)
+
+
+def relocate_env(env_path: str, old_path: str, new_path: str = None):
+	"""Replaces old_path with new_path (env_path by default) in shebangs, activate
+	scripts & pyvenv.cfg of the env at env_path. Files are written anew so that they
+	don't share inodes with the template anymore"""
+	old, new = old_path.encode(), (new_path or env_path).encode()
+	bin_path = Path(env_path) / "bin"
+	files = [Path(env_path) / "pyvenv.cfg"] + [
+		path for path in bin_path.iterdir() if path.is_file() and not path.is_symlink()
+	]
+
+	for path in files:
+		content = path.read_bytes()
+		if old not in content:
+			continue
+
+		mode = path.stat().st_mode
+		path.unlink()
+		path.write_bytes(content.replace(old, new))
+		path.chmod(mode)
+
+
+def update_env_template(wrench_path="."):
+	"""Builds the env template of the wrench's python from the packages installed in its
+	env, if there isn't one with the same packages. The wheelhouse was just populated
+	with these packages, so little is downloaded. Failures are logged and ignored since
+	the wrench's own env is already set up.
+	"""
+	from wrench.utils.installer import get_python_installer, get_venv_cmd
+	from wrench.utils.wheelhouse import pip_install
+
+	python = os.path.join(os.path.abspath(wrench_path), "env", "bin", "python")
+
+	try:
+		template = get_env_template_path(python)
+		base_python = get_python_info(python)[2]
+	except (OSError, subprocess.CalledProcessError, ValueError):
+		return
+
+	distributions = get_pinned_distributions(wrench_path)
+	manifest = get_template_manifest(template)
+
+	if manifest and manifest["distributions"] == distributions:
+		os.utime(template / TEMPLATE_MANIFEST)
+		return
+
+	click.secho(f"Updating env template {template.name}", fg="yellow")
+	build_path = tempfile.mkdtemp(prefix=f".{template.name}-", dir=template.parent)
+
+	try:
+		installer = get_python_installer(wrench_path)
+		exec_cmd(get_venv_cmd(base_python, build_path, installer))
+		with tempfile.NamedTemporaryFile("w", suffix=".txt") as requirements_file:
+			requirements_file.write(
+				"\n".join(f"{name}=={version}" for name, version in distributions.items())
+			)
+			requirements_file.flush()
+			pip_install(
+				f"{build_path}/bin/python",
+				f"--no-deps -r {requirements_file.name}",
+				installer=installer,
+			)
+
+		with open(os.path.join(build_path, TEMPLATE_MANIFEST), "w") as f:
+			json.dump(
+				{
+					"path": build_path,
+					"created": time.time(),
+					"distributions": distributions,
+				},
+				f,
+				indent=1,
+			)
+	except Exception:
+		shutil.rmtree(build_path, ignore_errors=True)
+		log(f"Couldn't update env template {template.name}, skipping", level=3)
+		return
+
+	if template.exists():
+		stale_path = tempfile.mkdtemp(prefix=f".{template.name}-", dir=template.parent)
+		os.rename(template, os.path.join(stale_path, "env"))
+		shutil.rmtree(stale_path, ignore_errors=True)
+
+	try:
+		os.rename(build_path, template)
+	except OSError:
+		# built by another wrench in the meantime
+		shutil.rmtree(build_path, ignore_errors=True)
+
+
+def get_env_templates() -> List[Path]:
+	return [
+		path
+		for path in get_env_templates_path().iterdir()
+		if get_template_manifest(path) is not None
+	]
+
+
+def list_env_templates():
+	from datetime import datetime
+
+	templates = sorted(get_env_templates(), key=lambda template: template.name)
+	if not templates:
+		click.echo(f"No env templates in {get_env_templates_path()}")
+		return
+
+	click.echo(f"{'TEMPLATE':40}  {'PACKAGES':>8}  {'LAST USED':19}")
+	for template in templates:
+		manifest = get_template_manifest(template)
+		last_used = datetime.fromtimestamp((template / TEMPLATE_MANIFEST).stat().st_mtime)
+		click.echo(
+			f"{template.name:40}  {len(manifest['distributions']):>8}  "
+			f"{last_used:%Y-%m-%d %H:%M:%S}"
+		)
+
+
+def clear_env_templates():
+	for path in get_env_templates_path().iterdir():
+		shutil.rmtree(path, ignore_errors=True)
+		click.echo(f"Removed {path.name}")
@@ -0,0 +1,65 @@
+# imports - standard imports
+from functools import lru_cache
+
+# imports - module imports
+from wrench.config.common_site_config import get_config
+from wrench.utils import log, which
+
+PYTHON_INSTALLERS = ("pip", "uv")
+
+
+def get_python_installer(wrench_path=".") -> str:
+	"""Returns the installer set as `python_installer` in the wrench's config, pip if
+	it isn't set or if uv isn't available on PATH"""
+	installer = get_config(wrench_path).get("python_installer") or "pip"
+
+	if installer not in PYTHON_INSTALLERS:
+		_warn_once(f"Unknown python_installer {installer!r}, using pip")
+		return "pip"
+
+	if installer == "uv" and not which("uv"):
+		_warn_once("uv isn't available on PATH, using pip to install python packages")
+		return "pip"
+
+	return installer
+
+
+@lru_cache(maxsize=None)
+def _warn_once(message: str):
+	log(message, level=3)
+
+
+def get_install_cmd(
+	python: str, installer="pip", quiet_flag="--quiet", upgrade=True, no_cache=False
+) -> str:
+	"""Returns the command installing packages into the env of python, to be followed by
+	requirements.
+
+	uv's --upgrade upgrades every package in the resolution, unlike pip's default
+	only-if-needed strategy, so it's left out; uv still installs a newer version
+	whenever the installed one doesn't satisfy a requirement.
+	"""
+	if installer == "uv":
+		cmd = f"{which('uv')} pip install --python {python} {quiet_flag}"
+		return f"{cmd} --no-cache" if no_cache else cmd
+
+	cmd = f"{python} -m pip install {quiet_flag}"
+	if upgrade:
+		cmd += " --upgrade"
+	if no_cache:
+		cmd += " --no-cache-dir"
+	return cmd
+
+
+def get_uninstall_cmd(python: str, installer="pip") -> str:
+	if installer == "uv":
+		return f"{which('uv')} pip uninstall --python {python}"
+	return f"{python} -m pip uninstall -y"
+
+
+def get_venv_cmd(python: str, env_path: str, installer="pip") -> str:
+	"""Returns the command creating an env at env_path. Envs created by uv are seeded
+	with pip, which wrench still uses to build wheels & by saashq"""
+	if installer == "uv":
+		return f"{which('uv')} venv --seed --allow-existing --python {python} {env_path}"
+	return f"{python} -m venv {env_path}"
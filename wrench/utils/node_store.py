@@ -0,0 +1,205 @@
+# imports - standard imports
+import errno
+import hashlib
+import os
+import shutil
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+# imports - third party imports
+import click
+
+# imports - module imports
+from wrench.config.common_site_config import get_config
+from wrench.utils import get_wrench_cache_path, log
+
+
+def get_node_store_path() -> Path:
+	"""Host-wide content-addressed store of files found in node_modules"""
+	return get_wrench_cache_path("node_modules")
+
+
+def is_node_store_enabled(wrench_path=".") -> bool:
+	return bool(get_config(wrench_path).get("node_modules_store"))
+
+
+def get_node_modules_paths(wrench_path=".", apps: List[str] = None) -> List[str]:
+	"""node_modules of the wrench & of apps, including those of their top level folders
+	(eg. apps/app/frontend/node_modules)"""
+	apps_path = os.path.join(wrench_path, "apps")
+	apps = apps if apps is not None else sorted(os.listdir(apps_path))
+	candidates = [os.path.join(wrench_path, "node_modules")]
+
+	for app in apps:
+		app_path = os.path.join(apps_path, app)
+		candidates.append(os.path.join(app_path, "node_modules"))
+		try:
+			with os.scandir(app_path) as entries:
+				candidates.extend(
+					os.path.join(entry.path, "node_modules")
+					for entry in entries
+					if entry.is_dir(follow_symlinks=False)
+					and entry.name not in ("node_modules", ".git")
+				)
+		except OSError:
+			continue
+
+	return [path for path in candidates if os.path.isdir(path)]
+
+
+def iter_files(path: str) -> Iterator[os.DirEntry]:
+	"""Regular files under path; symlinks aren't followed"""
+	stack = [path]
+	while stack:
+		try:
+			entries = os.scandir(stack.pop())
+		except OSError:
+			continue
+
+		with entries:
+			for entry in entries:
+				if entry.is_dir(follow_symlinks=False):
+					stack.append(entry.path)
+				elif entry.is_file(follow_symlinks=False):
+					yield entry
+
+
+def get_store_key(path: str, st: os.stat_result) -> str:
+	digest = hashlib.sha256()
+	with open(path, "rb") as f:
+		for chunk in iter(lambda: f.read(1 << 20), b""):
+			digest.update(chunk)
+
+	# hardlinks share permissions, so they are a part of the key
+	return f"{digest.hexdigest()}-{stat.S_IMODE(st.st_mode):o}"
+
+
+def link_node_modules(node_modules_path: str, store: Path = None) -> Tuple[int, int]:
+	"""Replaces files under node_modules_path by hardlinks to identical files in the
+	store, adding those it doesn't have yet. Returns the number & size of files that
+	were replaced. Files that are hardlinked already are skipped, so relinking only
+	hashes files written since.
+
+	yarn unlinks files before writing them, so installs never write through to the
+	store. Tools that modify node_modules in place (eg. patch-package) would, which is
+	why the store is opt-in.
+	"""
+	store = store or get_node_store_path()
+	linked = saved = 0
+
+	for entry in iter_files(node_modules_path):
+		st = entry.stat(follow_symlinks=False)
+		if st.st_nlink > 1 or not st.st_size:
+			continue
+
+		key = get_store_key(entry.path, st)
+		store_path = store / key[:2] / key[2:]
+		store_path.parent.mkdir(exist_ok=True)
+
+		try:
+			os.link(entry.path, store_path)
+			continue
+		except FileExistsError:
+			pass
+		except OSError as e:
+			if e.errno != errno.EXDEV:
+				raise
+			log(f"{store} is on another filesystem than {node_modules_path}", level=3)
+			break
+
+		tmp_path = f"{entry.path}.wrench-link"
+		os.link(store_path, tmp_path)
+		os.replace(tmp_path, entry.path)
+		linked += 1
+		saved += st.st_size
+
+	return linked, saved
+
+
+def link_apps_node_modules(wrench_path=".", apps: List[str] = None, jobs=1):
+	"""Links node_modules of apps to the store, if the wrench has `node_modules_store`
+	set in its config"""
+	if not is_node_store_enabled(wrench_path):
+		return
+
+	store = get_node_store_path()
+	paths = get_node_modules_paths(wrench_path, apps)
+	with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+		results = list(executor.map(lambda path: link_node_modules(path, store), paths))
+
+	linked = sum(files for files, _ in results)
+	saved = sum(size for _, size in results)
+	if linked:
+		log(f"Linked {linked} files ({saved / 1_000_000:.1f} MB) of node_modules to {store}")
+
+
+def copy_node_modules(source: str, target: str):
+	"""Copies node_modules at source as hardlinks, falling back to a plain copy"""
+	try:
+		shutil.copytree(source, target, symlinks=True, copy_function=os.link)
+	except (OSError, shutil.Error):
+		shutil.rmtree(target, ignore_errors=True)
+		shutil.copytree(source, target, symlinks=True)
+
+
+def get_disk_usage(path: str) -> Tuple[int, int]:
+	"""Returns the size of files under path, and of those shared with other places"""
+	total = shared = 0
+	for entry in iter_files(path):
+		st = entry.stat(follow_symlinks=False)
+		total += st.st_size
+		if st.st_nlink > 1:
+			shared += st.st_size
+	return total, shared
+
+
+def get_store_usage() -> Tuple[int, int, int, int]:
+	"""Returns the number of files in the store, their size, the size saved host-wide
+	by linking them, and the size of files no node_modules links to anymore"""
+	files = size = saved = unused = 0
+	for entry in iter_files(str(get_node_store_path())):
+		st = entry.stat(follow_symlinks=False)
+		files += 1
+		size += st.st_size
+		# one link is the store's, one is the copy that would exist anyway
+		saved += st.st_size * max(st.st_nlink - 2, 0)
+		if st.st_nlink == 1:
+			unused += st.st_size
+	return files, size, saved, unused
+
+
+def prune_node_store() -> int:
+	"""Removes files of the store that no node_modules links to. Returns their size"""
+	removed = 0
+	for entry in iter_files(str(get_node_store_path())):
+		st = entry.stat(follow_symlinks=False)
+		if st.st_nlink == 1:
+			os.remove(entry.path)
+			removed += st.st_size
+	return removed
+
+
+def print_disk_usage(wrench_path="."):
+	mb = 1_000_000
+	wrench_path = os.path.abspath(wrench_path)
+
+	click.echo(f"{'NODE_MODULES':60}  {'SIZE':>12}  {'SHARED':>12}")
+	total = total_shared = 0
+	for path in get_node_modules_paths(wrench_path):
+		size, shared = get_disk_usage(path)
+		total += size
+		total_shared += shared
+		click.echo(
+			f"{os.path.relpath(path, wrench_path):60}  {size / mb:>9.1f} MB  {shared / mb:>9.1f} MB"
+		)
+	click.echo(f"{'Total':60}  {total / mb:>9.1f} MB  {total_shared / mb:>9.1f} MB")
+
+	files, size, saved, unused = get_store_usage()
+	state = "enabled" if is_node_store_enabled(wrench_path) else "disabled"
+	click.echo(
+		f"\nStore ({state} for this wrench): {files} files, {size / mb:.1f} MB in"
+		f" {get_node_store_path()}\nSaved host-wide by linking: {saved / mb:.1f} MB"
+		f"\nNot linked anymore (see `wrench cache node-modules --prune`): {unused / mb:.1f} MB"
+	)
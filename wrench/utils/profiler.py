@@ -0,0 +1,74 @@
+"""Wall time profiler for wrench's CLI, enabled by passing `--profile-cli`.
+
+Spans are collected in memory and written as a Chrome trace (Trace Event Format)
+which can be opened in chrome://tracing or https://ui.perfetto.dev
+"""
+
+# imports - standard imports
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+enabled = False
+events = []
+
+
+def enable():
+	global enabled
+	enabled = True
+
+
+def add_span(name: str, start: float, end: float, category: str = "wrench", **args):
+	"""Records a span; start and end are values of time.perf_counter()"""
+	if not enabled:
+		return
+
+	events.append(
+		{
+			"name": name,
+			"cat": category,
+			"ph": "X",
+			"ts": round(start * 1_000_000),
+			"dur": round((end - start) * 1_000_000),
+			"pid": os.getpid(),
+			"tid": threading.get_ident(),
+			"args": args,
+		}
+	)
+
+
+@contextmanager
+def span(name: str, category: str = "wrench", **args):
+	if not enabled:
+		yield
+		return
+
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		add_span(name, start, time.perf_counter(), category, **args)
+
+
+def write(wrench_path=".") -> Optional[str]:
+	"""Writes collected spans to the wrench's logs folder (or wrench_path if it
+	doesn't have one) and returns the file's path"""
+	if not enabled or not events:
+		return None
+
+	logs_path = os.path.join(wrench_path, "logs")
+	trace_dir = logs_path if os.path.isdir(logs_path) else wrench_path
+	trace_path = os.path.join(
+		os.path.abspath(trace_dir),
+		f"wrench-profile-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.json",
+	)
+
+	with open(trace_path, "w") as f:
+		json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+	events.clear()
+	return trace_path
@@ -7,6 +7,7 @@ import click
 
 # imports - module imports
 import wrench
+from wrench.utils import profiler
 
 
 class Capturing(list):
@@ -95,7 +96,7 @@ def job(title: str = None, success: str = None):
 
 	def innfn(fn):
 		def wrapper_fn(*args, **kwargs):
-			with Rendering(
+			with profiler.span(fn.__qualname__, "job"), Rendering(
 				success=success,
 				title=title,
 				is_parent=True,
@@ -116,7 +117,7 @@ def step(title: str = None, success: str = None):
 
 	def innfn(fn):
 		def wrapper_fn(*args, **kwargs):
-			with Rendering(
+			with profiler.span(fn.__qualname__, "step"), Rendering(
 				success=success,
 				title=title,
 				is_parent=False,
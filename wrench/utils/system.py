@@ -36,6 +36,8 @@ def init(
 	python="python3",
 	install_app=None,
 	dev=False,
+	clone_mode="copy",
+	jobs=1,
 ):
 	"""Initialize a new wrench directory
 
@@ -46,6 +48,7 @@ def init(
 	* setup patches.txt for wrench
 	* clone & install saashq
 	        * install python & node dependencies
+	        * save the env as the host's env template
 	        * build assets
 	* setup backups crontab
 	"""
@@ -55,6 +58,7 @@ def init(
 
 	import wrench.cli
 	from wrench.app import get_app, install_apps_from_path
+	from wrench.utils.env_template import update_env_template
 	from wrench.wrench import Wrench
 
 	verbose = wrench.cli.verbose or verbose
@@ -77,7 +81,11 @@ def init(
 	# local apps
 	if clone_from:
 		clone_apps_from(
-			wrench_path=path, clone_from=clone_from, update_app=not clone_without_update
+			wrench_path=path,
+			clone_from=clone_from,
+			update_app=not clone_without_update,
+			link=clone_mode == "link",
+			jobs=jobs,
 		)
 
 	# remote apps
@@ -108,6 +116,9 @@ def init(
 			resolve_deps=False,
 		)
 
+	# env was set up before saashq was fetched, the next wrench on this host can clone it
+	update_env_template(path)
+
 	if not skip_assets:
 		build_assets(wrench_path=path)
 
@@ -172,6 +183,11 @@ def migrate_site(site, wrench_path="."):
 	run_saashq_cmd("--site", site, "migrate", wrench_path=wrench_path)
 
 
+def clear_site_cache(site, wrench_path="."):
+	run_saashq_cmd("--site", site, "clear-cache", wrench_path=wrench_path)
+	run_saashq_cmd("--site", site, "clear-website-cache", wrench_path=wrench_path)
+
+
 def backup_site(site, wrench_path="."):
 	run_saashq_cmd("--site", site, "backup", wrench_path=wrench_path)
 
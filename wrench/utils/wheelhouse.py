@@ -0,0 +1,211 @@
+# imports - standard imports
+import os
+import re
+import socket
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+from urllib.parse import urlparse
+
+# imports - third party imports
+import click
+
+# imports - module imports
+from wrench.config.common_site_config import get_config
+from wrench.utils import exec_cmd, get_wrench_cache_path, log
+from wrench.utils.installer import get_install_cmd, get_python_installer
+from wrench.utils.wrench import get_env_distributions, normalize_package_name
+
+DEFAULT_WHEELHOUSE_SIZE_BUDGET = 2048  # MB
+
+
+def get_wheelhouse_path() -> Path:
+	"""Host-wide directory of wheels shared by all wrenches of the user. Wheel file names
+	carry python & platform tags, so one directory serves all envs"""
+	return get_wrench_cache_path("wheels")
+
+
+def get_wheels(wheelhouse: Path = None) -> List[Path]:
+	wheelhouse = wheelhouse or get_wheelhouse_path()
+	return [p for p in wheelhouse.iterdir() if p.suffix == ".whl"]
+
+
+def parse_wheel_name(wheel: Path) -> Tuple[str, str]:
+	"""Returns normalized project name & version from a wheel's file name"""
+	name, version = wheel.name.split("-")[:2]
+	return normalize_package_name(name), version
+
+
+def pip_install(
+	python: str, requirements: str, cwd=".", quiet_flag="--quiet", installer: str = None
+):
+	"""Installs requirements from the package index, with the wheelhouse as an extra
+	source so that cached wheels aren't downloaded or built again. installer defaults
+	to the `python_installer` of the wrench at cwd.
+
+	Installs only resolve from the wheelhouse alone (`--no-index`) if the wrench has
+	`offline_installs` set, or if the package index can't be reached.
+	"""
+	installer = installer or get_python_installer(cwd)
+	wheelhouse = get_wheelhouse_path()
+	install_cmd = get_install_cmd(python, installer, quiet_flag=quiet_flag)
+	cmd = f"{install_cmd} --find-links {wheelhouse} {requirements}"
+
+	if get_config(cwd).get("offline_installs"):
+		cmd += " --no-index"
+	elif not is_package_index_reachable():
+		log("The package index can't be reached, installing from the wheelhouse", level=3)
+		cmd += " --no-index"
+
+	exec_cmd(cmd, cwd=cwd)
+
+
+@lru_cache(maxsize=None)
+def is_package_index_reachable(timeout: float = 3) -> bool:
+	"""Checks whether a connection can be opened to the package index used by pip (or
+	uv), PyPI unless configured otherwise. Hosts going through a proxy are assumed to
+	reach it"""
+	if any(os.environ.get(var) for var in ("HTTPS_PROXY", "https_proxy")):
+		return True
+
+	index_url = (
+		os.environ.get("PIP_INDEX_URL")
+		or os.environ.get("UV_INDEX_URL")
+		or "https://pypi.org/simple"
+	)
+	url = urlparse(index_url)
+	if url.scheme not in ("http", "https") or not url.hostname:
+		return True
+
+	port = url.port or (443 if url.scheme == "https" else 80)
+	try:
+		socket.create_connection((url.hostname, port), timeout=timeout).close()
+	except OSError:
+		return False
+	return True
+
+
+def get_build_requirements(app_paths: List[str]) -> Set[str]:
+	"""Returns [build-system] requires of apps, needed to build them offline. setuptools
+	also asks for wheel when building editable installs"""
+	try:
+		from tomli import loads
+	except ImportError:
+		from tomllib import loads
+
+	requirements = set()
+
+	for app_path in app_paths:
+		pyproject_path = os.path.join(app_path, "pyproject.toml")
+		if not os.path.exists(pyproject_path):
+			requirements.update(("setuptools", "wheel"))
+			continue
+
+		with open(pyproject_path) as f:
+			build_system = loads(f.read()).get("build-system", {})
+		requirements.update(build_system.get("requires", ["setuptools", "wheel"]))
+		if build_system.get("build-backend", "setuptools").startswith("setuptools"):
+			requirements.add("wheel")
+
+	return requirements
+
+
+def populate_wheelhouse(python: str, wrench_path=".", app_paths: List[str] = None):
+	"""Saves wheels of everything installed in the wrench's env (except editable & url
+	installs) and build requirements of apps to the wheelhouse. Wheels already present
+	are only marked as used, so once the wheelhouse is warm this doesn't invoke pip.
+	Failures are logged and ignored since the install itself has succeeded.
+	"""
+	wheelhouse = get_wheelhouse_path()
+	wheels = {parse_wheel_name(wheel): wheel for wheel in get_wheels(wheelhouse)}
+	wheel_names = {name for name, _ in wheels}
+
+	requirements = []
+	for name, dist in get_env_distributions(wrench_path).items():
+		if dist["direct_url"] or not dist["version"] or name == "pkg-resources":
+			continue
+
+		wheel = wheels.get((name, dist["version"]))
+		if wheel:
+			wheel.touch()
+		else:
+			requirements.append(f"{dist['name']}=={dist['version']}")
+
+	for requirement in get_build_requirements(app_paths or []):
+		name = re.split(r"[\s<>=!~;\[]", requirement, maxsplit=1)[0]
+		if normalize_package_name(name) not in wheel_names:
+			requirements.append(requirement)
+
+	if not requirements:
+		return
+
+	with tempfile.NamedTemporaryFile("w", suffix=".txt") as requirements_file:
+		requirements_file.write("\n".join(requirements))
+		requirements_file.flush()
+
+		try:
+			exec_cmd(
+				f"{python} -m pip wheel --quiet --wheel-dir {wheelhouse}"
+				f" --find-links {wheelhouse} -r {requirements_file.name}",
+				cwd=wrench_path,
+			)
+		except Exception:
+			log("Couldn't save some wheels to the wheelhouse, skipping", level=3)
+			return
+
+	prune_wheelhouse(quiet=True)
+
+
+def prune_wheelhouse(size_budget: int = DEFAULT_WHEELHOUSE_SIZE_BUDGET, quiet=False):
+	"""Removes least recently used wheels until the wheelhouse fits in size_budget MB"""
+	wheels = sorted(get_wheels(), key=lambda wheel: wheel.stat().st_mtime)
+	total_size = sum(wheel.stat().st_size for wheel in wheels)
+	budget = size_budget * 1_000_000
+	removed: Dict[str, int] = {}
+
+	for wheel in wheels:
+		if total_size <= budget:
+			break
+		size = wheel.stat().st_size
+		wheel.unlink()
+		total_size -= size
+		removed[wheel.name] = size
+
+	if quiet:
+		return
+
+	for name in removed:
+		click.echo(f"Removed {name}")
+
+	if removed:
+		click.echo(
+			f"Cleared {sum(removed.values()) / 1_000_000:.3f} MB belonging to"
+			f" {len(removed)} wheels, {total_size / 1_000_000:.3f} MB left"
+		)
+	else:
+		click.echo(f"Wheelhouse is within {size_budget} MB, no wheels removed")
+
+
+def list_wheelhouse():
+	from datetime import datetime
+
+	wheels = sorted(get_wheels(), key=lambda wheel: wheel.name.lower())
+	if not wheels:
+		click.echo(f"No wheels in {get_wheelhouse_path()}")
+		return
+
+	click.echo(f"{'WHEEL':90}  {'SIZE':>13}  {'LAST USED':19}")
+	total_size = 0
+	for wheel in wheels:
+		stat = wheel.stat()
+		total_size += stat.st_size
+		last_used = datetime.fromtimestamp(stat.st_mtime)
+		click.echo(
+			f"{wheel.name:90}  {stat.st_size / 1_000_000:>10.3f} MB  "
+			f"{last_used:%Y-%m-%d %H:%M:%S}"
+		)
+
+	click.echo(
+		f"\nTotal: {len(wheels)} wheels, {total_size / 1_000_000:.3f} MB in {get_wheelhouse_path()}"
+	)
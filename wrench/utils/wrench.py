@@ -1,5 +1,4 @@
 # imports - standard imports
-import contextlib
 import json
 import logging
 import os
@@ -11,6 +10,8 @@ from functools import lru_cache
 from glob import glob
 from json.decoder import JSONDecodeError
 from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlparse
 
 # imports - third party imports
 import click
@@ -20,9 +21,12 @@ import wrench
 from wrench.exceptions import PatchError, ValidationError
 from wrench.utils import (
 	exec_cmd,
+	exec_cmds_concurrently,
 	get_wrench_cache_path,
 	get_wrench_name,
 	get_cmd_output,
+	get_git_head,
+	get_migration_fingerprint,
 	log,
 	which,
 )
@@ -49,6 +53,118 @@ def get_env_cmd(cmd: str, wrench_path: str = ".") -> str:
 	return exact_location
 
 
+def normalize_package_name(name: str) -> str:
+	"""Normalizes distribution names as per PEP 503, eg: Saashq_App -> saashq-app"""
+	return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def get_env_site_packages(wrench_path: str = ".") -> List[str]:
+	env_path = os.path.join(wrench_path, "env")
+	return sorted(
+		glob(os.path.join(env_path, "lib", "python*", "site-packages"))
+		+ glob(os.path.join(env_path, "local", "lib", "python*", "site-packages"))
+	)
+
+
+def _read_metadata_headers(path: str) -> Dict[str, str]:
+	"""Returns the headers of a METADATA/PKG-INFO file, stopping before its body"""
+	headers = {}
+
+	try:
+		with open(path, encoding="utf-8", errors="replace") as f:
+			for line in f:
+				if not line.strip():
+					break
+				key, sep, value = line.partition(":")
+				if sep and not key.startswith((" ", "\t")):
+					headers.setdefault(key.strip(), value.strip())
+	except OSError:
+		pass
+
+	return headers
+
+
+def _read_direct_url(dist_info_path: str) -> Dict:
+	"""Returns PEP 610 direct_url.json of distributions installed from a url or path"""
+	try:
+		with open(os.path.join(dist_info_path, "direct_url.json")) as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+
+def _get_editable_path(direct_url: Dict) -> Optional[str]:
+	"""Returns source path of a PEP 660 editable install, from its direct_url.json"""
+	url = direct_url.get("url", "")
+	if direct_url.get("dir_info", {}).get("editable") and url.startswith("file://"):
+		return unquote(urlparse(url).path)
+
+
+def get_env_distributions(wrench_path: str = ".") -> Dict[str, Dict]:
+	"""Returns distributions installed in the wrench's env, as a map of normalized name to
+	{"name": ..., "version": ..., "editable": <source path or None>, "direct_url": <url
+	it was installed from, if not from an index>}.
+
+	Metadata is read from *.dist-info, *.egg-info & *.egg-link entries in the env's
+	site-packages directly, so this doesn't spawn the env's python or pip.
+	"""
+	distributions = {}
+
+	for site_packages in get_env_site_packages(wrench_path):
+		try:
+			entries = sorted(os.scandir(site_packages), key=lambda entry: entry.name)
+		except OSError:
+			continue
+
+		for entry in entries:
+			editable = direct_url = None
+
+			if entry.name.endswith(".dist-info"):
+				headers = _read_metadata_headers(os.path.join(entry.path, "METADATA"))
+				direct_url = _read_direct_url(entry.path)
+				editable = _get_editable_path(direct_url)
+				direct_url = direct_url.get("url")
+
+			elif entry.name.endswith(".egg-info"):
+				metadata_path = entry.path
+				if entry.is_dir():
+					metadata_path = os.path.join(entry.path, "PKG-INFO")
+				headers = _read_metadata_headers(metadata_path)
+
+			elif entry.name.endswith(".egg-link"):
+				# legacy `setup.py develop` installs: first line is the source path
+				try:
+					with open(entry.path) as f:
+						editable = os.path.abspath(
+							os.path.join(site_packages, f.readline().strip())
+						)
+				except OSError:
+					continue
+				headers = {"Name": entry.name[: -len(".egg-link")]}
+				for pkg_info in glob(os.path.join(editable, "*.egg-info", "PKG-INFO")):
+					headers = _read_metadata_headers(pkg_info) or headers
+					break
+
+			else:
+				continue
+
+			if not headers.get("Name"):
+				continue
+
+			name = normalize_package_name(headers["Name"])
+			if name in distributions and not editable:
+				continue
+
+			distributions[name] = {
+				"name": headers["Name"],
+				"version": headers.get("Version"),
+				"editable": editable,
+				"direct_url": direct_url or editable,
+			}
+
+	return distributions
+
+
 def get_venv_path(verbose=False, python="python3"):
 	with open(os.devnull, "wb") as devnull:
 		is_venv_installed = not subprocess.call(
@@ -60,7 +176,7 @@ def get_venv_path(verbose=False, python="python3"):
 		log("venv cannot be found", level=2)
 
 
-def update_node_packages(wrench_path=".", apps=None, verbose=None):
+def update_node_packages(wrench_path=".", apps=None, verbose=None, jobs=1):
 	print("Updating node packages...")
 	from distutils.version import LooseVersion
 
@@ -73,11 +189,16 @@ def update_node_packages(wrench_path=".", apps=None, verbose=None):
 	if v < LooseVersion("11.x.x-develop"):
 		update_npm_packages(wrench_path, apps=apps, verbose=verbose)
 	else:
-		update_yarn_packages(wrench_path, apps=apps, verbose=verbose)
+		update_yarn_packages(wrench_path, apps=apps, verbose=verbose, jobs=jobs)
 
 
-def install_python_dev_dependencies(wrench_path=".", apps=None, verbose=False):
+def install_python_dev_dependencies(wrench_path=".", apps=None, verbose=False, force=False):
+	"""Installs dev dependencies of apps, from `[tool.wrench.dev-dependencies]` of their
+	pyproject.toml or their dev-requirements.txt, merged into a single pip run. Unless
+	forced, apps whose dev dependencies haven't changed since they were last installed
+	are skipped"""
 	import wrench.cli
+	from wrench.utils.installer import get_install_cmd, get_python_installer
 	from wrench.wrench import Wrench
 
 	verbose = wrench.cli.verbose or verbose
@@ -90,41 +211,85 @@ def install_python_dev_dependencies(wrench_path=".", apps=None, verbose=False):
 	elif not apps:
 		apps = wrench.get_installed_apps()
 
+	if not force:
+		apps = wrench.apps.get_changed_dependencies(apps, "dev")
+	if not apps:
+		log("Dev dependencies of all apps are up to date, skipping")
+		return
+
+	distributions = get_env_distributions(wrench_path)
+	requirements = []
+	requirement_files = []
+
 	for app in apps:
-		pyproject_deps = None
+		dev_dependencies = None
 		app_path = os.path.join(wrench_path, "apps", app)
 		pyproject_path = os.path.join(app_path, "pyproject.toml")
 		dev_requirements_path = os.path.join(app_path, "dev-requirements.txt")
 
 		if os.path.exists(pyproject_path):
-			pyproject_deps = _generate_dev_deps_pattern(pyproject_path)
-			if pyproject_deps:
-				wrench.run(f"{wrench.python} -m pip install {quiet_flag} --upgrade {pyproject_deps}")
+			dev_dependencies = _get_dev_dependencies(pyproject_path)
+			pending = {
+				pkg: version
+				for pkg, version in dev_dependencies.items()
+				if not _is_pinned_version_installed(pkg, version, distributions)
+			}
+			for requirement in _generate_dev_deps_pattern(pending).split():
+				if requirement not in requirements:
+					requirements.append(requirement)
+
+		if not dev_dependencies and os.path.exists(dev_requirements_path):
+			requirement_files.append(f"-r {dev_requirements_path}")
+
+	if requirements or requirement_files:
+		install_cmd = get_install_cmd(
+			wrench.python, get_python_installer(wrench_path), quiet_flag=quiet_flag
+		)
+		click.secho(f"\nInstalling dev dependencies for {', '.join(apps)}", fg="yellow")
+		wrench.run(f"{install_cmd} {' '.join(requirements + requirement_files)}")
 
-		if not pyproject_deps and os.path.exists(dev_requirements_path):
-			wrench.run(
-				f"{wrench.python} -m pip install {quiet_flag} --upgrade -r {dev_requirements_path}"
-			)
+	wrench.apps.update_dependency_fingerprints(apps, "dev")
 
 
-def _generate_dev_deps_pattern(pyproject_path):
+def _get_dev_dependencies(pyproject_path) -> Dict[str, str]:
 	try:
 		from tomli import loads
 	except ImportError:
 		from tomllib import loads
 
-	requirements_pattern = ""
 	pyroject_config = loads(open(pyproject_path).read())
 
-	with contextlib.suppress(KeyError):
-		for pkg, version in pyroject_config["tool"]["wrench"]["dev-dependencies"].items():
-			op = "==" if "=" not in version else ""
-			requirements_pattern += f"{pkg}{op}{version} "
+	try:
+		return dict(pyroject_config["tool"]["wrench"]["dev-dependencies"])
+	except KeyError:
+		return {}
+
+
+def _is_pinned_version_installed(pkg, version, distributions) -> bool:
+	"""Checks if an exactly pinned dependency (`x.y.z` or `==x.y.z`) is already installed,
+	other specifiers are left to pip to resolve"""
+	pinned_version = version[2:] if version.startswith("==") else version
+	if re.search(r"[=<>!~*,;]", pinned_version):
+		return False
+
+	installed = distributions.get(normalize_package_name(pkg))
+	return bool(installed) and installed["version"] == pinned_version.strip()
+
+
+def _generate_dev_deps_pattern(dev_dependencies):
+	requirements_pattern = ""
+
+	for pkg, version in dev_dependencies.items():
+		op = "==" if "=" not in version else ""
+		requirements_pattern += f"{pkg}{op}{version} "
 	return requirements_pattern
 
 
-def update_yarn_packages(wrench_path=".", apps=None, verbose=None):
+def update_yarn_packages(wrench_path=".", apps=None, verbose=None, jobs=1):
+	"""Runs `yarn install` for apps with a package.json, up to `jobs` apps at a time.
+	Installed node_modules are linked to the host's node_modules store if enabled"""
 	import wrench.cli as wrench_cli
+	from wrench.utils.node_store import link_apps_node_modules
 	from wrench.wrench import Wrench
 
 	verbose = wrench_cli.verbose or verbose
@@ -138,14 +303,18 @@ def update_yarn_packages(wrench_path=".", apps=None, verbose=None):
 		print("`npm install -g yarn`")
 		return
 
+	yarn_install = "yarn install --check-files"
+	if verbose:
+		yarn_install += " --verbose"
+
+	cmds = []
 	for app in apps:
 		app_path = os.path.join(apps_dir, app)
 		if os.path.exists(os.path.join(app_path, "package.json")):
-			click.secho(f"\nInstalling node dependencies for {app}", fg="yellow")
-			yarn_install = "yarn install --check-files"
-			if verbose:
-				yarn_install += " --verbose"
-			wrench.run(yarn_install, cwd=app_path)
+			cmds.append((f"Installing node dependencies for {app}", yarn_install, app_path))
+
+	exec_cmds_concurrently(cmds, jobs=jobs)
+	link_apps_node_modules(wrench.name, apps=list(apps), jobs=jobs)
 
 
 def update_npm_packages(wrench_path=".", apps=None, verbose=None):
@@ -186,9 +355,20 @@ def update_npm_packages(wrench_path=".", apps=None, verbose=None):
 
 
 def migrate_env(python, backup=False):
+	"""Sets up the wrench's env with another python. The new env is built next to the
+	current one, which stays live until the new one can import every app; the two are
+	then swapped atomically"""
 	import shutil
+	import time
 	from urllib.parse import urlparse
 
+	from wrench.utils.env_template import (
+		clone_env_template,
+		relocate_env,
+		update_env_template,
+	)
+	from wrench.utils.installer import get_python_installer, get_venv_cmd
+	from wrench.utils.wheelhouse import pip_install, populate_wheelhouse
 	from wrench.wrench import Wrench
 
 	wrench = Wrench(".")
@@ -196,6 +376,7 @@ def migrate_env(python, backup=False):
 	path = os.getcwd()
 	python = which(python)
 	pvenv = os.path.join(path, nvenv)
+	staging_venv = os.path.join(path, f".{nvenv}-migrate")
 
 	if python.startswith(pvenv):
 		# The supplied python version is in active virtualenv which we are about to nuke.
@@ -206,55 +387,115 @@ def migrate_env(python, backup=False):
 		)
 		sys.exit(1)
 
+	# saashq first, so that it's installed before apps depending on it
+	apps = ["saashq"] + [str(app) for app in wrench.apps if str(app) != "saashq"]
+	app_paths = [os.path.join("apps", app) for app in apps]
+	staging_python = os.path.join(staging_venv, "bin", "python")
+	shutil.rmtree(staging_venv, ignore_errors=True)
+
+	try:
+		start = time.monotonic()
+		logger.info(f"Setting up a New Virtual {python} Environment")
+		if not clone_env_template(python, staging_venv):
+			exec_cmd(get_venv_cmd(python, staging_venv, get_python_installer()))
+		log(f"Created env in {time.monotonic() - start:.1f}s")
+
+		start = time.monotonic()
+		pip_install(
+			staging_python,
+			" ".join(f"-e {app_path}" for app_path in app_paths),
+			quiet_flag="",
+		)
+		log(f"Installed {len(apps)} apps in a single run in {time.monotonic() - start:.1f}s")
+
+		check_app_imports(staging_python, apps, wrench_path=path)
+	except Exception:
+		logger.warning("Python env migration Error", exc_info=True)
+		shutil.rmtree(staging_venv, ignore_errors=True)
+		log("Migration failed, the wrench's env is unchanged", level=2)
+		raise
+
 	# Clear Cache before Wrench Dies.
 	try:
 		config = wrench.conf
 		rredis = urlparse(config["redis_cache"])
 		redis = f"{which('redis-cli')} -p {rredis.port}"
 
-		logger.log("Clearing Redis Cache...")
+		logger.info("Clearing Redis Cache...")
 		exec_cmd(f"{redis} FLUSHALL")
-		logger.log("Clearing Redis DataBase...")
+		logger.info("Clearing Redis DataBase...")
 		exec_cmd(f"{redis} FLUSHDB")
 	except Exception:
 		logger.warning("Please ensure Redis Connections are running or Daemonized.")
 
-	# Backup venv: restore using `virtualenv --relocatable` if needed
-	if backup:
+	relocate_env(staging_venv, staging_venv, pvenv)
+	if os.path.exists(pvenv):
+		exchange_paths(staging_venv, pvenv)
+	else:
+		os.rename(staging_venv, pvenv)
+
+	# the previous env is now at staging_venv
+	if backup and os.path.exists(staging_venv):
 		from datetime import datetime
 
 		parch = os.path.join(path, "archived", "envs")
 		os.makedirs(parch, exist_ok=True)
 
-		source = os.path.join(path, "env")
-		target = parch
-
-		logger.log("Backing up Virtual Environment")
+		logger.info("Backing up Virtual Environment")
 		stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-		dest = os.path.join(path, str(stamp))
+		os.rename(staging_venv, os.path.join(parch, stamp))
+	else:
+		shutil.rmtree(staging_venv, ignore_errors=True)
 
-		os.rename(source, dest)
-		shutil.move(dest, target)
+	populate_wheelhouse(f"{pvenv}/bin/python", app_paths=app_paths)
+	update_env_template()
+	logger.info(f"Migration Successful to {python}")
 
-	# Create virtualenv using specified python
-	def _install_app(app):
-		app_path = f"-e {os.path.join('apps', app)}"
-		exec_cmd(f"{pvenv}/bin/python -m pip install --upgrade {app_path}")
 
-	try:
-		logger.log(f"Setting up a New Virtual {python} Environment")
-		exec_cmd(f"{python} -m venv {pvenv}")
+def check_app_imports(python: str, apps: List[str], wrench_path="."):
+	"""Raises CommandFailedError unless python can import the module of every app. The
+	module may be named differently than the app's folder (eg. apps/erp-next/erp)"""
+	from wrench.utils import get_app_module_path
 
-		# Install saashq first
-		_install_app("saashq")
-		for app in wrench.apps:
-			if str(app) != "saashq":
-				_install_app(app)
+	modules = []
+	for app in apps:
+		module_path = get_app_module_path(os.path.join(wrench_path, "apps", app))
+		modules.append(os.path.basename(module_path) if module_path else app)
 
-		logger.log(f"Migration Successful to {python}")
-	except Exception:
-		logger.warning("Python env migration Error", exc_info=True)
-		raise
+	imports = "; ".join(f"import {module}" for module in modules)
+	exec_cmd(f"{python} -c '{imports}'")
+	log(f"New env can import {', '.join(modules)}")
+
+
+def exchange_paths(a: str, b: str):
+	"""Swaps paths a & b atomically with renameat2 where the platform has it (Linux),
+	else with three renames, leaving b missing for a moment"""
+	import ctypes
+
+	RENAME_EXCHANGE = 2
+	AT_FDCWD = -100
+
+	try:
+		renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+		renameat2.argtypes = [
+			ctypes.c_int,
+			ctypes.c_char_p,
+			ctypes.c_int,
+			ctypes.c_char_p,
+			ctypes.c_uint,
+		]
+	except (OSError, AttributeError):
+		renameat2 = None
+
+	if renameat2 and not renameat2(
+		AT_FDCWD, os.fsencode(a), AT_FDCWD, os.fsencode(b), RENAME_EXCHANGE
+	):
+		return
+
+	tmp_path = f"{b}.swap"
+	os.rename(b, tmp_path)
+	os.rename(a, b)
+	os.rename(tmp_path, a)
 
 
 def validate_upgrade(from_ver, to_ver, wrench_path="."):
@@ -283,17 +524,79 @@ def post_upgrade(from_ver, to_ver, wrench_path="."):
 		)
 
 
-def patch_sites(wrench_path="."):
+def get_migrations_state_path(wrench_path=".") -> str:
+	return os.path.join(wrench_path, "sites", ".wrench_cache", "migrations.json")
+
+
+def patch_sites(wrench_path=".", force=False) -> Dict[str, str]:
+	"""Migrates sites of the wrench. Sites that were migrated since the last change to
+	the patches, hooks or DocType JSON of the wrench's apps are skipped, unless force is
+	set; their caches are still cleared, as migrate would, if an app's commit changed.
+	Fingerprints & commits of apps are recorded per site in sites/.wrench_cache once
+	it's migrated. Returns & prints the decision taken for each site."""
 	from wrench.wrench import Wrench
-	from wrench.utils.system import migrate_site
+	from wrench.utils.system import clear_site_cache, migrate_site
 
 	wrench = Wrench(wrench_path)
+	state_path = get_migrations_state_path(wrench_path)
+	fingerprints = {
+		app: get_migration_fingerprint(app, wrench_path=wrench_path) for app in wrench.apps
+	}
+	heads = {app: get_git_head(os.path.join(wrench_path, "apps", app)) for app in wrench.apps}
 
+	try:
+		with open(state_path) as f:
+			state = json.load(f)
+	except (OSError, ValueError):
+		state = {}
+
+	report = {}
 	for site in wrench.sites:
-		try:
-			migrate_site(site, wrench_path=wrench_path)
-		except subprocess.CalledProcessError:
-			raise PatchError
+		migrated = (state.get(site) or {}).get("fingerprints") or {}
+		migrated_heads = (state.get(site) or {}).get("heads") or {}
+		changed_apps = [app for app in fingerprints if migrated.get(app) != fingerprints[app]]
+
+		if not force and migrated == fingerprints:
+			# python code & templates may have changed, which migrate's cache clearing covers
+			updated_apps = [app for app in heads if migrated_heads.get(app) != heads[app]]
+			if updated_apps:
+				try:
+					clear_site_cache(site, wrench_path=wrench_path)
+				except subprocess.CalledProcessError:
+					raise PatchError
+				report[site] = f"skipped, cleared caches for new commits in {', '.join(updated_apps)}"
+			else:
+				report[site] = "skipped, no changes to patches, hooks or DocTypes"
+			logger.info(f"skipping migrate for {site}: {report[site]}")
+		else:
+			try:
+				migrate_site(site, wrench_path=wrench_path)
+			except subprocess.CalledProcessError:
+				raise PatchError
+
+			if force and not changed_apps:
+				report[site] = "migrated, forced"
+			elif not migrated:
+				report[site] = "migrated, not migrated by wrench before"
+			else:
+				report[site] = f"migrated, changes in {', '.join(changed_apps)}"
+
+		if state.get(site) == {"fingerprints": fingerprints, "heads": heads}:
+			continue
+
+		state = {s: state[s] for s in wrench.sites if s in state}
+		state[site] = {"fingerprints": fingerprints, "heads": heads}
+		os.makedirs(os.path.dirname(state_path), exist_ok=True)
+		with open(f"{state_path}.tmp", "w") as f:
+			json.dump(state, f, indent=1)
+		os.replace(f"{state_path}.tmp", state_path)
+
+	if report:
+		click.echo(f"\n{'SITE':40}  MIGRATION")
+		for site, decision in report.items():
+			click.echo(f"{site:40}  {decision}")
+
+	return report
 
 
 def restart_supervisor_processes(wrench_path=".", web_workers=False, _raise=False):
@@ -368,10 +671,14 @@ def restart_process_manager(wrench_path=".", web_workers=False):
 		exec_cmd(f"overmind restart {worker}", cwd=wrench_path)
 
 
-def build_assets(wrench_path=".", app=None, using_cached=False):
+def build_assets(wrench_path=".", app=None, using_cached=False, apps=None):
+	"""Builds assets of app, of apps at once, or of all apps if neither is passed"""
+	apps = [app] if app else apps
 	command = "wrench build"
 	if app:
 		command += f" --app {app}"
+	elif apps:
+		command += f" --apps {','.join(apps)}"
 
 	env = {"WRENCH_DEVELOPER": "1"}
 	if using_cached:
@@ -379,6 +686,11 @@ def build_assets(wrench_path=".", app=None, using_cached=False):
 
 	exec_cmd(command, cwd=wrench_path, env=env)
 
+	from wrench.wrench import Wrench
+
+	wrench = Wrench(wrench_path)
+	wrench.apps.update_dependency_fingerprints(apps or wrench.apps.apps, "assets")
+
 
 def handle_version_upgrade(version_upgrade, wrench_path, force, reset, conf):
 	from wrench.utils import log, pause_exec
@@ -423,15 +735,19 @@ def update(
 	backup: bool = True,
 	compile: bool = True,
 	force: bool = False,
+	reinstall: bool = False,
 	reset: bool = False,
 	restart_supervisor: bool = False,
 	restart_systemd: bool = False,
+	jobs: int = 1,
+	fetch_jobs: Optional[int] = None,
+	force_migrate: bool = False,
 ):
 	"""command: wrench update"""
 	import re
 
 	from wrench import patches
-	from wrench.app import pull_apps
+	from wrench.app import DEFAULT_FETCH_JOBS, pull_apps
 	from wrench.wrench import Wrench
 	from wrench.config.common_site_config import update_config
 	from wrench.exceptions import CannotUpdateReleaseWrench
@@ -459,8 +775,10 @@ def update(
 	version_upgrade = is_version_upgrade()
 	handle_version_upgrade(version_upgrade, wrench_path, force, reset, conf)
 
+	# only the changed keys are written, so that changes made to the config by other
+	# processes while the update runs aren't overwritten with this stale copy
 	conf.update({"maintenance_mode": 1, "pause_scheduler": 1})
-	update_config(conf, wrench_path=wrench_path)
+	update_config({"maintenance_mode": 1, "pause_scheduler": 1}, wrench_path=wrench_path)
 
 	if backup:
 		print("Backing up sites...")
@@ -468,27 +786,31 @@ def update(
 
 	if pull:
 		print("Updating apps source...")
-		pull_apps(apps=apps, wrench_path=wrench_path, reset=reset)
+		pull_apps(
+			apps=apps, wrench_path=wrench_path, reset=reset, jobs=fetch_jobs or DEFAULT_FETCH_JOBS
+		)
 
 	if requirements:
 		print("Setting up requirements...")
-		wrench.setup.requirements()
+		wrench.setup.requirements(jobs=jobs, force=reinstall)
 
 	if patch:
 		print("Patching sites...")
-		patch_sites(wrench_path=wrench_path)
+		patch_sites(wrench_path=wrench_path, force=force_migrate or version_upgrade[0])
 
 	if build:
 		print("Building assets...")
-		wrench.build()
+		wrench.build_changed(force=reinstall)
 
 	if version_upgrade[0] or (not version_upgrade[0] and force):
 		post_upgrade(version_upgrade[1], version_upgrade[2], wrench_path=wrench_path)
 
-	wrench.reload(web=False, supervisor=restart_supervisor, systemd=restart_systemd)
+	wrench.reload(
+		web=False, supervisor=restart_supervisor, systemd=restart_systemd, precompile=compile
+	)
 
 	conf.update({"maintenance_mode": 0, "pause_scheduler": 0})
-	update_config(conf, wrench_path=wrench_path)
+	update_config({"maintenance_mode": 0, "pause_scheduler": 0}, wrench_path=wrench_path)
 
 	print(
 		"_" * 80 + "\nWrench: Deployment tool for Saashq and Saashq Applications"
@@ -498,19 +820,59 @@ def update(
 	)
 
 
-def clone_apps_from(wrench_path, clone_from, update_app=True):
-	from wrench.app import install_app
+def clone_apps_from(wrench_path, clone_from, update_app=True, link=False, jobs=1):
+	"""Copies apps of the wrench at clone_from, updates up to `jobs` of them at a time
+	and installs them with a single pip run. See link_apps_from for link"""
+	from concurrent.futures import ThreadPoolExecutor
+
+	from wrench.config.common_site_config import update_config
+	from wrench.utils.node_store import (
+		copy_node_modules,
+		get_node_modules_paths,
+		is_node_store_enabled,
+	)
+	from wrench.wrench import Wrench
+
+	with open(os.path.join(clone_from, "sites", "apps.txt")) as f:
+		apps = f.read().splitlines()
+
+	# node_modules of wrenches using the node_modules store are hardlinked, not copied
+	link_node_modules = link or is_node_store_enabled(clone_from)
+	if is_node_store_enabled(clone_from):
+		update_config({"node_modules_store": 1}, wrench_path=wrench_path)
 
 	print(f"Copying apps from {clone_from}...")
-	subprocess.check_output(["cp", "-R", os.path.join(clone_from, "apps"), wrench_path])
+	if link:
+		link_apps_from(wrench_path, clone_from, jobs=jobs)
+	elif link_node_modules:
+		shutil.copytree(
+			os.path.join(clone_from, "apps"),
+			os.path.join(wrench_path, "apps"),
+			symlinks=True,
+			ignore=shutil.ignore_patterns("node_modules"),
+			dirs_exist_ok=True,
+		)
+	else:
+		subprocess.check_output(["cp", "-R", os.path.join(clone_from, "apps"), wrench_path])
 
-	node_modules_path = os.path.join(clone_from, "node_modules")
-	if os.path.exists(node_modules_path):
-		print(f"Copying node_modules from {clone_from}...")
-		subprocess.check_output(["cp", "-R", node_modules_path, wrench_path])
+	node_modules_paths = (
+		get_node_modules_paths(clone_from)
+		if link_node_modules
+		else [os.path.join(clone_from, "node_modules")]
+	)
+	for node_modules_path in node_modules_paths:
+		if not os.path.exists(node_modules_path):
+			continue
 
-	def setup_app(app):
-		# run git reset --hard in each branch, pull latest updates and install_app
+		print(f"Copying {os.path.relpath(node_modules_path, clone_from)} from {clone_from}...")
+		target = os.path.join(wrench_path, os.path.relpath(node_modules_path, clone_from))
+		if link_node_modules:
+			copy_node_modules(node_modules_path, target)
+		else:
+			subprocess.check_output(["cp", "-R", node_modules_path, wrench_path])
+
+	def update_app_repo(app):
+		# run git reset --hard in each branch & pull latest updates
 		app_path = os.path.join(wrench_path, "apps", app)
 
 		# remove .egg-ino
@@ -518,7 +880,7 @@ def clone_apps_from(wrench_path, clone_from, update_app=True):
 
 		if update_app and os.path.exists(os.path.join(app_path, ".git")):
 			remotes = subprocess.check_output(["git", "remote"], cwd=app_path).strip().split()
-			if "upstream" in remotes:
+			if b"upstream" in remotes:
 				remote = "upstream"
 			else:
 				remote = remotes[0]
@@ -529,13 +891,64 @@ def clone_apps_from(wrench_path, clone_from, update_app=True):
 			subprocess.check_output(["git", "reset", "--hard"], cwd=app_path)
 			subprocess.check_output(["git", "pull", "--rebase", remote, branch], cwd=app_path)
 
-		install_app(app, wrench_path, restart_wrench=False)
-
-	with open(os.path.join(clone_from, "sites", "apps.txt")) as f:
-		apps = f.read().splitlines()
+	with ThreadPoolExecutor(max_workers=jobs) as executor:
+		list(executor.map(update_app_repo, apps))
 
+	# the wrench was cached before its apps were copied; they're added to its states so
+	# that their dependency fingerprints get recorded
+	wrench = Wrench(wrench_path)
 	for app in apps:
-		setup_app(app)
+		wrench.apps.sync(app_name=app)
+
+	# python dependencies of all apps are installed by one pip run, node ones `jobs`
+	# apps at a time; assets are built by the caller
+	wrench.setup.requirements(apps=apps, jobs=jobs, force=True)
+
+
+def link_apps_from(wrench_path, clone_from, jobs=1):
+	"""Sets up apps of the wrench at clone_from without copying their files: git repos
+	are cloned locally, which hardlinks their objects, and check out the same branch
+	with the same remotes. Only committed work is carried over. Built assets are
+	reflinked where the filesystem supports it, else copied, since bundlers rewrite
+	them in place. Other apps are copied as is.
+	"""
+	from concurrent.futures import ThreadPoolExecutor
+
+	from wrench.utils.env_template import copy_tree
+
+	apps_path = os.path.join(wrench_path, "apps")
+	os.makedirs(apps_path, exist_ok=True)
+
+	def link_app(app):
+		source = os.path.join(clone_from, "apps", app)
+		target = os.path.join(apps_path, app)
+
+		# .git is a file in worktrees & submodules
+		if not os.path.exists(os.path.join(source, ".git")):
+			copy_tree(source, target, hardlink=False)
+			return
+
+		subprocess.check_output(["git", "clone", "--quiet", source, target])
+		remotes = get_cmd_output("git remote", cwd=source).split()
+		subprocess.check_output(["git", "remote", "remove", "origin"], cwd=target)
+		for remote in remotes:
+			url = get_cmd_output(f"git remote get-url {remote}", cwd=source)
+			subprocess.check_output(["git", "remote", "add", remote, url], cwd=target)
+
+		dist_path = os.path.join(source, app, "public", "dist")
+		if os.path.isdir(dist_path):
+			target_dist_path = os.path.join(target, app, "public", "dist")
+			os.makedirs(os.path.dirname(target_dist_path), exist_ok=True)
+			shutil.rmtree(target_dist_path, ignore_errors=True)
+			copy_tree(dist_path, target_dist_path, hardlink=False)
+
+	apps = [
+		entry.name
+		for entry in os.scandir(os.path.join(clone_from, "apps"))
+		if entry.is_dir() and not entry.name.startswith(".")
+	]
+	with ThreadPoolExecutor(max_workers=jobs) as executor:
+		list(executor.map(link_app, apps))
 
 
 def remove_backups_crontab(wrench_path="."):
@@ -572,18 +985,9 @@ def set_redis_socketio_host(host, wrench_path="."):
 
 
 def update_common_site_config(ddict, wrench_path="."):
-	filename = os.path.join(wrench_path, "sites", "common_site_config.json")
-
-	if os.path.exists(filename):
-		with open(filename) as f:
-			content = json.load(f)
-
-	else:
-		content = {}
+	from wrench.config.common_site_config import update_config
 
-	content.update(ddict)
-	with open(filename, "w") as f:
-		json.dump(content, f, indent=1, sort_keys=True)
+	update_config(ddict, wrench_path=wrench_path)
 
 
 def validate_app_installed_on_sites(app, wrench_path="."):
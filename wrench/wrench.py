@@ -6,20 +6,28 @@ import shutil
 import json
 import sys
 import logging
-from typing import List, MutableSequence, TYPE_CHECKING, Union
+import time
+from typing import Dict, List, MutableSequence, TYPE_CHECKING, Union
 
 # imports - module imports
 import wrench
-from wrench.exceptions import AppNotInstalledError, InvalidRemoteException, ValidationError
+from wrench.exceptions import (
+	AppNotInstalledError,
+	CommandFailedError,
+	InvalidRemoteException,
+	ValidationError,
+)
 from wrench.config.common_site_config import setup_config
 from wrench.utils import (
 	UNSET_ARG,
 	paths_in_wrench,
 	exec_cmd,
 	is_wrench_directory,
-	is_saashq_app,
-	get_cmd_output,
+	get_saashq_apps,
+	get_app_module_path,
+	get_dependency_fingerprint,
 	get_git_version,
+	get_mtime_ns,
 	log,
 	run_saashq_cmd,
 )
@@ -31,6 +39,8 @@ from wrench.utils.wrench import (
 	remove_backups_crontab,
 	get_venv_path,
 	get_env_cmd,
+	get_env_distributions,
+	normalize_package_name,
 )
 from wrench.utils.render import job, step
 from wrench.utils.app import get_current_version
@@ -65,6 +75,7 @@ class Wrench(Base, Validator):
 		self.setup = WrenchSetup(self)
 		self.teardown = WrenchTearDown(self)
 		self.apps = WrenchApps(self)
+		self.site_index = WrenchSites(self)
 
 		self.apps_txt = os.path.join(self.name, "sites", "apps.txt")
 		self.excluded_apps_txt = os.path.join(self.name, "sites", "excluded_apps.txt")
@@ -93,11 +104,7 @@ class Wrench(Base, Validator):
 
 	@property
 	def sites(self) -> List:
-		return [
-			path
-			for path in os.listdir(os.path.join(self.name, "sites"))
-			if os.path.exists(os.path.join("sites", path, "site_config.json"))
-		]
+		return self.site_index.sites
 
 	@property
 	def conf(self):
@@ -142,12 +149,36 @@ class Wrench(Base, Validator):
 	def build(self):
 		# build assets & stuff
 		run_saashq_cmd("build", wrench_path=self.name)
+		self.apps.update_dependency_fingerprints(self.apps.apps, "assets")
+
+	def build_changed(self, force=False):
+		"""Builds assets of apps whose frontend sources changed since their last build.
+		All apps are built at once if saashq's changed, since it carries the build
+		tooling."""
+		from wrench.utils.wrench import build_assets
+
+		changed_apps = (
+			list(self.apps) if force else self.apps.get_changed_dependencies(self.apps, "assets")
+		)
+
+		if not changed_apps:
+			log("Assets of all apps are up to date, skipping build")
+		elif "saashq" in changed_apps:
+			self.build()
+		else:
+			build_assets(wrench_path=self.name, apps=changed_apps)
 
 	@step(title="Reloading Wrench Processes", success="Wrench Processes Reloaded")
-	def reload(self, web=False, supervisor=True, systemd=True, _raise=True):
-		"""If web is True, only web workers are restarted"""
+	def reload(self, web=False, supervisor=True, systemd=True, _raise=True, precompile=True):
+		"""If web is True, only web workers are restarted. Bytecode of apps & the env is
+		compiled beforehand unless precompile is False"""
+		from wrench.utils.bytecode import precompile as precompile_bytecode
+
 		conf = self.conf
 
+		if precompile:
+			precompile_bytecode(self.name)
+
 		if conf.get("developer_mode"):
 			restart_process_manager(wrench_path=self.name, web_workers=web)
 		if supervisor or conf.get("restart_supervisor_on_update"):
@@ -157,18 +188,86 @@ class Wrench(Base, Validator):
 
 	def get_installed_apps(self) -> List:
 		"""Returns list of installed apps on wrench, not in excluded_apps.txt"""
-		try:
-			installed_packages = get_cmd_output(f"{self.python} -m pip freeze", cwd=self.name)
-		except Exception:
-			installed_packages = []
+		excluded_apps = self.excluded_apps
+		return [app for app in self.get_env_apps() if app not in excluded_apps]
+
+	def get_env_apps(self) -> List:
+		"""Returns list of apps on wrench that are installed in its env"""
+		distributions = get_env_distributions(self.name)
+		editable_paths = {d["editable"] for d in distributions.values() if d["editable"]}
 
 		return [
 			app
 			for app in self.apps
-			if app not in self.excluded_apps and app in installed_packages
+			if normalize_package_name(app) in distributions
+			or os.path.abspath(os.path.join(self.name, "apps", app)) in editable_paths
 		]
 
 
+class WrenchSites:
+	"""Index of the wrench's sites, ie folders under sites/ with a site_config.json.
+
+	The index is rebuilt only when the mtime of the sites folder changes (a site being
+	created, dropped or renamed), site configs are parsed lazily on first access.
+	"""
+
+	def __init__(self, wrench: Wrench):
+		self.wrench = wrench
+		self.sites_path = os.path.join(self.wrench.name, "sites")
+		self.mtime = None
+		self.site_names = []
+		# folders without a site_config.json yet, re-checked on every access since
+		# creating a file inside them doesn't change the mtime of sites/
+		self.other_folders = []
+
+	@property
+	def sites(self) -> List:
+		mtime = get_mtime_ns(self.sites_path)
+
+		if mtime is None:
+			self.mtime, self.site_names, self.other_folders = None, [], []
+			return []
+
+		if mtime != self.mtime:
+			self.build(mtime)
+		elif self.other_folders:
+			self.check_other_folders()
+
+		return list(self.site_names)
+
+	def build(self, mtime):
+		self.mtime = mtime
+		self.site_names, self.other_folders = [], []
+
+		for entry in os.scandir(self.sites_path):
+			if not entry.is_dir():
+				continue
+			if os.path.exists(os.path.join(entry.path, "site_config.json")):
+				self.site_names.append(entry.name)
+			elif entry.name != "assets" and not entry.name.startswith("."):
+				self.other_folders.append(entry.name)
+
+	def check_other_folders(self):
+		for folder in list(self.other_folders):
+			if os.path.exists(os.path.join(self.sites_path, folder, "site_config.json")):
+				self.other_folders.remove(folder)
+				self.site_names.append(folder)
+
+	def get_config(self, site) -> Dict:
+		from wrench.config.site_config import get_site_config
+
+		return get_site_config(site, wrench_path=self.wrench.name)
+
+	def __contains__(self, site):
+		return site in self.sites
+
+	def __iter__(self):
+		return iter(self.sites)
+
+	def __len__(self):
+		return len(self.sites)
+
+
 class WrenchApps(MutableSequence):
 	def __init__(self, wrench: Wrench):
 		self.wrench = wrench
@@ -256,6 +355,62 @@ class WrenchApps(MutableSequence):
 		with open(self.states_path, "w") as f:
 			f.write(json.dumps(self.states, indent=4))
 
+	def get_changed_dependencies(self, apps: List[str], kind: str) -> List[str]:
+		"""Returns apps whose dependencies of kind ("python", "node" or "dev") may have
+		changed since they were last installed, ie their manifests' fingerprint differs
+		from the one recorded in apps.json or their installation is missing. For
+		"assets", apps whose frontend sources changed since they were last built or whose
+		build output is missing"""
+		if kind == "python":
+			installed_apps = self.wrench.get_env_apps()
+
+		changed_apps = []
+		for app in apps:
+			recorded = self.states.get(app, {}).get("dependency_fingerprints", {})
+
+			if kind == "python":
+				installed = app in installed_apps
+			elif kind == "dev":
+				# not tracked apart from the fingerprint
+				installed = True
+			elif kind == "assets":
+				installed = self.has_built_assets(app)
+			else:
+				installed = not os.path.exists(
+					os.path.join(self.apps_path, app, "package.json")
+				) or os.path.isdir(os.path.join(self.apps_path, app, "node_modules"))
+
+			if not installed or recorded.get(kind) != get_dependency_fingerprint(
+				app, kind, wrench_path=self.wrench.name
+			):
+				changed_apps.append(app)
+
+		return changed_apps
+
+	def has_built_assets(self, app: str) -> bool:
+		"""Whether the build output the assets fingerprint stands for is still around:
+		sites/assets/assets.json, and sites/assets/<app> for apps with a public folder"""
+		assets_path = os.path.join(self.wrench.name, "sites", "assets")
+		if not os.path.exists(os.path.join(assets_path, "assets.json")):
+			return False
+
+		module_path = get_app_module_path(os.path.join(self.apps_path, app))
+		has_public = module_path and os.path.isdir(os.path.join(module_path, "public"))
+		return not has_public or os.path.exists(os.path.join(assets_path, app))
+
+	def update_dependency_fingerprints(self, apps: List[str], kind: str):
+		"""Records fingerprints of dependency manifests of apps once installed, or of
+		their frontend sources once built"""
+		for app in apps:
+			if app not in self.states:
+				continue
+			self.states[app].setdefault("dependency_fingerprints", {})[
+				kind
+			] = get_dependency_fingerprint(app, kind, wrench_path=self.wrench.name)
+
+		with open(self.states_path, "w") as f:
+			f.write(json.dumps(self.states, indent=4))
+
 	def sync(
 		self,
 		app_name: Union[str, None] = None,
@@ -276,11 +431,7 @@ class WrenchApps(MutableSequence):
 
 	def initialize_apps(self):
 		try:
-			self.apps = [
-				x
-				for x in os.listdir(os.path.join(self.wrench.name, "apps"))
-				if is_saashq_app(os.path.join(self.wrench.name, "apps", x))
-			]
+			self.apps = get_saashq_apps(self.wrench.name)
 			self.apps.remove("saashq")
 			self.apps.insert(0, "saashq")
 		except FileNotFoundError:
@@ -334,6 +485,13 @@ class WrenchSetup(Base):
 	def __init__(self, wrench: Wrench):
 		self.wrench = wrench
 		self.cwd = self.wrench.cwd
+		self.pip_upgraded = False
+
+	@property
+	def installer(self) -> str:
+		from wrench.utils.installer import get_python_installer
+
+		return get_python_installer(self.wrench.name)
 
 	@step(title="Setting Up Directories", success="Directories Set Up")
 	def dirs(self):
@@ -345,12 +503,15 @@ class WrenchSetup(Base):
 	@step(title="Setting Up Environment", success="Environment Set Up")
 	def env(self, python="python3"):
 		"""Setup env folder
-		- create env if not exists
+		- create env if not exists, cloning the env template of python if there's one
 		- upgrade env pip
 		- install saashq python dependencies
 		"""
 		import wrench.cli
 		import click
+		from wrench.utils.env_template import clone_env_template, update_env_template
+		from wrench.utils.installer import get_venv_cmd
+		from wrench.utils.wheelhouse import pip_install, populate_wheelhouse
 
 		verbose = wrench.cli.verbose
 
@@ -359,18 +520,24 @@ class WrenchSetup(Base):
 		saashq = os.path.join(self.wrench.name, "apps", "saashq")
 		quiet_flag = "" if verbose else "--quiet"
 
-		if not os.path.exists(self.wrench.python):
-			venv = get_venv_path(verbose=verbose, python=python)
-			self.run(f"{venv} env", cwd=self.wrench.name)
+		if not os.path.exists(self.wrench.python) and not clone_env_template(
+			python, os.path.join(self.wrench.name, "env")
+		):
+			if self.installer == "uv":
+				self.run(get_venv_cmd(python, "env", self.installer), cwd=self.wrench.name)
+			else:
+				venv = get_venv_path(verbose=verbose, python=python)
+				self.run(f"{venv} env", cwd=self.wrench.name)
 
 		self.pip()
 		self.wheel()
 
 		if os.path.exists(saashq):
-			self.run(
-				f"{self.wrench.python} -m pip install {quiet_flag} --upgrade -e {saashq}",
-				cwd=self.wrench.name,
+			pip_install(
+				self.wrench.python, f"-e {saashq}", cwd=self.wrench.name, quiet_flag=quiet_flag
 			)
+			populate_wheelhouse(self.wrench.python, self.wrench.name, app_paths=[saashq])
+			update_env_template(self.wrench.name)
 
 	@step(title="Setting Up Wrench Config", success="Wrench Config Set Up")
 	def config(self, redis=True, procfile=True, additional_config=None):
@@ -392,15 +559,21 @@ class WrenchSetup(Base):
 
 	@step(title="Updating pip", success="Updated pip")
 	def pip(self, verbose=False):
-		"""Updates env pip; assumes that env is setup"""
+		"""Updates env pip; assumes that env is setup. pip is only upgraded once per
+		run, subsequent calls are no-ops. Skipped if packages are installed with uv"""
 		import wrench.cli
 
+		if self.pip_upgraded or self.installer == "uv":
+			return 0
+
 		verbose = wrench.cli.verbose or verbose
 		quiet_flag = "" if verbose else "--quiet"
 
-		return self.run(
+		return_code = self.run(
 			f"{self.wrench.python} -m pip install {quiet_flag} --upgrade pip", cwd=self.wrench.name
 		)
+		self.pip_upgraded = True
+		return return_code
 
 	@step(title="Installing wheel", success="Installed wheel")
 	def wheel(self, verbose=False):
@@ -408,13 +581,16 @@ class WrenchSetup(Base):
 		ref: https://github.com/pypa/pip/issues/8559"""
 		import wrench.cli
 
+		from wrench.utils.installer import get_install_cmd
+
 		verbose = wrench.cli.verbose or verbose
 		quiet_flag = "" if verbose else "--quiet"
-
-		return self.run(
-			f"{self.wrench.python} -m pip install {quiet_flag} wheel", cwd=self.wrench.name
+		install_cmd = get_install_cmd(
+			self.wrench.python, self.installer, quiet_flag=quiet_flag, upgrade=False
 		)
 
+		return self.run(f"{install_cmd} wheel", cwd=self.wrench.name)
+
 	def logging(self):
 		from wrench.utils import setup_logging
 
@@ -451,42 +627,137 @@ class WrenchSetup(Base):
 		logger.log("backups were set up")
 
 	@job(title="Setting Up Wrench Dependencies", success="Wrench Dependencies Set Up")
-	def requirements(self, apps=None):
-		"""Install and upgrade specified / all installed apps on given Wrench"""
+	def requirements(self, apps=None, jobs=1, force=False):
+		"""Install and upgrade specified / all installed apps on given Wrench. Unless
+		forced, apps whose dependency manifests haven't changed since they were last
+		installed are skipped"""
 		from wrench.app import App
 
-		apps = apps or self.wrench.apps
+		from wrench.utils.wrench import install_python_dev_dependencies
 
-		self.pip()
+		requested_apps = list(apps or self.wrench.apps)
+		python_apps = self.get_apps_to_install(requested_apps, "python", force=force)
+		node_apps = self.get_apps_to_install(requested_apps, "node", force=force)
+		apps = [app for app in requested_apps if app in python_apps or app in node_apps]
 
 		print(f"Installing {len(apps)} applications...")
 
+		python_time = self.python(apps=python_apps, force=True) if python_apps else 0.0
+		if self.wrench.conf.get("developer_mode"):
+			# install_app leaves these out along with python dependencies
+			start = time.monotonic()
+			install_python_dev_dependencies(
+				wrench_path=self.wrench.name, apps=requested_apps, force=force
+			)
+			python_time += time.monotonic() - start
+
 		for app in apps:
 			path_to_app = os.path.join(self.wrench.name, "apps", app)
-			app = App(path_to_app, wrench=self.wrench, to_clone=False).install(
-				skip_assets=True, restart_wrench=False, ignore_resolution=True
+			App(path_to_app, wrench=self.wrench, to_clone=False).install(
+				skip_assets=True,
+				restart_wrench=False,
+				ignore_resolution=True,
+				skip_python=True,
+				skip_node=True,
+			)
+
+		start = time.monotonic()
+		if node_apps:
+			self.node(apps=node_apps, jobs=jobs, force=True)
+		node_time = time.monotonic() - start
+
+		print_requirements_timings(len(python_apps), python_time, len(node_apps), node_time)
+
+	def get_apps_to_install(self, apps, kind, force=False) -> List:
+		if force:
+			return list(apps)
+
+		changed_apps = self.wrench.apps.get_changed_dependencies(apps, kind)
+		unchanged_apps = [app for app in apps if app not in changed_apps]
+		if unchanged_apps:
+			log(
+				f"Skipping {kind} dependencies of {', '.join(unchanged_apps)}: unchanged since"
+				" last install (use --force to reinstall)",
+				level=3,
+				no_log=True,
 			)
 
-	def python(self, apps=None):
-		"""Install and upgrade Python dependencies for specified / all installed apps on given Wrench"""
+		return changed_apps
+
+	def python(self, apps=None, force=False) -> float:
+		"""Install and upgrade Python dependencies for specified / all installed apps on given Wrench.
+
+		All apps are installed by one pip invocation so that their requirements are
+		resolved together, once. If that fails, apps are installed one by one so that
+		the failing app can be spotted. Returns the time taken in seconds.
+		"""
 		import wrench.cli
+		from wrench.utils.wheelhouse import pip_install, populate_wheelhouse
 
-		apps = apps or self.wrench.apps
+		apps = self.get_apps_to_install(apps or self.wrench.apps, "python", force=force)
+		if not apps:
+			return 0.0
 
 		quiet_flag = "" if wrench.cli.verbose else "--quiet"
 
 		self.pip()
 
-		for app in apps:
-			app_path = os.path.join(self.wrench.name, "apps", app)
-			log(f"\nInstalling python dependencies for {app}", level=3, no_log=True)
-			self.run(f"{self.wrench.python} -m pip install {quiet_flag} --upgrade -e {app_path}")
+		start = time.monotonic()
+		app_paths = [
+			os.path.realpath(os.path.join(self.wrench.name, "apps", app)) for app in apps
+		]
+		editable_flags = " ".join(f"-e {app_path}" for app_path in app_paths)
+
+		log(f"\nInstalling python dependencies for {', '.join(apps)}", level=3, no_log=True)
 
-	def node(self, apps=None):
+		try:
+			pip_install(self.wrench.python, editable_flags, cwd=self.cwd, quiet_flag=quiet_flag)
+		except CommandFailedError:
+			if len(app_paths) == 1:
+				raise
+
+			log("Installing apps together failed, retrying one app at a time", level=3)
+			for app, app_path in zip(apps, app_paths):
+				log(f"\nInstalling python dependencies for {app}", level=3, no_log=True)
+				pip_install(
+					self.wrench.python, f"-e {app_path}", cwd=self.cwd, quiet_flag=quiet_flag
+				)
+
+		populate_wheelhouse(self.wrench.python, self.wrench.name, app_paths=app_paths)
+		self.wrench.apps.update_dependency_fingerprints(apps, "python")
+		return time.monotonic() - start
+
+	def node(self, apps=None, jobs=1, force=False):
 		"""Install and upgrade Node dependencies for specified / all apps on given Wrench"""
 		from wrench.utils.wrench import update_node_packages
 
-		return update_node_packages(wrench_path=self.wrench.name, apps=apps)
+		apps = self.get_apps_to_install(apps or self.wrench.apps, "node", force=force)
+		if not apps:
+			return
+
+		update_node_packages(wrench_path=self.wrench.name, apps=apps, jobs=jobs)
+		self.wrench.apps.update_dependency_fingerprints(apps, "node")
+
+
+def print_requirements_timings(
+	python_apps: int, python_time: float, node_apps: int, node_time: float
+):
+	"""Prints time taken by `wrench setup requirements`. Dependencies of all apps are
+	installed together, by one pip run and one batch of yarn runs, so only these phases
+	are timed"""
+	import click
+
+	if not (python_apps or node_apps):
+		return
+
+	lines = [
+		f"{label:<20}  {f'{apps} app' + ('' if apps == 1 else 's'):>8}  {seconds:7.1f}s"
+		for label, apps, seconds in (
+			("python dependencies", python_apps, python_time),
+			("node dependencies", node_apps, node_time),
+		)
+	]
+	click.secho("\n".join(["", "Time taken:"] + lines), fg="bright_black")
 
 
 class WrenchTearDown: